@@ -5,6 +5,8 @@ from alibabacloud_vpc20160428.client import Client as VpcClient
 from alibabacloud_ecs20140526 import models as ecs_models
 from alibabacloud_tea_util import models as util_models
 from Tea.exceptions import UnretryableException, TeaException
+from journal import NullJournal
+from converter import INSTANCE, INSTANCE_TYPE, SECURITY_GROUP, REGION, IMAGE, SPOT_PRICE
 import json
 
 
@@ -16,6 +18,12 @@ class AliyunAPI:
     # 单例实例存储
     _instance = None
 
+    # 变更操作日志，未启用时不记录
+    journal = NullJournal()
+
+    # API流量录制/回放(cassette.Recorder 或 cassette.Player)，未启用时为None
+    cassette = None
+
     def __new__(cls, access_key_id, access_key_secret):
         """创建单例实例"""
         if cls._instance is None:
@@ -64,10 +72,34 @@ class AliyunAPI:
                 endpoint=f"vpc.{self.region_id}.aliyuncs.com",
             )
             self.vpc_client = VpcClient(vpc_config)
+            self._wrap_clients()
 
         except Exception as e:
             raise Exception(f"\033[1;31m初始化阿里云API客户端失败: {e}\033[0m")
 
+    def _wrap_clients(self):
+        """
+        启用录制/回放时用代理替换各服务客户端
+        """
+        if self.cassette is None:
+            return
+        self.ecs_client = self.cassette.wrap("ecs", self.ecs_client)
+        self.bss_client = self.cassette.wrap("bss", self.bss_client)
+        self.vpc_client = self.cassette.wrap("vpc", self.vpc_client)
+
+    def set_cassette(self, cassette):
+        """
+        设置API流量录制/回放，重新创建各服务客户端并替换为代理
+        """
+        self.cassette = cassette
+        self._initialize_clients()
+
+    def set_journal(self, journal):
+        """
+        设置操作日志，之后创建、删除、启停实例和执行命令都会记录意图和结果
+        """
+        self.journal = journal
+
     def set_region(self, region_id):
         """
         设置区域
@@ -94,6 +126,7 @@ class AliyunAPI:
                 endpoint=f"vpc.{region_id}.aliyuncs.com",
             )
             self.vpc_client = VpcClient(vpc_config)
+            self._wrap_clients()
 
             return True
         except Exception as e:
@@ -133,14 +166,9 @@ class AliyunAPI:
                     "RequestId": response.body.request_id,
                 }
 
-                for region in response.body.regions.region:
-                    result["Regions"]["Region"].append(
-                        {
-                            "RegionId": region.region_id,
-                            "LocalName": region.local_name,
-                            "RegionEndpoint": region.region_endpoint,
-                        }
-                    )
+                result["Regions"]["Region"] = REGION.convert(
+                    response.body.regions.region
+                )
                 return result
             else:
                 print(f"\033[1;31m查询地域列表返回数据格式异常\033[0m")
@@ -155,7 +183,7 @@ class AliyunAPI:
             print(f"\033[1;31m查询地域列表失败: {e}\033[0m")
             return None
 
-    def get_describe_price(
+    def _query_price(
         self,
         RegionId=None,
         ImageId=None,
@@ -169,7 +197,9 @@ class AliyunAPI:
         ResourceType="instance",
         Amount=1,
     ):
-
+        """
+        调用DescribePrice并返回原始响应
+        """
         system_disk = ecs_models.DescribePriceRequestSystemDisk(
             category=SystemDiskCategory, size=SystemDiskSize
         )
@@ -187,10 +217,61 @@ class AliyunAPI:
         )
 
         runtime = util_models.RuntimeOptions()
-        response = self.ecs_client.describe_price_with_options(
+        return self.ecs_client.describe_price_with_options(
             describe_price_request, runtime
         )
 
+    def get_price_value(self, **kwargs):
+        """
+        查询价格，仅返回总价数值（按量付费时为每小时价格）
+        参数与get_describe_price相同，查询失败返回None
+        """
+        try:
+            response = self._query_price(**kwargs)
+            if hasattr(response.body, "price_info"):
+                return float(
+                    getattr(response.body.price_info.price, "trade_price", 0.0) or 0.0
+                )
+            return 0.0
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return None
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return None
+        except Exception as e:
+            print(f"\033[1;31m查询价格失败: {e}\033[0m")
+            return None
+
+    def get_describe_price(
+        self,
+        RegionId=None,
+        ImageId=None,
+        InstanceType=None,
+        InternetMaxBandwidthOut=5,
+        SystemDiskCategory="cloud_essd_entry",
+        SystemDiskSize=40,
+        SpotStrategy="SpotAsPriceGo",
+        SpotDuration=0,
+        InternetChargeType="PayByBandwidth",
+        ResourceType="instance",
+        Amount=1,
+    ):
+
+        response = self._query_price(
+            RegionId=RegionId,
+            ImageId=ImageId,
+            InstanceType=InstanceType,
+            InternetMaxBandwidthOut=InternetMaxBandwidthOut,
+            SystemDiskCategory=SystemDiskCategory,
+            SystemDiskSize=SystemDiskSize,
+            SpotStrategy=SpotStrategy,
+            SpotDuration=SpotDuration,
+            InternetChargeType=InternetChargeType,
+            ResourceType=ResourceType,
+            Amount=Amount,
+        )
+
         # 安全提取总价
         total_price = (
             getattr(response.body.price_info.price, "trade_price", 0.0)
@@ -309,21 +390,9 @@ class AliyunAPI:
                     "PageSize": response.body.page_size,
                 }
 
-                for sg in response.body.security_groups.security_group:
-                    sg_info = {
-                        "SecurityGroupId": sg.security_group_id,
-                        "SecurityGroupName": sg.security_group_name,
-                        "Description": sg.description,
-                        "VpcId": sg.vpc_id,
-                        "CreationTime": sg.creation_time,
-                        "SecurityGroupType": (
-                            sg.security_group_type
-                            if hasattr(sg, "security_group_type")
-                            else ""
-                        ),
-                    }
-                    result["SecurityGroups"]["SecurityGroup"].append(sg_info)
-
+                result["SecurityGroups"]["SecurityGroup"] = SECURITY_GROUP.convert(
+                    response.body.security_groups.security_group
+                )
                 return result
             else:
                 print(f"\033[1;31m查询安全组列表返回数据格式异常\033[0m")
@@ -338,16 +407,16 @@ class AliyunAPI:
             print(f"\033[1;31m查询安全组列表失败: {e}\033[0m")
             return None
 
-    def get_describe_instance_types(self):
+    def get_describe_instance_types(self, instance_types=None):
         """
         查询ECS实例规格列表
-        :param region_id: 地域ID (可选)
-        :param next_token: 分页令牌 (可选)
-        :param max_results: 每页最大条目数 (默认100)
+        :param instance_types: 只查询指定的实例规格列表 (可选)
         """
         try:
             # 创建请求对象
-            request = ecs_models.DescribeInstanceTypesRequest()
+            request = ecs_models.DescribeInstanceTypesRequest(
+                instance_types=list(instance_types) if instance_types else None
+            )
 
             # 设置运行时参数
             runtime = util_models.RuntimeOptions()
@@ -359,39 +428,14 @@ class AliyunAPI:
 
             if response and response.body:
                 # 构造返回结果
-                result = {
+                types = response.body.instance_types
+                return {
                     "request_id": response.body.request_id,
                     "next_token": response.body.next_token,
-                    "instance_types": [],
+                    "instance_types": INSTANCE_TYPE.convert(
+                        types.instance_type if types else None
+                    ),
                 }
-
-                # 处理实例规格列表
-                if (
-                    response.body.instance_types
-                    and response.body.instance_types.instance_type
-                ):
-                    for instance_type in response.body.instance_types.instance_type:
-                        result["instance_types"].append(
-                            {
-                                "InstanceTypeId": instance_type.instance_type_id,
-                                "CpuCoreCount": instance_type.cpu_core_count,
-                                "MemorySize": f"{instance_type.memory_size} GiB",
-                                "GPUAmount": getattr(instance_type, "gpu_amount", 0),
-                                "GPUSpec": getattr(instance_type, "gpu_spec", "N/A"),
-                                "LocalStorageCategory": getattr(
-                                    instance_type, "local_storage_category", "cloud"
-                                ),
-                                "LocalStorageAmount": getattr(
-                                    instance_type, "local_storage_amount", 0
-                                ),
-                                "LocalStorageSize": f"{getattr(instance_type, 'local_storage_size', 0)} GiB",
-                                "NetworkCardQuantity": instance_type.eni_quantity,
-                                "EniPrivateIpAddressQuantity": instance_type.eni_private_ip_address_quantity,
-                                "InstanceTypeFamily": instance_type.instance_type_family,
-                            }
-                        )
-
-                return result
             else:
                 print(f"\033[1;31m查询实例规格返回数据格式异常\033[0m")
                 return None
@@ -405,15 +449,21 @@ class AliyunAPI:
             print(f"\033[1;31m查询实例规格失败: {e}\033[0m")
             return None
 
-    def get_describe_launch_templates(self, region_id=None):
+    def get_describe_launch_templates(
+        self, region_id=None, page_number=1, page_size=50
+    ):
         """
         查询启动模板列表
         :param region_id: 地域ID (可选)
+        :param page_number: 页码
+        :param page_size: 每页数量，最大50
         """
         try:
             # 创建请求对象
             request = ecs_models.DescribeLaunchTemplatesRequest(
-                region_id=region_id if region_id else self.region_id
+                region_id=region_id if region_id else self.region_id,
+                page_number=page_number,
+                page_size=page_size,
             )
 
             # 设置运行时参数
@@ -478,6 +528,56 @@ class AliyunAPI:
             print(f"\033[1;31m查询启动模板失败: {e}\033[0m")
             return None
 
+    def get_describe_launch_template_versions(
+        self, launch_template_id, region_id=None, page_number=1, page_size=50
+    ):
+        """
+        查询启动模板的版本及其配置
+        :param launch_template_id: 启动模板ID
+        :param page_number: 页码
+        :param page_size: 每页数量，最大50
+        :return: (版本列表, 版本总数)，查询失败返回(None, 0)
+                 版本的launch_template_data为模板配置字典，键名与API一致，如InstanceType
+        """
+        try:
+            request = ecs_models.DescribeLaunchTemplateVersionsRequest(
+                region_id=region_id if region_id else self.region_id,
+                launch_template_id=launch_template_id,
+                detail_flag=True,
+                page_number=page_number,
+                page_size=page_size,
+            )
+            runtime = util_models.RuntimeOptions()
+            response = self.ecs_client.describe_launch_template_versions_with_options(
+                request, runtime
+            )
+
+            versions = []
+            sets = response.body.launch_template_version_sets
+            for version in sets.launch_template_version_set or [] if sets else []:
+                data = version.launch_template_data
+                versions.append(
+                    {
+                        "version_number": version.version_number,
+                        "version_description": version.version_description,
+                        "default_version": version.default_version,
+                        "created_by": version.created_by,
+                        "create_time": version.create_time,
+                        "modified_time": version.modified_time,
+                        "launch_template_data": data.to_map() if data else {},
+                    }
+                )
+            return versions, response.body.total_count or 0
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return None, 0
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return None, 0
+        except Exception as e:
+            print(f"\033[1;31m查询启动模板版本失败: {e}\033[0m")
+            return None, 0
+
     def create_instances_from_template(
         self,
         region_id,
@@ -485,9 +585,13 @@ class AliyunAPI:
         launch_template_version=1,
         amount=1,
         password=None,
+        user_data=None,
+        tags=None,
     ):
         """
         根据启动模板创建ECS实例
+        :param user_data: Base64编码的实例自定义数据 (可选)，覆盖模板中的UserData
+        :param tags: 实例标签 (可选)，如 [{"Key": "k", "Value": "v"}]
         """
         try:
             request = ecs_models.RunInstancesRequest(
@@ -496,17 +600,34 @@ class AliyunAPI:
                 launch_template_version=launch_template_version,
                 amount=amount,
                 password=password,
+                user_data=user_data,
+                tag=[
+                    ecs_models.RunInstancesRequestTag(key=t["Key"], value=t["Value"])
+                    for t in tags or []
+                ]
+                or None,
             )
 
             runtime = util_models.RuntimeOptions()
-            response = self.ecs_client.run_instances_with_options(request, runtime)
-
-            if response and response.body:
-                return {
-                    "request_id": response.body.request_id,
-                    "instance_ids": response.body.instance_id_sets.instance_id_set,
-                }
-            return None
+            with self.journal.operation(
+                "create_instances_from_template",
+                region_id=region_id,
+                launch_template_name=launch_template_name,
+                launch_template_version=launch_template_version,
+                amount=amount,
+            ) as entry:
+                response = self.ecs_client.run_instances_with_options(request, runtime)
+                if not (response and response.body):
+                    return None
+                instance_ids = response.body.instance_id_sets.instance_id_set
+                entry.done(
+                    request_id=response.body.request_id,
+                    instance_ids=list(instance_ids),
+                )
+            return {
+                "request_id": response.body.request_id,
+                "instance_ids": instance_ids,
+            }
         except Exception as e:
             print(f"创建实例失败: {e}")
             return None
@@ -571,7 +692,13 @@ class AliyunAPI:
             runtime = util_models.RuntimeOptions()
 
             # 发起调用
-            response = self.ecs_client.delete_instance_with_options(request, runtime)
+            with self.journal.operation(
+                "delete_instance", region_id=self.region_id, instance_ids=[instance_id]
+            ) as entry:
+                response = self.ecs_client.delete_instance_with_options(
+                    request, runtime
+                )
+                entry.done(request_id=response.body.request_id)
 
             if response and response.body and response.body.request_id:
                 # 构造与旧版API相同格式的返回结果
@@ -601,6 +728,160 @@ class AliyunAPI:
             print(f"\033[1;31m删除实例失败: {e}\033[0m")
             return None
 
+    def start_instance(self, instance_id):
+        """
+        启动已停止的实例
+        """
+        try:
+            request = ecs_models.StartInstanceRequest(instance_id=instance_id)
+            runtime = util_models.RuntimeOptions()
+            with self.journal.operation(
+                "start_instance", region_id=self.region_id, instance_ids=[instance_id]
+            ) as entry:
+                response = self.ecs_client.start_instance_with_options(request, runtime)
+                entry.done(request_id=response.body.request_id)
+            return {"RequestId": response.body.request_id}
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return None
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return None
+        except Exception as e:
+            print(f"\033[1;31m启动实例失败: {e}\033[0m")
+            return None
+
+    def stop_instance(self, instance_id, stopped_mode="StopCharging"):
+        """
+        停止实例
+        :param stopped_mode: StopCharging为节省停机模式，停机后不再收取计算资源费用
+        """
+        try:
+            request = ecs_models.StopInstanceRequest(
+                instance_id=instance_id, stopped_mode=stopped_mode
+            )
+            runtime = util_models.RuntimeOptions()
+            with self.journal.operation(
+                "stop_instance",
+                region_id=self.region_id,
+                instance_ids=[instance_id],
+                stopped_mode=stopped_mode,
+            ) as entry:
+                response = self.ecs_client.stop_instance_with_options(request, runtime)
+                entry.done(request_id=response.body.request_id)
+            return {"RequestId": response.body.request_id}
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return None
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return None
+        except Exception as e:
+            print(f"\033[1;31m停止实例失败: {e}\033[0m")
+            return None
+
+    def run_command(
+        self,
+        instance_ids,
+        command_content,
+        command_type="RunShellScript",
+        timeout=60,
+        region_id=None,
+    ):
+        """
+        通过云助手在多台实例上执行脚本，每次请求最多100台实例
+        :param instance_ids: 实例ID列表
+        :param command_content: 脚本内容
+        :param command_type: RunShellScript / RunPowerShellScript / RunBatScript
+        :param timeout: 脚本执行超时时间(秒)
+        :return: 每批请求的InvokeId列表，失败返回None
+        """
+        try:
+            invoke_ids = []
+            instance_ids = list(instance_ids)
+            for i in range(0, len(instance_ids), 100):
+                request = ecs_models.RunCommandRequest(
+                    region_id=region_id if region_id else self.region_id,
+                    type=command_type,
+                    command_content=command_content,
+                    content_encoding="PlainText",
+                    instance_id=instance_ids[i : i + 100],
+                    timeout=timeout,
+                )
+                runtime = util_models.RuntimeOptions()
+                with self.journal.operation(
+                    "run_command",
+                    region_id=request.region_id,
+                    instance_ids=instance_ids[i : i + 100],
+                ) as entry:
+                    response = self.ecs_client.run_command_with_options(
+                        request, runtime
+                    )
+                    entry.done(
+                        request_id=response.body.request_id,
+                        invoke_id=response.body.invoke_id,
+                    )
+                invoke_ids.append(response.body.invoke_id)
+            return invoke_ids
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return None
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return None
+        except Exception as e:
+            print(f"\033[1;31m执行云助手命令失败: {e}\033[0m")
+            return None
+
+    def get_invocation_results(self, invoke_id, region_id=None):
+        """
+        查询云助手命令在各实例上的执行结果，自动翻页
+        :return: 结果列表，包含instance_id、status、exit_code、output、error_info；
+                 查询失败返回None
+        """
+        try:
+            results = []
+            next_token = None
+            while True:
+                request = ecs_models.DescribeInvocationResultsRequest(
+                    region_id=region_id if region_id else self.region_id,
+                    invoke_id=invoke_id,
+                    content_encoding="PlainText",
+                    max_results=50,
+                    next_token=next_token,
+                )
+                runtime = util_models.RuntimeOptions()
+                response = self.ecs_client.describe_invocation_results_with_options(
+                    request, runtime
+                )
+                invocation = response.body.invocation
+                items = []
+                if invocation and invocation.invocation_results:
+                    items = invocation.invocation_results.invocation_result or []
+                for item in items:
+                    results.append(
+                        {
+                            "instance_id": item.instance_id,
+                            "status": item.invocation_status,
+                            "exit_code": item.exit_code,
+                            "output": item.output,
+                            "error_info": getattr(item, "error_info", None),
+                        }
+                    )
+                next_token = getattr(invocation, "next_token", None)
+                if not items or not next_token:
+                    break
+            return results
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return None
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return None
+        except Exception as e:
+            print(f"\033[1;31m查询云助手执行结果失败: {e}\033[0m")
+            return None
+
     def get_describe_instance_attribute(self, instance_id):
         """
         查询实例的公共IP地址
@@ -702,50 +983,175 @@ class AliyunAPI:
             print(f"\033[1;31m查询实例失败: {e}\033[0m")
             return None
 
-    def get_describe_instances(self, region_id=None):
+    def get_instances_status(self, region_id, instance_ids):
+        """
+        批量查询实例状态，每次请求最多100个实例
+        :param region_id: 实例所在区域
+        :param instance_ids: 实例ID列表
+        :return: 实例ID到状态的字典，已释放的实例不在结果中；查询失败返回None
+        """
+        if not instance_ids:
+            return {}
+
         try:
-            request = ecs_models.DescribeInstancesRequest(
-                region_id=region_id if region_id else self.region_id
-            )
-            # 设置返回字段
-            request.field = json.dumps(
-                ["InstanceId", "PublicIpAddress", "EipAddress", "OSName", "Status"]
-            )
+            statuses = {}
+            instance_ids = list(instance_ids)
+            for i in range(0, len(instance_ids), 100):
+                request = ecs_models.DescribeInstanceStatusRequest(
+                    region_id=region_id if region_id else self.region_id,
+                    instance_id=instance_ids[i : i + 100],
+                    page_size=50,
+                )
+                page_number = 1
+                while True:
+                    request.page_number = page_number
+                    runtime = util_models.RuntimeOptions()
+                    response = self.ecs_client.describe_instance_status_with_options(
+                        request, runtime
+                    )
+                    items = response.body.instance_statuses.instance_status or []
+                    for status in items:
+                        statuses[status.instance_id] = status.status
+                    total_count = response.body.total_count or 0
+                    if not items or page_number * 50 >= total_count:
+                        break
+                    page_number += 1
+            return statuses
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return None
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return None
+        except Exception as e:
+            print(f"\033[1;31m批量查询实例状态失败: {e}\033[0m")
+            return None
 
-            runtime = util_models.RuntimeOptions()
-            response = self.ecs_client.describe_instances_with_options(request, runtime)
+    def delete_instances(self, instance_ids, region_id=None):
+        """
+        批量强制删除实例，每次请求最多100个实例
+        :return: 每批请求的RequestId列表，失败返回None
+        """
+        if not instance_ids:
+            return []
 
-            instances = []
-            if response.body and response.body.instances:
-                for item in response.body.instances.instance:
-                    public_ip = None
-                    if item.eip_address and item.eip_address.ip_address:
-                        public_ip = item.eip_address.ip_address
-                    elif item.public_ip_address and item.public_ip_address.ip_address:
-                        public_ip = item.public_ip_address.ip_address[0]
-                    os_name = getattr(
-                        item, "os_name", getattr(item, "OSName", "Unknown")
-                    )
-                    instances.append(
-                        {
-                            "instance_id": item.instance_id,
-                            "public_ip": public_ip,
-                            "os_name": os_name,
-                            "status": item.status,
-                        }
+        try:
+            request_ids = []
+            instance_ids = list(instance_ids)
+            for i in range(0, len(instance_ids), 100):
+                request = ecs_models.DeleteInstancesRequest(
+                    region_id=region_id if region_id else self.region_id,
+                    instance_id=instance_ids[i : i + 100],
+                    force=True,
+                )
+                runtime = util_models.RuntimeOptions()
+                with self.journal.operation(
+                    "delete_instances",
+                    region_id=request.region_id,
+                    instance_ids=instance_ids[i : i + 100],
+                ) as entry:
+                    response = self.ecs_client.delete_instances_with_options(
+                        request, runtime
                     )
+                    entry.done(request_id=response.body.request_id)
+                request_ids.append(response.body.request_id)
+            return request_ids
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return None
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return None
+        except Exception as e:
+            print(f"\033[1;31m批量删除实例失败: {e}\033[0m")
+            return None
+
+    def get_describe_instances(self, region_id=None, fields=None, strict=False):
+        """
+        查询地域下的所有实例，自动翻页
+        :param fields: 只返回指定的字段，如 ["instance_id", "status"]，可选字段见 converter.INSTANCE
+        :param strict: 查询失败时返回None而不是空列表，用于需要区分"没有实例"和"查询失败"的场景
+        """
+        try:
+            instances = []
+            page_number = 1
+            while True:
+                page, total_count = self._describe_instances_page(
+                    region_id, page_number, fields=fields
+                )
+                instances.extend(page)
+                if not page or len(instances) >= total_count:
+                    break
+                page_number += 1
 
             return instances
         except Exception as e:
             print(f"查询实例失败: {e}")
-            return []
+            return None if strict else []
 
-    def run_instances(self, instance):
+    def get_describe_instances_by_ids(self, instance_ids, region_id=None, fields=None):
+        """
+        批量查询指定实例的信息(公网IP、状态等)，每次请求最多100个实例
+        :param fields: 只返回指定的字段，instance_id总会返回
+        :return: 实例ID到实例信息的字典
+        """
+        if fields:
+            fields = ["instance_id"] + [f for f in fields if f != "instance_id"]
+        try:
+            instances = {}
+            instance_ids = list(instance_ids)
+            for i in range(0, len(instance_ids), 100):
+                page, _ = self._describe_instances_page(
+                    region_id, 1, instance_ids=instance_ids[i : i + 100], fields=fields
+                )
+                for inst in page:
+                    instances[inst["instance_id"]] = inst
+            return instances
+        except Exception as e:
+            print(f"查询实例失败: {e}")
+            return {}
+
+    def _describe_instances_page(
+        self, region_id, page_number, page_size=100, instance_ids=None, fields=None
+    ):
+        """
+        查询单页实例信息
+        :param instance_ids: 只查询指定的实例ID (可选)
+        :param fields: 只返回指定的字段 (可选)
+        :return: (实例列表, 实例总数)
+        """
+        schema = INSTANCE.project(fields)
+        request = ecs_models.DescribeInstancesRequest(
+            region_id=region_id if region_id else self.region_id,
+            page_number=page_number,
+            page_size=page_size,
+        )
+        if instance_ids:
+            request.instance_ids = json.dumps(list(instance_ids))
+        # 服务端只返回需要的字段
+        request.field = json.dumps(schema.api_fields)
+
+        runtime = util_models.RuntimeOptions()
+        response = self.ecs_client.describe_instances_with_options(request, runtime)
+
+        if not response.body or not response.body.instances:
+            return [], 0
+        return (
+            schema.convert(response.body.instances.instance),
+            response.body.total_count or 0,
+        )
+
+    @staticmethod
+    def _run_instances_request(instance, dry_run=None):
+        """
+        根据Instance对象构造RunInstances请求
+        """
         system_disk = ecs_models.RunInstancesRequestSystemDisk(
             category=instance.SystemDiskCategory, size=instance.SystemDiskSize
         )
 
-        instance_request = ecs_models.RunInstancesRequest(
+        return ecs_models.RunInstancesRequest(
+            dry_run=dry_run,
             region_id=instance.RegionId,
             image_id=instance.ImageId,
             internet_max_bandwidth_out=instance.InternetMaxBandwidthOut,
@@ -761,12 +1167,286 @@ class AliyunAPI:
             instance_charge_type=instance.InstanceChargeType,
             security_group_id=instance.SecurityGroupId,
             amount=instance.Amount,
+            user_data=instance.UserData,
+            tag=[
+                ecs_models.RunInstancesRequestTag(key=tag["Key"], value=tag["Value"])
+                for tag in instance.Tags or []
+            ]
+            or None,
         )
 
-        response = self.ecs_client.run_instances(instance_request)
-        id = response.body.instance_id_sets.instance_id_set
+    def dry_run_instances(self, instance):
+        """
+        以DryRun方式提交RunInstances，只校验参数、权限和库存，不创建实例
+        :return: (是否通过, 错误码, 错误信息)
+        """
+        request = self._run_instances_request(instance, dry_run=True)
+        try:
+            self.ecs_client.run_instances(request)
+        except TeaException as e:
+            # 校验通过时返回DryRunOperation错误码
+            return e.code == "DryRunOperation", e.code, e.message
+        except Exception as e:
+            return False, None, str(e)
+        return False, None, "DryRun请求未返回校验结果"
+
+    def run_instances(self, instance):
+        instance_request = self._run_instances_request(instance)
+        with self.journal.operation(
+            "run_instances",
+            region_id=instance.RegionId,
+            instance_type=instance.InstanceType,
+            v_switch_id=instance.VSwitchId,
+            amount=instance.Amount,
+        ) as entry:
+            response = self.ecs_client.run_instances(instance_request)
+            id = response.body.instance_id_sets.instance_id_set
+            entry.done(request_id=response.body.request_id, instance_ids=list(id))
         return id
 
+    def get_describe_images(self, region_id=None, page_number=1, page_size=100):
+        """
+        查询单页镜像列表
+        :return: (镜像列表, 镜像总数)，失败返回(None, 0)
+        """
+        try:
+            request = ecs_models.DescribeImagesRequest(
+                region_id=region_id if region_id else self.region_id,
+                page_number=page_number,
+                page_size=page_size,
+            )
+            runtime = util_models.RuntimeOptions()
+            response = self.ecs_client.describe_images_with_options(request, runtime)
+
+            images = response.body.images
+            return (
+                IMAGE.convert(images.image if images else None),
+                response.body.total_count or 0,
+            )
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return None, 0
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return None, 0
+        except Exception as e:
+            print(f"\033[1;31m查询镜像列表失败: {e}\033[0m")
+            return None, 0
+
+    def get_available_resource(
+        self,
+        zone_id,
+        instance_type,
+        spot_strategy=None,
+        instance_charge_type="PostPaid",
+        region_id=None,
+    ):
+        """
+        查询可用区内实例规格的库存
+        :return: 规格到库存状态的字典，如 {"ecs.e-c1m2.xlarge": "WithStock"}；
+                 可用区不售卖该规格时为空字典，查询失败返回None
+        """
+        try:
+            request = ecs_models.DescribeAvailableResourceRequest(
+                region_id=region_id if region_id else self.region_id,
+                zone_id=zone_id,
+                destination_resource="InstanceType",
+                instance_type=instance_type,
+                instance_charge_type=instance_charge_type,
+                spot_strategy=spot_strategy,
+            )
+            runtime = util_models.RuntimeOptions()
+            response = self.ecs_client.describe_available_resource_with_options(
+                request, runtime
+            )
+
+            stock = {}
+            zones = response.body.available_zones
+            for zone in zones.available_zone or [] if zones else []:
+                if not zone.available_resources:
+                    continue
+                for resource in zone.available_resources.available_resource or []:
+                    if not resource.supported_resources:
+                        continue
+                    for item in resource.supported_resources.supported_resource or []:
+                        stock[item.value] = item.status_category or item.status
+            return stock
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return None
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return None
+        except Exception as e:
+            print(f"\033[1;31m查询可用资源失败: {e}\033[0m")
+            return None
+
+    def get_spot_price_history(
+        self, zone_id, instance_type, start_time, end_time=None, offset=0, region_id=None
+    ):
+        """
+        查询一页竞价实例的历史价格
+        :param start_time: 起始时间，UTC格式如 2024-01-01T00:00:00Z，最早为30天前
+        :param offset: 分页偏移量，使用上一页返回的next_offset
+        :return: (价格记录列表, next_offset)，没有下一页时next_offset为0，查询失败返回(None, 0)
+        """
+        try:
+            request = ecs_models.DescribeSpotPriceHistoryRequest(
+                region_id=region_id if region_id else self.region_id,
+                zone_id=zone_id,
+                instance_type=instance_type,
+                network_type="vpc",
+                start_time=start_time,
+                end_time=end_time,
+                offset=offset,
+            )
+            runtime = util_models.RuntimeOptions()
+            response = self.ecs_client.describe_spot_price_history_with_options(
+                request, runtime
+            )
+
+            prices = response.body.spot_prices
+            records = SPOT_PRICE.convert(prices.spot_price_type if prices else None)
+            return records, response.body.next_offset or 0
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return None, 0
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return None, 0
+        except Exception as e:
+            print(f"\033[1;31m查询竞价历史价格失败: {e}\033[0m")
+            return None, 0
+
+    def tag_instances(self, instance_ids, tags, region_id=None):
+        """
+        为实例添加标签，每次请求最多50个实例
+        :param tags: 标签列表，如 [{"Key": "k", "Value": "v"}]
+        :return: 是否成功
+        """
+        try:
+            instance_ids = list(instance_ids)
+            for i in range(0, len(instance_ids), 50):
+                request = ecs_models.TagResourcesRequest(
+                    region_id=region_id if region_id else self.region_id,
+                    resource_type="instance",
+                    resource_id=instance_ids[i : i + 50],
+                    tag=[
+                        ecs_models.TagResourcesRequestTag(
+                            key=t["Key"], value=t["Value"]
+                        )
+                        for t in tags
+                    ],
+                )
+                runtime = util_models.RuntimeOptions()
+                self.ecs_client.tag_resources_with_options(request, runtime)
+            return True
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return False
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return False
+        except Exception as e:
+            print(f"\033[1;31m添加实例标签失败: {e}\033[0m")
+            return False
+
+    def untag_instances(self, instance_ids, tag_keys, region_id=None):
+        """
+        删除实例的标签，每次请求最多50个实例
+        :return: 是否成功
+        """
+        try:
+            instance_ids = list(instance_ids)
+            for i in range(0, len(instance_ids), 50):
+                request = ecs_models.UntagResourcesRequest(
+                    region_id=region_id if region_id else self.region_id,
+                    resource_type="instance",
+                    resource_id=instance_ids[i : i + 50],
+                    tag_key=list(tag_keys),
+                )
+                runtime = util_models.RuntimeOptions()
+                self.ecs_client.untag_resources_with_options(request, runtime)
+            return True
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return False
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return False
+        except Exception as e:
+            print(f"\033[1;31m删除实例标签失败: {e}\033[0m")
+            return False
+
+    def get_tagged_instances(self, tag_key, region_id=None):
+        """
+        查询带有指定标签键的实例，自动翻页
+        :return: 实例ID到标签值的字典，查询失败返回None
+        """
+        try:
+            tagged = {}
+            next_token = None
+            while True:
+                request = ecs_models.ListTagResourcesRequest(
+                    region_id=region_id if region_id else self.region_id,
+                    resource_type="instance",
+                    tag=[ecs_models.ListTagResourcesRequestTag(key=tag_key)],
+                    next_token=next_token,
+                )
+                runtime = util_models.RuntimeOptions()
+                response = self.ecs_client.list_tag_resources_with_options(
+                    request, runtime
+                )
+                resources = response.body.tag_resources
+                for item in resources.tag_resource or [] if resources else []:
+                    if item.tag_key == tag_key:
+                        tagged[item.resource_id] = item.tag_value
+                next_token = response.body.next_token
+                if not next_token:
+                    return tagged
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return None
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return None
+        except Exception as e:
+            print(f"\033[1;31m查询实例标签失败: {e}\033[0m")
+            return None
+
+    def get_account_attributes(self, attribute_names, region_id=None):
+        """
+        查询账号的资源配额，如 max-postpaid-instance-vcpu-count
+        :param attribute_names: 配额名称列表
+        :return: 配额名称到值的字典(字符串)，查询失败返回None
+        """
+        try:
+            request = ecs_models.DescribeAccountAttributesRequest(
+                region_id=region_id if region_id else self.region_id,
+                attribute_name=list(attribute_names),
+            )
+            runtime = util_models.RuntimeOptions()
+            response = self.ecs_client.describe_account_attributes_with_options(
+                request, runtime
+            )
+
+            attributes = {}
+            items = response.body.account_attribute_items
+            for item in items.account_attribute_item or [] if items else []:
+                values = item.attribute_values.value_item or []
+                if values:
+                    attributes[item.attribute_name] = values[0].value
+            return attributes
+        except TeaException as e:
+            print(f"\033[1;31m服务器错误: {e.code} - {e.message}\033[0m")
+            return None
+        except UnretryableException as e:
+            print(f"\033[1;31m客户端错误: {e}\033[0m")
+            return None
+        except Exception as e:
+            print(f"\033[1;31m查询账号配额失败: {e}\033[0m")
+            return None
+
     def get_describe_security_group_attribute(self, region_id, group_id):
         """
         查询指定安全组的属性信息，返回处理后的端口规则
@@ -803,6 +1483,13 @@ class AliyunAPI:
                             "PortRange": port_range,
                             "IpProtocol": rule.ip_protocol,
                             "SourceCidrIp": rule.source_cidr_ip,
+                            "Ipv6SourceCidrIp": getattr(rule, "ipv_6source_cidr_ip", None),
+                            "SourceGroupId": getattr(rule, "source_group_id", None),
+                            "SourcePrefixListId": getattr(
+                                rule, "source_prefix_list_id", None
+                            ),
+                            "Direction": getattr(rule, "direction", None) or "ingress",
+                            "Policy": getattr(rule, "policy", None) or "Accept",
                         }
                     )
                 processed_rules = {group_id: processed_rules}
@@ -835,6 +1522,7 @@ class AliyunAPI:
                 {
                     "SecurityGroupId": securityGroupId,
                     "Description": group[i]["Description"],
+                    "VpcId": group[i]["VpcId"],
                     "attribute": attr[securityGroupId],
                 }
             )
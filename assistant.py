@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+云助手模块，批量执行命令并按完成顺序返回各实例的结果
+"""
+
+import time
+
+# 实例上的命令已结束的状态
+FINISHED_STATUSES = (
+    "Success",
+    "Failed",
+    "Timeout",
+    "Error",
+    "Cancelled",
+    "Invalid",
+    "Aborted",
+    "Terminated",
+)
+
+
+def select_instances(instances, selector):
+    """
+    根据过滤条件从实例列表中选择实例
+
+    Args:
+        instances: get_describe_instances返回的实例列表
+        selector: all，或 key=value 形式的条件(多个条件用逗号分隔)，
+            key为实例字段名，如 status=Running,instance_type=ecs.e-c1m2.xlarge
+
+    Returns:
+        list: 匹配的实例ID列表
+    """
+    if selector == "all":
+        return [inst["instance_id"] for inst in instances]
+
+    conditions = []
+    for item in selector.split(","):
+        key, _, value = item.partition("=")
+        conditions.append((key.strip(), value.strip()))
+    return [
+        inst["instance_id"]
+        for inst in instances
+        if all(str(inst.get(key)) == value for key, value in conditions)
+    ]
+
+
+def stream_invocation(
+    api, invoke_ids, region_id=None, timeout=600, min_interval=0.5, max_interval=5
+):
+    """
+    轮询云助手执行结果，实例执行结束后立即产出其结果
+
+    轮询间隔自适应：有新结果时恢复为最小间隔，否则逐步拉长，
+    既能及时输出短命令的结果，也不会在长命令上频繁调用API
+
+    Args:
+        api: AliyunAPI实例
+        invoke_ids: run_command返回的InvokeId列表
+        region_id: 实例所在区域
+        timeout: 等待结果的超时时间(秒)
+        min_interval: 最小轮询间隔(秒)
+        max_interval: 最大轮询间隔(秒)
+
+    Yields:
+        dict: 单台实例的执行结果，超时仍未结束的实例以status="Timeout"产出
+    """
+    deadline = time.monotonic() + timeout
+    reported = set()
+    pending = {}
+    interval = min_interval
+    active = list(invoke_ids)
+
+    while active and time.monotonic() < deadline:
+        progressed = False
+        for invoke_id in list(active):
+            results = api.get_invocation_results(invoke_id, region_id)
+            if results is None:
+                continue
+            finished = True
+            for result in results:
+                if result["status"] in FINISHED_STATUSES:
+                    if result["instance_id"] not in reported:
+                        reported.add(result["instance_id"])
+                        pending.pop(result["instance_id"], None)
+                        progressed = True
+                        yield result
+                else:
+                    finished = False
+                    pending[result["instance_id"]] = result
+            if finished and results:
+                active.remove(invoke_id)
+
+        if not active:
+            break
+        interval = min_interval if progressed else min(interval * 1.5, max_interval)
+        time.sleep(min(interval, max(0, deadline - time.monotonic())))
+
+    for instance_id, result in pending.items():
+        if instance_id not in reported:
+            yield dict(result, status="Timeout")
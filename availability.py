@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+库存模块，并发查询各可用区的实例规格库存，生成可用区 x 规格的库存矩阵
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import TTLCache
+
+# 有库存的状态
+IN_STOCK = ("WithStock", "Available")
+
+
+class StockMatrix:
+    """
+    可用区库存矩阵，结果按(区域, 可用区, 规格, 竞价策略)短时间缓存
+    """
+
+    def __init__(self, api, ttl=60, max_workers=8):
+        """
+        Args:
+            api: AliyunAPI实例
+            ttl: 库存缓存时间(秒)，库存变化较快，不宜过长
+            max_workers: 最大并发查询数
+        """
+        self.api = api
+        self.cache = TTLCache(ttl)
+        self.max_workers = max_workers
+
+    def query(self, region_id, zones, instance_types, spot_strategy=None):
+        """
+        查询库存矩阵
+
+        Args:
+            region_id: 区域ID
+            zones: 可用区ID列表
+            instance_types: 实例规格列表
+            spot_strategy: 竞价策略，NoSpot或为空时查询普通按量付费库存
+
+        Returns:
+            dict: {可用区: {规格: 库存状态}}，查询失败的为None，不售卖的为"NotOnSale"
+        """
+        if spot_strategy == "NoSpot":
+            spot_strategy = None
+        cells = [(zone, t) for zone in dict.fromkeys(zones) for t in instance_types]
+
+        def load(cell):
+            zone, instance_type = cell
+            key = (region_id, zone, instance_type, spot_strategy)
+
+            def fetch():
+                stock = self.api.get_available_resource(
+                    zone,
+                    instance_type,
+                    spot_strategy=spot_strategy,
+                    region_id=region_id,
+                )
+                if stock is None:
+                    return None
+                return stock.get(instance_type, "NotOnSale")
+
+            return cell, self.cache.get_or_load(key, fetch)
+
+        matrix = {zone: {} for zone in zones}
+        if not cells:
+            return matrix
+        workers = min(self.max_workers, len(cells))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for (zone, instance_type), status in executor.map(load, cells):
+                matrix[zone][instance_type] = status
+        return matrix
+
+
+def in_stock(matrix, zone, instance_type):
+    return matrix.get(zone, {}).get(instance_type) in IN_STOCK
+
+
+def rank_v_switches(matrix, vswitches, instance_type):
+    """
+    按库存对交换机排序，有库存的可用区排在前面，未知库存其次，无库存最后
+
+    Args:
+        matrix: StockMatrix.query()返回的矩阵
+        vswitches: [[vsw_id, zone_id, vpc_id], ...]
+        instance_type: 实例规格
+
+    Returns:
+        list: 排序后的交换机列表
+    """
+
+    def order(vsw):
+        status = matrix.get(vsw[1], {}).get(instance_type)
+        if status in IN_STOCK:
+            return 0
+        if status is None:
+            return 1
+        return 2
+
+    return sorted(vswitches, key=order)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+对比实例列表的转换耗时和内存：原先逐个方法手写的转换代码 vs converter 声明式转换(全部字段/投影)
+
+运行: python -m benchmarks.bench_converter [实例数]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from benchmarks.fixtures import sdk_instances
+from converter import INSTANCE
+
+
+def legacy_convert(items):
+    """
+    重构前 _describe_instances_page 中的转换代码
+    """
+    instances = []
+    for item in items:
+        public_ip = None
+        if item.eip_address and item.eip_address.ip_address:
+            public_ip = item.eip_address.ip_address
+        elif item.public_ip_address and item.public_ip_address.ip_address:
+            public_ip = item.public_ip_address.ip_address[0]
+        os_name = getattr(item, "os_name", getattr(item, "OSName", "Unknown"))
+        instances.append(
+            {
+                "instance_id": item.instance_id,
+                "public_ip": public_ip,
+                "os_name": os_name,
+                "status": item.status,
+                "instance_type": getattr(item, "instance_type", None),
+                "zone_id": getattr(item, "zone_id", None),
+                "instance_charge_type": getattr(item, "instance_charge_type", None),
+                "spot_strategy": getattr(item, "spot_strategy", None),
+                "internet_charge_type": getattr(item, "internet_charge_type", None),
+                "internet_max_bandwidth_out": getattr(
+                    item, "internet_max_bandwidth_out", None
+                ),
+                "creation_time": getattr(item, "creation_time", None),
+            }
+        )
+    return instances
+
+
+def measure(convert, items, repeat=5):
+    """
+    Returns:
+        tuple: (最短耗时秒数, 结果占用的内存字节数)
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        convert(items)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    result = convert(items)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    items = sdk_instances(count)
+    cases = [
+        ("手写转换(全部字段)", legacy_convert),
+        ("Schema(全部字段)", INSTANCE.convert),
+        ("Schema(instance_id,status)", INSTANCE.project(["instance_id", "status"]).convert),
+        ("Schema(instance_id,public_ip)", INSTANCE.project(["instance_id", "public_ip"]).convert),
+    ]
+    print(f"{count} 台实例")
+    print(f"{'方式':<32}{'耗时(ms)':>12}{'内存(KiB)':>12}")
+    for name, convert in cases:
+        elapsed, size = measure(convert, items)
+        print(f"{name:<32}{elapsed * 1000:>12.1f}{size / 1024:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+性能测试用的合成数据
+
+sdk_* 函数构造与SDK响应模型属性相同的对象，用于测试响应转换；
+其余函数构造转换后的字典，用于测试表格渲染
+"""
+
+from types import SimpleNamespace
+
+ZONES = ("cn-hangzhou-h", "cn-hangzhou-i", "cn-hangzhou-j", "cn-hangzhou-k")
+STATUSES = ("Running", "Running", "Stopped", "Starting")
+FAMILIES = ("ecs.e", "ecs.c7", "ecs.g7", "ecs.r7", "ecs.gn7i")
+
+
+def sdk_instances(count):
+    """
+    DescribeInstancesResponseBodyInstancesInstance
+    """
+    items = []
+    for i in range(count):
+        has_eip = i % 5 == 0
+        items.append(
+            SimpleNamespace(
+                instance_id=f"i-bp1{i:017d}",
+                eip_address=SimpleNamespace(
+                    ip_address=f"120.55.{i // 256 % 256}.{i % 256}" if has_eip else None
+                ),
+                public_ip_address=SimpleNamespace(
+                    ip_address=[] if has_eip else [f"47.96.{i // 256 % 256}.{i % 256}"]
+                ),
+                os_name="Ubuntu  22.04 64位",
+                status=STATUSES[i % len(STATUSES)],
+                instance_type=f"{FAMILIES[i % len(FAMILIES)]}-c1m2.xlarge",
+                zone_id=ZONES[i % len(ZONES)],
+                instance_charge_type="PostPaid",
+                spot_strategy="SpotAsPriceGo" if i % 2 else "NoSpot",
+                internet_charge_type="PayByTraffic",
+                internet_max_bandwidth_out=100,
+                creation_time="2024-01-01T08:00Z",
+            )
+        )
+    return items
+
+
+def sdk_instance_types(count):
+    """
+    DescribeInstanceTypesResponseBodyInstanceTypesInstanceType
+    """
+    items = []
+    for i in range(count):
+        local = i % 7 == 0
+        items.append(
+            SimpleNamespace(
+                instance_type_id=f"{FAMILIES[i % len(FAMILIES)]}-c1m{i % 8 + 1}.{i}xlarge",
+                cpu_core_count=2 ** (i % 7),
+                memory_size=float(2 ** (i % 9)),
+                gpu_amount=1 if i % 11 == 0 else 0,
+                gpu_spec="NVIDIA A10" if i % 11 == 0 else None,
+                local_storage_category="local_ssd_pro" if local else None,
+                local_storage_amount=2 if local else None,
+                local_storage_size=1788 if local else None,
+                eni_quantity=i % 8 + 1,
+                eni_private_ip_address_quantity=(i % 8 + 1) * 6,
+                instance_type_family=FAMILIES[i % len(FAMILIES)],
+            )
+        )
+    return items
+
+
+def sdk_permissions(count):
+    """
+    DescribeSecurityGroupAttributeResponseBodyPermissionsPermission
+    """
+    return [
+        SimpleNamespace(
+            port_range="-1/-1" if i % 50 == 0 else f"{i % 65535 + 1}/{i % 65535 + 1}",
+            ip_protocol="ALL" if i % 50 == 0 else ("TCP", "UDP")[i % 2],
+            source_cidr_ip=f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}/32",
+            direction="ingress",
+            policy="Accept",
+        )
+        for i in range(count)
+    ]
+
+
+def sdk_price_body():
+    """
+    DescribePrice响应体
+    """
+    details = [
+        SimpleNamespace(resource=resource, trade_price=price)
+        for resource, price in (
+            ("instanceType", 0.0852),
+            ("systemDisk", 0.0125),
+            ("bandwidth", 0.0),
+            ("image", 0.0),
+        )
+    ]
+    rules = [SimpleNamespace(description="抢占式实例折扣")]
+    return SimpleNamespace(
+        price_info=SimpleNamespace(
+            price=SimpleNamespace(
+                trade_price=0.0977,
+                detail_infos=SimpleNamespace(detail_info=details),
+            ),
+            rules=SimpleNamespace(rule=rules),
+        )
+    )
+
+
+def response(**body):
+    """
+    SDK的 *_with_options 返回值
+    """
+    return SimpleNamespace(body=SimpleNamespace(request_id="bench", **body))
+
+
+def instances(count):
+    """
+    get_describe_instances返回的实例列表
+    """
+    from converter import INSTANCE
+
+    return INSTANCE.convert(sdk_instances(count))
+
+
+def instance_types(count):
+    """
+    get_describe_instance_types返回的数据
+    """
+    from converter import INSTANCE_TYPE
+
+    return {"instance_types": INSTANCE_TYPE.convert(sdk_instance_types(count))}
+
+
+def security_groups(count, rules_per_group=20):
+    """
+    get_all_describe_security_group_attribute返回的数据，共count条规则
+    """
+    groups = []
+    for start in range(0, count, rules_per_group):
+        rules = [
+            {
+                "PortRange": "all/all" if i % 50 == 0 else f"{i % 65535 + 1}/{i % 65535 + 1}",
+                "IpProtocol": "ALL" if i % 50 == 0 else ("TCP", "UDP")[i % 2],
+                "SourceCidrIp": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}/32",
+                "Direction": "ingress",
+                "Policy": "Accept",
+            }
+            for i in range(start, min(start + rules_per_group, count))
+        ]
+        groups.append(
+            {
+                "SecurityGroupId": f"sg-bp1{start:016d}",
+                "Description": "bench",
+                "VpcId": "vpc-bench",
+                "attribute": rules,
+            }
+        )
+    return groups
+
+
+def ledger(count):
+    """
+    PriceBook.build_ledger返回的费用清单
+    """
+    rows = [
+        {
+            "instance_id": inst["instance_id"],
+            "instance_type": inst["instance_type"],
+            "zone_id": inst["zone_id"],
+            "spot_strategy": inst["spot_strategy"],
+            "hourly": 0.0977,
+            "daily": 0.0977 * 24,
+        }
+        for inst in instances(count)
+    ]
+    return {
+        "rows": rows,
+        "hourly_total": 0.0977 * count,
+        "daily_total": 0.0977 * 24 * count,
+        "distinct_keys": len(FAMILIES) * 2,
+    }
+
+
+def instance_kwargs(count):
+    """
+    创建向导构造Instance时传入的参数
+    """
+    return [
+        {
+            "RegionId": "cn-hangzhou",
+            "ImageId": "ubuntu_22_04_x64_20G_alibase_20240101.vhd",
+            "InstanceType": f"{FAMILIES[i % len(FAMILIES)]}-c1m2.xlarge",
+            "Password": "Bench@123456",
+            "InternetMaxBandwidthOut": 100,
+            "SecurityGroupId": "sg-bench",
+            "VSwitchId": f"vsw-{i % 4}",
+            "SystemDiskCategory": "cloud_essd_entry",
+            "SystemDiskSize": 40,
+            "SpotStrategy": "SpotAsPriceGo",
+            "SpotDuration": 0,
+            "InternetChargeType": "PayByTraffic",
+            "HostName": f"vps-{i}",
+            "InstanceName": f"bench-{i}",
+            "Amount": 1,
+            "InstanceChargeType": "PostPaid",
+        }
+        for i in range(count)
+    ]
@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+并发压测：多个模拟操作员同时执行控制台的工作流，请求发往本地API替身
+
+每个操作员循环执行一轮会话: create -> wait -> query -> list -> price -> delete，
+各步骤调用与控制台命令相同的 AliyunAPI 方法、launch.wait_for_status、PriceBook 和表格渲染。
+结束后按工作流输出吞吐量、端到端延迟 p50/p99、每次工作流的API调用数和错误率。
+
+运行:
+    python -m benchmarks.loadtest --operators 20 --duration 30
+    python -m benchmarks.loadtest --operators 50 --rate 40 --latency lognormal:120ms:0.6 \\
+        --method-latency run_instances=lognormal:800ms:0.4 --error-rate 0.01
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+from benchmarks.standin import Latency, LocalCloud
+
+WORKFLOWS = ("create", "wait", "query", "list", "price", "delete")
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, q):
+    """
+    最近秩法百分位数，values需已排序
+    """
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, int(round(q / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+class Stats:
+    """
+    汇总各工作流的样本，多个操作员线程同时写入
+    """
+
+    def __init__(self):
+        self.samples = {name: [] for name in WORKFLOWS}
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def add(self, workflow, elapsed, counters, ok):
+        with self._lock:
+            self.samples[workflow].append(
+                (elapsed, counters["calls"], counters["throttled"], ok)
+            )
+
+    def session_done(self):
+        with self._lock:
+            self.sessions += 1
+
+    def report(self, wall_time):
+        """
+        Returns:
+            dict: 压测报告，rows为每个工作流的统计
+        """
+        rows = []
+        for name in WORKFLOWS:
+            samples = self.samples[name]
+            if not samples:
+                continue
+            latencies = sorted(s[0] for s in samples)
+            count = len(samples)
+            rows.append(
+                {
+                    "workflow": name,
+                    "count": count,
+                    "throughput": count / wall_time,
+                    "p50": percentile(latencies, 50),
+                    "p99": percentile(latencies, 99),
+                    "max": latencies[-1],
+                    "api_calls": sum(s[1] for s in samples) / count,
+                    "throttled": sum(s[2] for s in samples),
+                    "error_rate": sum(1 for s in samples if not s[3]) / count,
+                }
+            )
+        return {
+            "wall_time": wall_time,
+            "sessions": self.sessions,
+            "sessions_per_second": self.sessions / wall_time,
+            "rows": rows,
+        }
+
+
+class Operator(threading.Thread):
+    """
+    一个模拟操作员，截止时间前循环执行会话
+    """
+
+    def __init__(self, index, harness, deadline):
+        super().__init__(name=f"operator-{index}", daemon=True)
+        self.harness = harness
+        self.deadline = deadline
+
+    def run(self):
+        with self.harness.cloud.track(self.name):
+            self._loop()
+
+    def _loop(self):
+        while time.monotonic() < self.deadline:
+            if not self.harness.session():
+                # 创建失败(如被限流)时稍后重试，避免空转刷高请求量
+                time.sleep(self.harness.poll_interval)
+                continue
+            self.harness.stats.session_done()
+            if self.harness.think_time:
+                time.sleep(self.harness.think_time)
+
+
+class Harness:
+    """
+    压测执行器，所有操作员共用同一个AliyunAPI单例，与控制台中后台线程的情况相同
+    """
+
+    def __init__(
+        self, cloud, region_id="cn-hangzhou", poll_interval=0.5, timeout=60, think_time=0
+    ):
+        from api import AliyunAPI
+        from config import Config
+        from console import AliyunECSConsole
+        from pricing import LEDGER_FIELDS, PriceBook
+
+        self.cloud = cloud
+        self.region_id = region_id
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.think_time = think_time
+        self.config = Config(os.path.join(REPO_ROOT, "config.yml"))
+        self.api = AliyunAPI("local", "local")
+        self.api.set_cassette(cloud)
+        self.api.set_region(region_id)
+        self.console = AliyunECSConsole
+        self.price_book = PriceBook(self.api, self.config)
+        self.ledger_fields = LEDGER_FIELDS
+        self.stats = Stats()
+
+    def _instance(self):
+        from instance import Instance
+
+        return Instance(
+            RegionId=self.region_id,
+            ImageId=self.config.get_image_id(),
+            InstanceType=self.config.get_instance_type(),
+            Password="LoadTest@123",
+            InternetMaxBandwidthOut=self.config.get_internet_max_bandwidth_out(),
+            SecurityGroupId="sg-loadtest",
+            VSwitchId="vsw-loadtest",
+            SystemDiskCategory=self.config.get_system_disk_category(),
+            SystemDiskSize=self.config.get_system_disk_size(),
+            SpotStrategy=self.config.get_spot_strategy(),
+            InternetChargeType=self.config.get_internet_charge_type(),
+            InstanceChargeType=self.config.get_instance_charge_type(),
+            HostName="loadtest",
+            InstanceName="loadtest",
+            Amount=1,
+        )
+
+    def _step(self, workflow, func):
+        """
+        执行一个工作流并记录耗时、API调用数和是否成功
+
+        Returns:
+            工作流的返回值，失败时为None
+        """
+        self.cloud.reset_counters()
+        started = time.monotonic()
+        try:
+            result = func()
+        except Exception:
+            result = None
+        # 限流等错误被重试消化时工作流仍算成功，限流次数单独统计
+        self.stats.add(
+            workflow, time.monotonic() - started, self.cloud.counters(), bool(result)
+        )
+        return result
+
+    def session(self):
+        """
+        执行一轮会话，在操作员线程中调用
+
+        Returns:
+            bool: 实例是否创建成功，创建失败时不执行后续步骤
+        """
+        from launch import wait_for_status
+
+        api = self.api
+        instance_ids = self._step("create", lambda: api.run_instances(self._instance()))
+        if not instance_ids:
+            return False
+        instance_id = instance_ids[0]
+
+        self._step(
+            "wait",
+            lambda: all(
+                elapsed is not None
+                for elapsed in wait_for_status(
+                    api,
+                    self.region_id,
+                    instance_ids,
+                    timeout=self.timeout,
+                    interval=self.poll_interval,
+                ).values()
+            ),
+        )
+
+        def query():
+            status = api.get_instance_status(self.region_id, instance_id)
+            attribute = api.get_describe_instance_attribute(instance_id)
+            self.console.display_result_instances_table(attribute)
+            return status and attribute
+
+        self._step("query", query)
+
+        def list_instances():
+            instances = api.get_describe_instances(self.region_id)
+            self.console.display_instances_table(instances)
+            return instances
+
+        self._step("list", list_instances)
+
+        def price():
+            instances = api.get_describe_instances(
+                self.region_id, fields=self.ledger_fields
+            )
+            ledger = self.price_book.build_ledger(instances, self.region_id)
+            self.console.display_cost_table(ledger)
+            return bool(instances) and all(
+                row["hourly"] is not None for row in ledger["rows"]
+            )
+
+        self._step("price", price)
+
+        # 删除失败时下一轮list会看到残留实例，与真实场景一致
+        self._step("delete", lambda: api.delete_instance(instance_id))
+        return True
+
+    def run(self, operators, duration):
+        deadline = time.monotonic() + duration
+        started = time.monotonic()
+        threads = [Operator(i, self, deadline) for i in range(operators)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.stats.report(time.monotonic() - started)
+
+
+def format_report(report, cloud):
+    lines = [
+        f"耗时 {report['wall_time']:.1f}s，完成会话 {report['sessions']} 轮 "
+        f"({report['sessions_per_second']:.2f} 轮/秒)，{cloud.summary()}，"
+        f"残留实例 {len(cloud.instances)} 台",
+        f"{'工作流':<10}{'次数':>8}{'次/秒':>9}{'p50(ms)':>10}{'p99(ms)':>10}"
+        f"{'max(ms)':>10}{'API/次':>9}{'限流':>7}{'错误率':>9}",
+    ]
+    for row in report["rows"]:
+        lines.append(
+            f"{row['workflow']:<10}{row['count']:>8}{row['throughput']:>9.2f}"
+            f"{row['p50'] * 1000:>10.0f}{row['p99'] * 1000:>10.0f}{row['max'] * 1000:>10.0f}"
+            f"{row['api_calls']:>9.1f}{row['throttled']:>7}{row['error_rate']:>9.1%}"
+        )
+    return "\n".join(lines)
+
+
+def parse_method_latency(items):
+    result = {}
+    for item in items or []:
+        method, _, spec = item.partition("=")
+        if not spec:
+            raise argparse.ArgumentTypeError(f"格式应为 方法名=分布: {item}")
+        result[method.strip()] = Latency.parse(spec)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECS控制台并发压测")
+    parser.add_argument("--operators", type=int, default=10, help="并发操作员数 (默认 10)")
+    parser.add_argument("--duration", type=float, default=30, help="压测时长(秒) (默认 30)")
+    parser.add_argument(
+        "--latency",
+        default="lognormal:80ms:0.5",
+        help="默认API延迟分布，fixed|uniform|lognormal:中位数:离散度 (默认 %(default)s)",
+    )
+    parser.add_argument(
+        "--method-latency",
+        action="append",
+        metavar="METHOD=DIST",
+        help="按SDK方法名指定延迟分布，可重复，如 run_instances=lognormal:800ms:0.4",
+    )
+    parser.add_argument("--rate", type=float, help="API限流，每秒请求数 (默认不限流)")
+    parser.add_argument("--burst", type=float, help="限流令牌桶容量 (默认等于rate)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机错误概率")
+    parser.add_argument("--boot-time", type=float, default=2.0, help="实例启动耗时(秒)")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="等待Running的轮询间隔(秒)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="每轮会话之间的间隔(秒)")
+    parser.add_argument("--seed", type=int, help="随机数种子")
+    parser.add_argument("--json", metavar="FILE", help="把报告写入JSON文件")
+    args = parser.parse_args(argv)
+
+    cloud = LocalCloud(
+        latency=Latency.parse(args.latency),
+        method_latency=parse_method_latency(args.method_latency),
+        rate=args.rate,
+        burst=args.burst,
+        error_rate=args.error_rate,
+        boot_time=args.boot_time,
+        seed=args.seed,
+    )
+    harness = Harness(
+        cloud, poll_interval=args.poll_interval, think_time=args.think_time
+    )
+    print(
+        f"{args.operators} 个操作员，持续 {args.duration:g}s，延迟 {cloud.latency}"
+        + (f"，限流 {args.rate:g}/s" if args.rate else ""),
+        flush=True,
+    )
+    # AliyunAPI在出错时直接打印，压测期间丢弃这些输出
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        report = harness.run(args.operators, args.duration)
+    print(format_report(report, cloud))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
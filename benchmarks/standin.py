@@ -0,0 +1,372 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+本地API替身：在内存中模拟ECS/BSS接口，可注入延迟分布、限流和随机错误
+
+替身实现了与cassette.Recorder/Player相同的wrap()接口，通过 AliyunAPI.set_cassette()
+替换SDK客户端，AliyunAPI中的请求构造、响应转换和错误处理代码保持不变
+"""
+
+import contextlib
+import contextvars
+import itertools
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from Tea.exceptions import TeaException
+
+
+def _error(code, message):
+    return TeaException({"code": code, "message": message, "data": None})
+
+
+class Latency:
+    """
+    延迟分布
+
+    Args:
+        kind: fixed(固定)、uniform(均匀分布，low~high)、lognormal(对数正态，median为中位数)
+        median: 中位数或固定值(秒)
+        spread: uniform时为上下浮动比例，lognormal时为sigma
+    """
+
+    def __init__(self, kind="lognormal", median=0.05, spread=0.5):
+        if kind not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"未知的延迟分布: {kind}")
+        self.kind = kind
+        self.median = median
+        self.spread = spread
+
+    @classmethod
+    def parse(cls, text):
+        """
+        解析 "lognormal:80ms:0.5"、"fixed:20ms"、"uniform:0.1:0.5" 形式的描述
+        """
+        parts = text.split(":")
+        median = parts[1] if len(parts) > 1 else "50ms"
+        if median.endswith("ms"):
+            median = float(median[:-2]) / 1000
+        else:
+            median = float(median)
+        spread = float(parts[2]) if len(parts) > 2 else 0.5
+        return cls(parts[0], median, spread)
+
+    def sample(self, rng):
+        if self.kind == "fixed":
+            return self.median
+        if self.kind == "uniform":
+            return rng.uniform(
+                self.median * (1 - self.spread), self.median * (1 + self.spread)
+            )
+        return rng.lognormvariate(0, self.spread) * self.median
+
+    def __str__(self):
+        return f"{self.kind}:{self.median * 1000:g}ms:{self.spread:g}"
+
+
+class TokenBucket:
+    """
+    令牌桶限流，模拟账号级别的API QPS上限
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Returns:
+            bool: 是否获得令牌，无令牌时不等待
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class _Service:
+    """
+    一个服务(ecs/bss)的SDK客户端替身，方法名与SDK相同
+    """
+
+    def __init__(self, cloud, service):
+        self._cloud = cloud
+        self._service = service
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        handler = getattr(self._cloud, f"_{self._service}_{name}", None)
+        return lambda *args, **kwargs: self._cloud.call(name, handler, args)
+
+
+class LocalCloud:
+    """
+    内存中的ECS替身
+
+    实例创建后处于Pending，boot_time秒后变为Running；
+    每次调用按方法的延迟分布睡眠，超出令牌桶速率时返回Throttling.User错误。
+    调用次数和错误数按统计令牌汇总，供压测按工作流统计：通过track()设置令牌，
+    未设置时以线程为单位统计。令牌保存在contextvars中，复制调用方上下文提交任务的
+    线程池(如PriceBook)中的调用也计入同一个令牌
+    """
+
+    replaying = True
+
+    def __init__(
+        self,
+        latency=None,
+        method_latency=None,
+        rate=None,
+        burst=None,
+        error_rate=0.0,
+        boot_time=2.0,
+        hourly_price=0.0977,
+        seed=None,
+    ):
+        """
+        Args:
+            latency: 默认延迟分布
+            method_latency: 按SDK方法名指定的延迟分布，如 {"run_instances": Latency(...)}
+            rate: 每秒允许的请求数，为空时不限流
+            burst: 令牌桶容量，默认等于rate
+            error_rate: 随机返回InternalError的概率
+            boot_time: 实例从Pending到Running的时间(秒)
+            hourly_price: DescribePrice返回的小时价格
+            seed: 随机数种子
+        """
+        self.latency = latency or Latency()
+        self.method_latency = method_latency or {}
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.error_rate = error_rate
+        self.boot_time = boot_time
+        self.hourly_price = hourly_price
+        self.instances = {}
+        self.calls = 0
+        self.throttled = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._token = contextvars.ContextVar(f"standin-token-{id(self)}", default=None)
+        self._usage = {}
+
+    def wrap(self, service, client):
+        return _Service(self, service)
+
+    def summary(self):
+        return f"本地替身共处理 {self.calls} 次调用，限流 {self.throttled} 次"
+
+    def token(self):
+        """
+        当前上下文的统计令牌，未通过track()设置时为线程ID
+        """
+        return self._token.get() or threading.get_ident()
+
+    @contextlib.contextmanager
+    def track(self, token):
+        """
+        代码块内的调用计入token，包括复制了当前上下文的工作线程中的调用
+        """
+        reset = self._token.set(token)
+        try:
+            yield
+        finally:
+            self._token.reset(reset)
+
+    def counters(self, token=None):
+        """
+        令牌的调用统计快照，默认为当前线程的令牌；压测在每个工作流开始时调用reset_counters()清零
+        """
+        token = self.token() if token is None else token
+        with self._lock:
+            return dict(self._usage.get(token) or self._new_counters())
+
+    def reset_counters(self, token=None):
+        token = self.token() if token is None else token
+        with self._lock:
+            self._usage[token] = self._new_counters()
+
+    @staticmethod
+    def _new_counters():
+        return {"calls": 0, "errors": 0, "throttled": 0}
+
+    def _count(self, token, **increments):
+        with self._lock:
+            counters = self._usage.setdefault(token, self._new_counters())
+            for name, value in increments.items():
+                counters[name] += value
+
+    def call(self, method, handler, args):
+        token = self.token()
+        with self._lock:
+            self.calls += 1
+            delay = self.method_latency.get(method, self.latency).sample(self._rng)
+            failed = self._rng.random() < self.error_rate
+        self._count(token, calls=1)
+
+        if self.bucket is not None and not self.bucket.acquire():
+            self._count(token, errors=1, throttled=1)
+            with self._lock:
+                self.throttled += 1
+            raise _error("Throttling.User", "Request was denied due to user flow control.")
+        time.sleep(delay)
+        if failed:
+            self._count(token, errors=1)
+            raise _error("InternalError", "The request processing has failed due to some unknown error.")
+        if handler is None:
+            self._count(token, errors=1)
+            raise _error("UnsupportedOperation", f"本地替身不支持 {method}")
+        request = args[0] if args else None
+        try:
+            return handler(request)
+        except TeaException:
+            self._count(token, errors=1)
+            raise
+
+    # ---------- 内部状态 ----------
+
+    def _status(self, inst):
+        if inst["status"] == "Pending" and time.monotonic() >= inst["ready_at"]:
+            inst["status"] = "Running"
+        return inst["status"]
+
+    def _model(self, instance_id, inst):
+        number = inst["number"]
+        return SimpleNamespace(
+            instance_id=instance_id,
+            eip_address=SimpleNamespace(ip_address=None),
+            public_ip_address=SimpleNamespace(
+                ip_address=[f"47.96.{number // 256 % 256}.{number % 256}"]
+            ),
+            os_name="Ubuntu  22.04 64位",
+            status=self._status(inst),
+            instance_type=inst["instance_type"],
+            zone_id="cn-hangzhou-k",
+            instance_charge_type="PostPaid",
+            spot_strategy=inst["spot_strategy"],
+            internet_charge_type="PayByTraffic",
+            internet_max_bandwidth_out=inst["bandwidth"],
+            creation_time=inst["creation_time"],
+        )
+
+    @staticmethod
+    def _response(**body):
+        return SimpleNamespace(
+            body=SimpleNamespace(request_id=f"local-{time.monotonic_ns()}", **body)
+        )
+
+    # ---------- ECS ----------
+
+    def _ecs_run_instances(self, request):
+        ids = []
+        with self._lock:
+            for _ in range(int(request.amount or 1)):
+                number = next(self._ids)
+                instance_id = f"i-lt{number:018d}"
+                self.instances[instance_id] = {
+                    "number": number,
+                    "status": "Pending",
+                    "ready_at": time.monotonic() + self.boot_time,
+                    "instance_type": request.instance_type,
+                    "spot_strategy": request.spot_strategy or "NoSpot",
+                    "bandwidth": request.internet_max_bandwidth_out,
+                    "creation_time": time.strftime("%Y-%m-%dT%H:%MZ", time.gmtime()),
+                }
+                ids.append(instance_id)
+        return self._response(instance_id_sets=SimpleNamespace(instance_id_set=ids))
+
+    _ecs_run_instances_with_options = _ecs_run_instances
+
+    def _ecs_describe_instance_status_with_options(self, request):
+        with self._lock:
+            wanted = request.instance_id or list(self.instances)
+            items = [
+                SimpleNamespace(instance_id=i, status=self._status(self.instances[i]))
+                for i in wanted
+                if i in self.instances
+            ]
+        return self._response(
+            instance_statuses=SimpleNamespace(instance_status=items),
+            total_count=len(items),
+            page_number=request.page_number or 1,
+            page_size=request.page_size or len(items),
+        )
+
+    def _ecs_describe_instances_with_options(self, request):
+        page_number = request.page_number or 1
+        page_size = request.page_size or 10
+        with self._lock:
+            if request.instance_ids:
+                ids = [i for i in json.loads(request.instance_ids) if i in self.instances]
+            else:
+                ids = list(self.instances)
+            total = len(ids)
+            start = (page_number - 1) * page_size
+            items = [
+                self._model(i, self.instances[i]) for i in ids[start : start + page_size]
+            ]
+        return self._response(
+            instances=SimpleNamespace(instance=items), total_count=total
+        )
+
+    def _ecs_describe_instance_attribute_with_options(self, request):
+        with self._lock:
+            inst = self.instances.get(request.instance_id)
+            if inst is None:
+                raise _error("InvalidInstanceId.NotFound", "The specified InstanceId does not exist.")
+            model = self._model(request.instance_id, inst)
+        return SimpleNamespace(body=model)
+
+    def _ecs_delete_instance_with_options(self, request):
+        with self._lock:
+            if self.instances.pop(request.instance_id, None) is None:
+                raise _error("InvalidInstanceId.NotFound", "The specified InstanceId does not exist.")
+        return self._response()
+
+    def _ecs_delete_instances_with_options(self, request):
+        with self._lock:
+            for instance_id in request.instance_id or []:
+                self.instances.pop(instance_id, None)
+        return self._response()
+
+    def _ecs_describe_price_with_options(self, request):
+        price = SimpleNamespace(
+            trade_price=self.hourly_price,
+            detail_infos=SimpleNamespace(
+                detail_info=[
+                    SimpleNamespace(resource="instanceType", trade_price=self.hourly_price)
+                ]
+            ),
+        )
+        return self._response(
+            price_info=SimpleNamespace(price=price, rules=SimpleNamespace(rule=[]))
+        )
+
+    # ---------- BSS ----------
+
+    def _bss_query_account_balance(self, request):
+        return self._response(
+            data=SimpleNamespace(
+                available_amount="10,000.00",
+                available_cash_amount="10,000.00",
+                credit_amount="0.00",
+                mybank_credit_amount="0.00",
+                currency="CNY",
+            ),
+            code="200",
+            message="Successful!",
+            success=True,
+        )
@@ -0,0 +1,390 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+微基准测试套件：响应转换、表格渲染、Instance构造和配置加载
+
+运行:
+    python -m benchmarks.suite                 运行全部用例并与基线比较
+    python -m benchmarks.suite --save          运行并把结果写入基线
+    python -m benchmarks.suite -k convert -s 10,1000
+
+基线为JSON文件(默认 benchmarks/baseline.json)，记录每个用例每种规模的单次耗时；
+耗时比基线慢超过阈值(默认15%)的用例标记为回退，此时退出码为1。
+依赖的第三方库(SDK、tabulate)未安装时跳过对应用例
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+from benchmarks import fixtures
+
+SIZES = (10, 1000, 100000)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# 每个样本至少运行的时间(秒)，耗时短的用例循环多次后取平均
+MIN_SAMPLE_TIME = 0.1
+
+
+class Case:
+    """
+    一个基准用例
+
+    setup(size) 准备数据并返回被测的无参函数，只有被测函数计入耗时
+    """
+
+    def __init__(self, name, setup, sizes):
+        self.name = name
+        self.setup = setup
+        self.sizes = sizes
+
+
+CASES = []
+
+
+def case(name, sizes=SIZES):
+    """
+    注册基准用例，sizes为None表示与数据规模无关，只运行一次
+    """
+
+    def decorator(setup):
+        CASES.append(Case(name, setup, sizes))
+        return setup
+
+    return decorator
+
+
+class CannedClient:
+    """
+    返回固定响应的ECS客户端，只用于测试响应转换，不发起网络请求
+    """
+
+    def __init__(self, response):
+        self.response = response
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.response
+
+
+def _api(response):
+    """
+    构造使用固定响应的AliyunAPI，跳过单例和客户端初始化
+    """
+    from api import AliyunAPI
+
+    api = object.__new__(AliyunAPI)
+    api.region_id = "cn-hangzhou"
+    api.ecs_client = CannedClient(response)
+    return api
+
+
+# ---------- 响应转换 ----------
+
+
+@case("convert.instances")
+def _(size):
+    from converter import INSTANCE
+
+    items = fixtures.sdk_instances(size)
+    return lambda: INSTANCE.convert(items)
+
+
+@case("convert.instances[id,status]")
+def _(size):
+    from converter import INSTANCE
+
+    items = fixtures.sdk_instances(size)
+    schema = INSTANCE.project(["instance_id", "status"])
+    return lambda: schema.convert(items)
+
+
+@case("convert.instance_types")
+def _(size):
+    from converter import INSTANCE_TYPE
+
+    items = fixtures.sdk_instance_types(size)
+    return lambda: INSTANCE_TYPE.convert(items)
+
+
+@case("api.instances")
+def _(size):
+    from types import SimpleNamespace
+
+    api = _api(
+        fixtures.response(
+            instances=SimpleNamespace(instance=fixtures.sdk_instances(size)),
+            total_count=size,
+        )
+    )
+    return lambda: api._describe_instances_page(None, 1, page_size=size)
+
+
+@case("api.instance_types")
+def _(size):
+    from types import SimpleNamespace
+
+    api = _api(
+        fixtures.response(
+            instance_types=SimpleNamespace(
+                instance_type=fixtures.sdk_instance_types(size)
+            ),
+            next_token=None,
+        )
+    )
+    return api.get_describe_instance_types
+
+
+@case("api.security_group_rules")
+def _(size):
+    from types import SimpleNamespace
+
+    api = _api(
+        fixtures.response(
+            permissions=SimpleNamespace(permission=fixtures.sdk_permissions(size))
+        )
+    )
+    return lambda: api.get_describe_security_group_attribute(None, "sg-bench")
+
+
+@case("api.prices")
+def _(size):
+    from types import SimpleNamespace
+
+    api = _api(SimpleNamespace(body=fixtures.sdk_price_body()))
+
+    def run():
+        for _ in range(size):
+            api.get_describe_price(InstanceType="ecs.e-c1m2.xlarge")
+
+    return run
+
+
+# ---------- 表格渲染 ----------
+
+
+def _console():
+    from console import AliyunECSConsole
+
+    return AliyunECSConsole
+
+
+@case("render.instances")
+def _(size):
+    console = _console()
+    data = fixtures.instances(size)
+    return lambda: console.display_instances_table(data)
+
+
+@case("render.instance_types")
+def _(size):
+    console = _console()
+    data = fixtures.instance_types(size)
+
+    def run():
+        # 该方法直接打印表格
+        with contextlib.redirect_stdout(io.StringIO()):
+            console.display_instance_types_table(data)
+
+    return run
+
+
+@case("render.security_groups")
+def _(size):
+    console = _console()
+    data = fixtures.security_groups(size)
+    return lambda: console.display_security_groups_table(data)
+
+
+@case("render.cost")
+def _(size):
+    console = _console()
+    data = fixtures.ledger(size)
+    return lambda: console.display_cost_table(data)
+
+
+# ---------- 其他 ----------
+
+
+@case("instance.construct")
+def _(size):
+    from instance import Instance
+
+    kwargs = fixtures.instance_kwargs(size)
+    return lambda: [Instance(**item) for item in kwargs]
+
+
+@case("config.load", sizes=None)
+def _(size):
+    from config import Config
+
+    path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.yml")
+    return lambda: Config(path)
+
+
+def measure(func, repeat=7):
+    """
+    Returns:
+        float: 单次运行的最短耗时(秒)
+    """
+    # 先运行一次作为预热，并确定每个样本的循环次数
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    loops = max(1, int(MIN_SAMPLE_TIME / elapsed)) if elapsed > 0 else 1000
+    if elapsed > 1:
+        repeat = min(repeat, 3)
+
+    # 与timeit相同，计时期间关闭垃圾回收，避免回收时机不同带来的抖动
+    best = elapsed
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(loops):
+                func()
+            best = min(best, (time.perf_counter() - started) / loops)
+    finally:
+        if enabled:
+            gc.enable()
+    return best
+
+
+def run(cases, sizes):
+    """
+    Returns:
+        tuple: (results, skipped)
+            results: {"用例/规模": 耗时秒数}
+            skipped: {用例名: 原因}
+    """
+    results = {}
+    skipped = {}
+    for item in cases:
+        for size in item.sizes or (None,):
+            if size is not None and size not in sizes:
+                continue
+            key = item.name if size is None else f"{item.name}/{size}"
+            try:
+                func = item.setup(size)
+            except ImportError as e:
+                skipped[item.name] = f"缺少依赖: {e.name or e}"
+                break
+            results[key] = measure(func)
+            print(f"{key:<40}{format_time(results[key]):>12}", flush=True)
+    return results, skipped
+
+
+def format_time(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f}us"
+    if seconds < 1:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds:.3f}s"
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    """
+    合并写入基线，未运行的用例保留原有记录
+    """
+    baseline = load_baseline(path) or {"results": {}}
+    baseline["results"].update(results)
+    baseline["python"] = platform.python_version()
+    baseline["machine"] = platform.machine()
+    baseline["updated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def compare(results, baseline, threshold):
+    """
+    Returns:
+        list: [(用例, 基线耗时, 当前耗时, 比值, 结论)]，结论为 regression/faster/same/new
+    """
+    rows = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            rows.append((key, None, current, None, "new"))
+            continue
+        ratio = current / previous
+        if ratio > 1 + threshold:
+            verdict = "regression"
+        elif ratio < 1 - threshold:
+            verdict = "faster"
+        else:
+            verdict = "same"
+        rows.append((key, previous, current, ratio, verdict))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ECS控制台微基准测试")
+    parser.add_argument("-k", "--filter", help="只运行名称包含该字符串的用例")
+    parser.add_argument(
+        "-s",
+        "--sizes",
+        default=",".join(str(s) for s in SIZES),
+        help="数据规模，逗号分隔 (默认 %(default)s)",
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件路径")
+    parser.add_argument(
+        "--threshold", type=float, default=0.15, help="判定回退的耗时增幅 (默认 0.15)"
+    )
+    parser.add_argument("--save", action="store_true", help="把本次结果写入基线")
+    args = parser.parse_args(argv)
+
+    sizes = {int(s) for s in args.sizes.split(",") if s}
+    cases = [c for c in CASES if not args.filter or args.filter in c.name]
+    results, skipped = run(cases, sizes)
+    for name, reason in skipped.items():
+        print(f"{name:<40}{'跳过':>10}  {reason}")
+
+    baseline = load_baseline(args.baseline)
+    regressions = []
+    if baseline:
+        print(f"\n与基线比较 ({baseline.get('updated_at')}, 阈值 {args.threshold:.0%}):")
+        labels = {
+            "regression": "\033[1;31m回退\033[0m",
+            "faster": "\033[1;32m提升\033[0m",
+            "same": "持平",
+            "new": "新增",
+        }
+        for key, previous, current, ratio, verdict in compare(
+            results, baseline["results"], args.threshold
+        ):
+            before = format_time(previous) if previous is not None else "-"
+            change = f"{ratio - 1:+.1%}" if ratio is not None else ""
+            print(
+                f"{key:<40}{before:>12}{format_time(current):>12}{change:>9}  {labels[verdict]}"
+            )
+            if verdict == "regression":
+                regressions.append(key)
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print(f"\n已写入基线: {args.baseline}")
+    if regressions:
+        print(f"\n\033[1;31m{len(regressions)} 个用例性能回退\033[0m")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+缓存模块，提供线程安全的TTL缓存和本地磁盘缓存
+"""
+
+import json
+import os
+import threading
+import time
+
+
+class TTLCache:
+    """
+    带过期时间的内存缓存，可在多个线程之间共享
+    """
+
+    def __init__(self, ttl=300):
+        """
+        Args:
+            ttl: 默认过期时间(秒)
+        """
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        获取未过期的缓存值，不存在或已过期时返回default
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl=None):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 缓存值
+            ttl: 过期时间(秒)，为空时使用默认值
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        获取缓存值，未命中时调用loader加载并缓存
+        loader返回None时不写入缓存，以便下次重试
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = loader()
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key=None):
+        """
+        删除指定缓存，key为空时清空全部缓存
+        """
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+
+class DiskCache:
+    """
+    基于JSON文件的本地磁盘缓存，每个键对应一个文件
+    """
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory: 缓存目录，不存在时自动创建
+        """
+        self.directory = directory
+
+    def _path(self, key):
+        safe_key = "".join(c if c.isalnum() or c in "-_." else "_" for c in key)
+        return os.path.join(self.directory, f"{safe_key}.json")
+
+    def get(self, key, ttl=None):
+        """
+        读取缓存，文件不存在、损坏或超过ttl秒时返回None
+        """
+        path = self._path(key)
+        try:
+            if ttl is not None and time.time() - os.path.getmtime(path) > ttl:
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def mtime(self, key):
+        """
+        缓存的写入时间(epoch秒)，不存在时返回None
+        """
+        try:
+            return os.path.getmtime(self._path(key))
+        except OSError:
+            return None
+
+    def set(self, key, value):
+        """
+        原子写入缓存
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+API流量录制/回放模块
+
+录制时记录每次SDK调用的请求、响应(或错误)和耗时，密码等敏感字段脱敏后写入gzip压缩的JSON Lines文件；
+回放时按请求匹配录制的响应，不访问网络，可保留原始耗时或按比例缩放(0为不等待)。
+
+查看录制文件的统计: python cassette.py <文件>
+"""
+
+import gzip
+import importlib
+import json
+import sys
+import threading
+import time
+import zlib
+from collections import deque
+
+from Tea.exceptions import TeaException
+
+FORMAT_VERSION = 1
+
+REDACTED = "******"
+
+# 键名(忽略大小写、下划线和连字符)包含这些字符串的字段会被脱敏
+SECRET_KEYS = (
+    "password",
+    "secret",
+    "accesskey",
+    "securitytoken",
+    "userdata",
+    "authorization",
+    "signature",
+)
+
+
+class CassetteMiss(Exception):
+    """
+    回放时找不到与请求匹配的录制记录
+    """
+
+
+def redact(value):
+    """
+    递归替换字典中的敏感字段
+    """
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            name = str(key).lower().replace("_", "").replace("-", "")
+            if item is not None and any(secret in name for secret in SECRET_KEYS):
+                result[key] = REDACTED
+            else:
+                result[key] = redact(item)
+        return result
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def _request_map(args, kwargs):
+    """
+    取出SDK调用的请求对象并转换为字典，RuntimeOptions不参与匹配
+    """
+    for arg in list(args) + list(kwargs.values()):
+        if hasattr(arg, "to_map") and type(arg).__name__ != "RuntimeOptions":
+            return redact(arg.to_map())
+    return None
+
+
+def _request_key(request):
+    return json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def read_cassette(path):
+    """
+    读取录制文件
+
+    Returns:
+        tuple: (header, interactions)，录制进程异常退出导致文件末尾不完整时忽略最后一段
+    """
+    header = None
+    interactions = []
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if header is None and "version" in record:
+                    header = record
+                else:
+                    interactions.append(record)
+    except (EOFError, zlib.error, gzip.BadGzipFile):
+        pass
+    return header, interactions
+
+
+class RecordingClient:
+    """
+    SDK客户端代理，调用原客户端并把交互写入Recorder
+    """
+
+    def __init__(self, client, service, recorder):
+        self._client = client
+        self._service = service
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            started = time.monotonic()
+            try:
+                response = attr(*args, **kwargs)
+            except Exception as e:
+                self._recorder.record(
+                    self._service,
+                    name,
+                    _request_map(args, kwargs),
+                    error=e,
+                    elapsed=time.monotonic() - started,
+                )
+                raise
+            self._recorder.record(
+                self._service,
+                name,
+                _request_map(args, kwargs),
+                response=response,
+                elapsed=time.monotonic() - started,
+            )
+            return response
+
+        return call
+
+
+class Recorder:
+    """
+    录制API流量
+
+    多个线程(后台预取、余额监控等)可以同时调用，写入时加锁；
+    文件在close()时写完gzip尾部，控制台退出时自动调用
+    """
+
+    replaying = False
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._write(
+            {
+                "version": FORMAT_VERSION,
+                "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        )
+
+    def wrap(self, service, client):
+        return RecordingClient(client, service, self)
+
+    def record(self, service, method, request, response=None, error=None, elapsed=0.0):
+        interaction = {
+            "service": service,
+            "method": method,
+            "request": request,
+            "elapsed": round(elapsed, 6),
+        }
+        if error is not None:
+            interaction["error"] = {
+                "type": type(error).__name__,
+                "code": getattr(error, "code", None),
+                "message": getattr(error, "message", None) or str(error),
+                "data": redact(getattr(error, "data", None)),
+            }
+        else:
+            cls = type(response)
+            interaction["response"] = {
+                "class": f"{cls.__module__}.{cls.__name__}",
+                "map": redact(response.to_map()) if hasattr(response, "to_map") else None,
+            }
+        with self._lock:
+            self._write(interaction)
+            self.count += 1
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def summary(self):
+        return f"已录制 {self.count} 次API调用到 {self.path}"
+
+
+class ReplayClient:
+    """
+    SDK客户端替身，所有调用由Player返回录制的响应
+    """
+
+    def __init__(self, service, player):
+        self._service = service
+        self._player = player
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._player.play(
+            self._service, name, _request_map(args, kwargs)
+        )
+
+
+class Player:
+    """
+    回放API流量
+
+    优先返回请求完全相同的记录，按录制顺序依次返回；同一请求的记录用完后
+    重复返回最后一条(如轮询实例状态)。请求中含有当前时间等每次不同的参数时，
+    按录制顺序返回同一方法中尚未使用的记录
+    """
+
+    replaying = True
+
+    def __init__(self, path, latency_scale=1.0):
+        """
+        Args:
+            path: 录制文件路径
+            latency_scale: 录制耗时的缩放比例，1为保留原始耗时，0为不等待
+        """
+        self.path = path
+        self.latency_scale = latency_scale
+        self.header, self.interactions = read_cassette(path)
+        if self.header is None:
+            raise ValueError(f"无效的录制文件: {path}")
+        self.played = 0
+        self.misses = 0
+        self.recorded_latency = 0.0
+        self._lock = threading.Lock()
+        self._used = [False] * len(self.interactions)
+        self._exact = {}
+        self._by_method = {}
+        for index, item in enumerate(self.interactions):
+            method = (item["service"], item["method"])
+            key = method + (_request_key(item["request"]),)
+            self._exact.setdefault(key, deque()).append(index)
+            self._by_method.setdefault(method, deque()).append(index)
+        self._last = {}
+
+    def wrap(self, service, client):
+        return ReplayClient(service, self)
+
+    def _next_unused(self, queue):
+        while queue:
+            index = queue.popleft()
+            if not self._used[index]:
+                return index
+        return None
+
+    def _find(self, service, method, request):
+        method_key = (service, method)
+        key = method_key + (_request_key(request),)
+        index = self._next_unused(self._exact.get(key, deque()))
+        if index is None:
+            index = self._last.get(key)
+        if index is None:
+            index = self._next_unused(self._by_method.get(method_key, deque()))
+        if index is None:
+            raise CassetteMiss(f"录制文件中没有 {service}.{method} 的记录")
+        self._used[index] = True
+        self._last[key] = index
+        return self.interactions[index]
+
+    def play(self, service, method, request):
+        with self._lock:
+            try:
+                interaction = self._find(service, method, request)
+            except CassetteMiss:
+                self.misses += 1
+                raise
+            self.played += 1
+            self.recorded_latency += interaction["elapsed"]
+
+        if self.latency_scale > 0:
+            time.sleep(interaction["elapsed"] * self.latency_scale)
+
+        error = interaction.get("error")
+        if error is not None:
+            if error["code"] is not None:
+                raise TeaException(
+                    {
+                        "code": error["code"],
+                        "message": error["message"],
+                        "data": error["data"],
+                    }
+                )
+            raise Exception(error["message"])
+
+        response = interaction["response"]
+        module_name, _, class_name = response["class"].rpartition(".")
+        cls = getattr(importlib.import_module(module_name), class_name)
+        return cls().from_map(response["map"])
+
+    def summary(self):
+        return (
+            f"已回放 {self.played} 次API调用，录制时网络耗时共 {self.recorded_latency:.2f} 秒，"
+            f"未命中 {self.misses} 次"
+        )
+
+
+def summarize(interactions):
+    """
+    按方法统计调用次数、错误次数和耗时
+
+    Returns:
+        list: [(服务.方法, 次数, 错误数, 总耗时, 最大耗时)]，按总耗时降序
+    """
+    stats = {}
+    for item in interactions:
+        name = f"{item['service']}.{item['method']}"
+        count, errors, total, slowest = stats.get(name, (0, 0, 0.0, 0.0))
+        stats[name] = (
+            count + 1,
+            errors + ("error" in item),
+            total + item["elapsed"],
+            max(slowest, item["elapsed"]),
+        )
+    return sorted(
+        ((name,) + values for name, values in stats.items()),
+        key=lambda row: row[3],
+        reverse=True,
+    )
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("用法: python cassette.py <录制文件>")
+        sys.exit(1)
+    header, interactions = read_cassette(sys.argv[1])
+    if header is None:
+        print(f"\033[1;31m无效的录制文件: {sys.argv[1]}\033[0m")
+        sys.exit(1)
+    print(f"录制时间: {header['created_at']}  调用次数: {len(interactions)}")
+    print(f"{'方法':<52}{'次数':>6}{'错误':>6}{'总耗时(s)':>12}{'最大(ms)':>10}")
+    for name, count, errors, total, slowest in summarize(interactions):
+        print(f"{name:<52}{count:>6}{errors:>6}{total:>12.3f}{slowest * 1000:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
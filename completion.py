@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+命令补全模块，使用前缀树缓存补全候选，后台刷新过期数据
+"""
+
+import threading
+import time
+
+
+class PrefixTrie:
+    """
+    前缀树，每个节点保存子节点字典、以该节点结尾的单词和子树中的单词数
+
+    实例ID等候选在公共前缀之后通常只剩一条单链，
+    子树中只有一个单词时直接返回该单词，不再逐个字符向下遍历
+    """
+
+    __slots__ = ("children", "word", "size", "sample")
+
+    def __init__(self, words=()):
+        self.children = {}
+        self.word = None
+        self.size = 0
+        # 子树中的任意一个单词，size为1时即为唯一的单词
+        self.sample = None
+        for word in words:
+            self.insert(word)
+
+    def insert(self, word):
+        node = self
+        path = [node]
+        for char in word:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = PrefixTrie()
+            node = child
+            path.append(node)
+        if node.word is not None:
+            return
+        node.word = word
+        for item in path:
+            item.size += 1
+            if item.sample is None:
+                item.sample = word
+
+    def complete(self, prefix, limit=100):
+        """
+        返回以prefix开头的单词，按字典序，最多limit个
+        """
+        node = self
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        result = []
+        stack = [node]
+        while stack and len(result) < limit:
+            node = stack.pop()
+            if node.size == 1:
+                result.append(node.sample)
+                continue
+            if node.word is not None:
+                result.append(node.word)
+            # 逆序入栈，保证出栈顺序为字典序
+            stack.extend(node.children[c] for c in sorted(node.children, reverse=True))
+        return result
+
+
+class CompletionCache:
+    """
+    补全候选缓存
+
+    补全只读取内存中的前缀树，不发起网络请求；
+    数据不存在或过期时提交到线程池后台刷新，本次返回已有(可能过期)的结果
+    """
+
+    def __init__(self, executor, ttl=300):
+        """
+        Args:
+            executor: concurrent.futures线程池
+            ttl: 默认过期时间(秒)
+        """
+        self.executor = executor
+        self.ttl = ttl
+        self._loaders = {}
+        # (名称, 范围) -> (前缀树, 加载时间)
+        self._tries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, ttl=None):
+        """
+        注册补全数据源
+
+        Args:
+            name: 数据源名称，如 "instances"
+            loader: 加载函数，参数为范围(如区域ID)，返回候选字符串列表，失败返回None
+            ttl: 过期时间(秒)，为空时使用默认值
+        """
+        self._loaders[name] = (loader, self.ttl if ttl is None else ttl)
+
+    def update(self, name, scope, words):
+        """
+        直接写入候选，如实例列表查询后同步更新
+        """
+        trie = PrefixTrie(w for w in words if w)
+        with self._lock:
+            self._tries[(name, scope)] = (trie, time.monotonic())
+
+    def invalidate(self, name, scope=None):
+        """
+        标记数据过期，下次补全时后台刷新
+        """
+        with self._lock:
+            entry = self._tries.get((name, scope))
+            if entry is not None:
+                self._tries[(name, scope)] = (entry[0], float("-inf"))
+
+    def refresh(self, name, scope=None):
+        """
+        在后台刷新数据源，已在刷新时忽略
+        """
+        key = (name, scope)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                words = self._loaders[name][0](scope)
+                if words is not None:
+                    self.update(name, scope, words)
+            except Exception:
+                # 补全失败不影响命令执行，下次补全时重试
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self.executor.submit(run)
+
+    def complete(self, name, prefix, scope=None, limit=100):
+        """
+        返回以prefix开头的候选
+        """
+        with self._lock:
+            entry = self._tries.get((name, scope))
+        if entry is None or time.monotonic() - entry[1] > self._loaders[name][1]:
+            self.refresh(name, scope)
+        return entry[0].complete(prefix, limit) if entry else []
@@ -111,3 +111,117 @@ class Config:
 
     def get_instance_charge_type(self):
         return self.config["instance"]["instance_charge_type"]
+
+    def get_monitor_enabled(self):
+        return self.config.get("monitor", {}).get("enabled", False)
+
+    def get_monitor_interval(self):
+        return self.config.get("monitor", {}).get("interval", 300)
+
+    def get_price_cache_ttl(self):
+        return self.config.get("monitor", {}).get("price_ttl", 3600)
+
+    def get_fallback_instance_types(self):
+        return self.config.get("fallback", {}).get("instance_types") or []
+
+    def get_fallback_v_switch_ids(self):
+        return self.config.get("fallback", {}).get("v_switch_ids") or []
+
+    def get_instance_defaults(self, overrides=None):
+        """
+        获取默认实例参数，键名与Instance属性一致
+
+        Args:
+            overrides: 覆盖instance配置的参数，键名与config.yml中instance段相同
+        """
+        values = dict(self.config.get("instance", {}))
+        values.update(overrides or {})
+        defaults = {
+            "".join(part.capitalize() for part in key.split("_")): value
+            for key, value in values.items()
+        }
+        defaults.setdefault("RegionId", self.get_default_region())
+        return defaults
+
+    def get_pool_file(self):
+        return self.config.get("pool", {}).get("file", "pool.json")
+
+    def get_pool_profiles(self):
+        return self.config.get("pool", {}).get("profiles") or {}
+
+    def get_readiness_ports(self):
+        return self.config.get("readiness", {}).get("ports") or [22]
+
+    def get_readiness_timeout(self):
+        return self.config.get("readiness", {}).get("timeout", 180)
+
+    def get_user_data_templates(self):
+        return self.config.get("user_data", {}).get("templates") or {}
+
+    def get_user_data_variables(self):
+        return self.config.get("user_data", {}).get("variables") or {}
+
+    def get_deploy_config(self):
+        return self.config.get("deploy", {})
+
+    def get_deploy_playbooks(self):
+        return self.config.get("deploy", {}).get("playbooks") or {}
+
+    def get_cache_dir(self):
+        return self.config.get("cache", {}).get("dir", ".cache")
+
+    def get_image_cache_ttl(self):
+        return self.config.get("cache", {}).get("image_ttl", 86400)
+
+    def get_stock_cache_ttl(self):
+        return self.config.get("cache", {}).get("stock_ttl", 60)
+
+    def get_preflight_enabled(self):
+        return self.config.get("preflight", {}).get("enabled", True)
+
+    def get_preflight_min_balance(self):
+        return self.config.get("preflight", {}).get("min_balance", 100)
+
+    def get_watch_config(self):
+        return self.config.get("watch", {})
+
+    def get_journal_file(self):
+        return self.config.get("journal", {}).get("file", "journal.log")
+
+    def get_journal_flush_interval(self):
+        return self.config.get("journal", {}).get("flush_interval", 0.2)
+
+    def get_expiry_enabled(self):
+        return self.config.get("expiry", {}).get("enabled", True)
+
+    def get_expiry_file(self):
+        return self.config.get("expiry", {}).get("file", "expiry.json")
+
+    def get_expiry_batch_window(self):
+        return self.config.get("expiry", {}).get("batch_window", 5)
+
+    def get_expiry_regions(self):
+        return self.config.get("expiry", {}).get("regions") or [
+            self.get_default_region()
+        ]
+
+    def get_expiry_sync_interval(self):
+        return self.config.get("expiry", {}).get("sync_interval", 300)
+
+    def get_daemon_socket(self):
+        return self.config.get("daemon", {}).get("socket", "ecs-console.sock")
+
+    def get_daemon_rate(self):
+        return self.config.get("daemon", {}).get("rate", 20)
+
+    def get_daemon_burst(self):
+        return self.config.get("daemon", {}).get("burst")
+
+    def get_daemon_method_rates(self):
+        return self.config.get("daemon", {}).get("methods") or {}
+
+    def get_daemon_inventory_ttl(self):
+        return self.config.get("daemon", {}).get("inventory_ttl", 5)
+
+    def get_daemon_catalog_ttl(self):
+        return self.config.get("daemon", {}).get("catalog_ttl", 600)
@@ -5,20 +5,56 @@
 命令行交互界面模块
 """
 
+import atexit
 import cmd
+import os
+import shutil
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from prettytable import PrettyTable
+
+try:
+    import readline
+except ImportError:  # Windows等平台没有readline，仅不支持补全
+    readline = None
+
 from tabulate import tabulate
 from instance import Instance
+from Tea.exceptions import TeaException
 
 from config import Config
 from api import AliyunAPI
+from pricing import PriceBook, LEDGER_FIELDS
+from monitor import BalanceMonitor
+from launch import fallback_candidates, run_with_fallback, race_launch
+from launch import wait_for_status, run_with_user_data
+from userdata import render_user_data, UserDataError
+from deploy import deploy, SSHSession
+from assistant import select_instances, stream_invocation
+from sgindex import SecurityGroupIndex, parse_port_requirements
+from prefetch import RegionSnapshot
+from cache import DiskCache
+from images import ImageCatalog
+from availability import StockMatrix, in_stock, rank_v_switches
+from spothistory import HISTORY_MAX_DAYS, SpotHistory
+from templates import TemplateCatalog, diff_versions, find_template, find_version
+from completion import CompletionCache
+from journal import Journal, recover
+from preflight import Preflight, PASSED, FAILED, WARNING
+from expiry import ExpiryScheduler, destroy_tags, parse_destroy_at, parse_ttl, TAG_KEY
+from watch import InstanceWatcher, DiffRenderer, RELEASED, pad
+from pool import StandbyPool
+from probe import probe_ports
 from utils import (
     print_warning,
     print_error,
     print_success,
     print_info,
     get_user_input,
+    parse_options,
+    UsageError,
 )
 
 
@@ -42,26 +78,139 @@ class AliyunECSConsole(cmd.Cmd):
     ║  \033[1;32minstance_type\033[0m   - 查询规格信息列表                             ║
     ║  \033[1;32mtemplates\033[0m       - 查询模板信息                                  ║
     ║  \033[1;32mprice\033[0m           - 查询ECS价格                                  ║    
+    ║  \033[1;32mburn\033[0m            - 查看余额可用时长                             ║
+    ║  \033[1;32mcost\033[0m            - 查询运行中实例的费用                         ║
+    ║  \033[1;32mpool\033[0m            - 管理预热实例池                               ║
+    ║  \033[1;32mdeploy\033[0m          - 通过SSH并发部署                              ║
+    ║  \033[1;32mrun\033[0m             - 通过云助手批量执行脚本                       ║
+    ║  \033[1;32mimages\033[0m          - 搜索镜像                                     ║
+    ║  \033[1;32mavailability\033[0m    - 查询可用区库存                               ║
+    ║  \033[1;32mspothistory\033[0m     - 分析竞价历史价格                             ║
+    ║  \033[1;32mwatch\033[0m           - 持续监控实例状态                             ║
+    ║  \033[1;32mttl\033[0m             - 管理实例定时销毁                             ║
     ║  \033[1;32mexit\033[0m            - 退出程序                                     ║
     ║                                                                 ║
     ╚═════════════════════════════════════════════════════════════════╝
     """
     prompt = "\033[1;36m阿里云ECS >\033[0m "
 
-    def __init__(self):
+    def __init__(self, cassette=None):
+        """
+        Args:
+            cassette: API流量录制/回放(cassette.Recorder 或 cassette.Player)，可选
+        """
         super().__init__()
         try:
             self.config = Config()
             access_key_id, access_key_secret = self.config.get_access_key()
             self.api = AliyunAPI(access_key_id, access_key_secret)
+            replaying = cassette is not None and cassette.replaying
+            if cassette is not None:
+                self.api.set_cassette(cassette)
             self.current_region = self.config.get_default_region()  # 从配置获取默认区域
             self.api.set_region(self.current_region)
             print_success(f"成功连接到阿里云API，当前区域: {self.current_region}")
 
+            # 先与上次运行遗留的操作日志对账，再开始记录本次的变更操作；
+            # 回放时的操作没有真正发生，不写入操作日志
+            if not replaying:
+                self._recover_journal()
+                self.journal = Journal(
+                    self.config.get_journal_file(),
+                    flush_interval=self.config.get_journal_flush_interval(),
+                )
+                self.journal.start()
+                atexit.register(self.journal.close)
+                self.api.set_journal(self.journal)
+
+            self.price_book = PriceBook(
+                self.api, self.config, ttl=self.config.get_price_cache_ttl()
+            )
+            self.monitor = None
+            if self.config.get_monitor_enabled():
+                self._start_monitor()
+
+            self.disk_cache = DiskCache(self.config.get_cache_dir())
+            self.image_catalog = ImageCatalog(
+                self.api, self.disk_cache, ttl=self.config.get_image_cache_ttl()
+            )
+
+            self.stock_matrix = StockMatrix(
+                self.api, ttl=self.config.get_stock_cache_ttl()
+            )
+            self.spot_history = SpotHistory(self.api, self.disk_cache)
+            self.template_catalog = TemplateCatalog(self.api, self.disk_cache)
+
+            # 在后台预取当前区域的交换机、安全组、启动模板、地域和镜像列表
+            self.prefetch_executor = ThreadPoolExecutor(
+                max_workers=4, thread_name_prefix="prefetch"
+            )
+            self.snapshots = {}
+            # 补全数据在后台线程中读取快照，与主线程同时调用_region_snapshot
+            self._snapshots_lock = threading.Lock()
+            self._region_snapshot(self.current_region)
+
+            # 参数补全只读取本地前缀树，数据过期时在后台刷新
+            self.completions = CompletionCache(self.prefetch_executor)
+            self._register_completions()
+
+            # 回放时实例池和定时销毁计划写入临时副本，不修改真实的状态文件
+            state_files = {
+                "pool": self.config.get_pool_file(),
+                "expiry": self.config.get_expiry_file(),
+            }
+            if replaying:
+                state_files = self._replay_state_files(state_files)
+
+            # 到期自动销毁实例，也可以使用 python expiry.py 独立运行
+            self.expiry = ExpiryScheduler(
+                self.api,
+                state_files["expiry"],
+                batch_window=self.config.get_expiry_batch_window(),
+            )
+            # 已有独立运行的 python expiry.py 时由其执行销毁，控制台只写入计划
+            if (
+                self.config.get_expiry_enabled()
+                and not replaying
+                and self.expiry.acquire_run_lock()
+            ):
+                self.expiry.start()
+                threading.Thread(
+                    target=self.expiry.sync_tags,
+                    args=([self.current_region],),
+                    daemon=True,
+                ).start()
+
+            self.pool = StandbyPool(self.api, self.config, path=state_files["pool"])
+            if self.pool.profiles and not replaying:
+                # 启动时在后台与实际实例状态对账，不阻塞控制台；
+                # 回放时录制文件中没有这些查询，对账会误删池中的实例
+                threading.Thread(target=self.pool.reconcile, daemon=True).start()
+
         except Exception as e:
             print_error(f"初始化失败: {e}")
             raise
 
+    @staticmethod
+    def _replay_state_files(paths):
+        """
+        把本地状态文件复制到临时目录，退出时删除
+
+        Args:
+            paths: {名称: 状态文件路径}
+
+        Returns:
+            dict: {名称: 临时副本路径}
+        """
+        directory = tempfile.mkdtemp(prefix="ecs-replay-")
+        atexit.register(shutil.rmtree, directory, ignore_errors=True)
+        copies = {}
+        for name, path in paths.items():
+            copies[name] = os.path.join(directory, os.path.basename(path))
+            if os.path.exists(path):
+                shutil.copyfile(path, copies[name])
+        return copies
+
     def get_names(self):
         """
         获取可用命令列表，只返回我们想要保留的命令
@@ -76,6 +225,16 @@ class AliyunECSConsole(cmd.Cmd):
             "instance_type",
             "templates",
             "price" "help",
+            "burn",
+            "pool",
+            "deploy",
+            "run",
+            "images",
+            "availability",
+            "spothistory",
+            "watch",
+            "ttl",
+            "cost",
             "exit",
             "quit",
         ]
@@ -85,15 +244,25 @@ class AliyunECSConsole(cmd.Cmd):
         获取所有命令列表，用于帮助信息
         """
         commands = {
-            "create": "创建新的ECS实例",
+            "create": "创建新的ECS实例 create [--fallback] [--race] [--from-pool <profile>] [--user-data <name>]",
             "delete": "删除指定的ECS实例 delete instance_id",
             "balance": "查询账户余额",
             "status": "查询ECS状态 status instance_id",
             "query": "查询ECS信息 query instance_id",
             "instances": "查询所有ECS",
             "instance_type": "查询规格信息列表",
-            "templates": "查询模板信息",
+            "templates": "查询模板信息 templates [--versions [模板]] [--diff <模板> <版本1> <版本2>]",
             "price": "查询实例当前价格",
+            "burn": "查看余额可用时长 burn [start|stop|refresh]",
+            "cost": "查询运行中实例的小时/日费用",
+            "pool": "管理预热实例池 pool [status|fill [profile]|reconcile]",
+            "deploy": "通过SSH并发部署 deploy <playbook> <instance_id...>",
+            "run": "通过云助手批量执行脚本 run <instance_id...|all|key=value> -- <script>",
+            "images": "搜索镜像 images <关键词> [--refresh]",
+            "availability": "查询可用区库存 availability [instance_type ...] [--spot <策略>]",
+            "ttl": "管理定时销毁 ttl [<instance_id> <时长>|cancel <instance_id>]",
+            "watch": "持续监控实例状态 watch [--fast <秒>] [--slow <秒>]",
+            "spothistory": "分析竞价历史价格 spothistory [instance_type ...] [--zones <a,b>] [--days <天数>]",
             "exit": "退出程序",
             "quit": "退出程序",
             "help": "显示帮助信息",
@@ -114,6 +283,19 @@ class AliyunECSConsole(cmd.Cmd):
             for cmd, desc in commands.items():
                 print(f"  \033[1;32m{cmd}\033[0m - {desc}")
 
+    def onecmd(self, line):
+        """
+        执行命令，参数错误时打印错误信息，不退出控制台
+        """
+        try:
+            return super().onecmd(line)
+        except UsageError as e:
+            command = self.parseline(line)[0]
+            print_error(str(e))
+            if command:
+                print(f"输入 \033[1;32mhelp {command}\033[0m 查看用法")
+            return False
+
     def default(self, line):
         """
         处理未知命令
@@ -173,6 +355,119 @@ class AliyunECSConsole(cmd.Cmd):
             print("2. \033[1;36m网络连接问题\033[0m")
             print("3. \033[1;36m阿里云API服务异常\033[0m")
 
+    def _start_monitor(self):
+        """
+        启动后台余额监控线程
+        """
+        self.monitor = BalanceMonitor(
+            self.api,
+            self.price_book,
+            lambda: self.current_region,
+            interval=self.config.get_monitor_interval(),
+        )
+        self.monitor.start()
+
+    def postcmd(self, stop, line):
+        """
+        每条命令执行后根据监控缓存刷新提示符，不发起API调用
+        """
+        snapshot = self.monitor.snapshot() if self.monitor else None
+        if snapshot and snapshot["balance"] is not None:
+            runway = snapshot["runway_hours"]
+            runway_text = f" ~{runway:.0f}h" if runway is not None else ""
+            self.prompt = (
+                f"\033[1;36m阿里云ECS [¥{snapshot['balance']:.2f}{runway_text}] >\033[0m "
+            )
+        else:
+            self.prompt = AliyunECSConsole.prompt
+        return stop
+
+    def do_burn(self, arg):
+        """
+        查看余额可用时长
+        用法: burn [start|stop|refresh]
+        """
+        action = arg.strip()
+        if action == "start":
+            if self.monitor and self.monitor.is_alive():
+                print_warning("余额监控已在运行")
+            else:
+                self._start_monitor()
+                print_success("余额监控已启动，首次结果稍后可用")
+            return
+        if action == "stop":
+            if self.monitor:
+                self.monitor.stop()
+                self.monitor = None
+            print_success("余额监控已停止")
+            return
+        if not self.monitor:
+            print_warning("余额监控未启动，使用 'burn start' 启动")
+            return
+        if action == "refresh":
+            self.monitor.trigger()
+            print_success("已触发后台刷新")
+            return
+
+        snapshot = self.monitor.snapshot()
+        if not snapshot:
+            print_warning("余额监控尚未完成首次刷新，请稍后再试")
+            return
+
+        def clock(epoch):
+            return time.strftime("%H:%M:%S", time.localtime(epoch))
+
+        balance = snapshot["balance"]
+        if balance is None:
+            balance_text = "未知"
+        else:
+            balance_text = f"{balance} 元 (更新于 {clock(snapshot['balance_updated_at'])})"
+        print(f"\033[1;32m可用余额:\033[0m \033[1;36m{balance_text}\033[0m")
+        if snapshot["balance_stale"]:
+            print_warning("最近一次查询余额失败，显示的是上次查询到的余额")
+        regions = ", ".join(
+            f"{region_id} {count} 台" for region_id, count in snapshot["regions"].items()
+        )
+        print(
+            f"\033[1;32m运行中实例:\033[0m {snapshot['running']} 台"
+            + (f" ({regions})" if regions else "")
+        )
+        print(
+            f"\033[1;32m当前消耗:\033[0m {snapshot['burn_rate']:.4f} 元/小时 "
+            f"(所有区域，更新于 {clock(snapshot['updated_at'])})"
+        )
+        if snapshot["failed_regions"]:
+            print_warning(
+                "以下区域查询实例失败，未计入消耗: "
+                + ", ".join(snapshot["failed_regions"])
+            )
+        if snapshot["unpriced"]:
+            print_warning(f"{snapshot['unpriced']} 台实例未能获取价格，未计入消耗")
+        if snapshot["runway_hours"] is None:
+            if snapshot["balance"] is None and snapshot["burn_rate"] > 0:
+                print_warning("查询余额失败，无法估算余额可维持的时长")
+            else:
+                print_info("当前没有计费中的实例")
+        else:
+            runway = snapshot["runway_hours"]
+            message = f"按当前消耗，余额约可维持 {runway:.1f} 小时 (约 {runway / 24:.1f} 天)"
+            if runway < 24:
+                print_error(message)
+            else:
+                print_success(message)
+
+    def do_cost(self, arg):
+        """
+        查询当前区域运行中实例的费用
+        用法: cost
+        """
+        print_warning("正在查询运行中实例及价格...")
+        instances = self.api.get_describe_instances(
+            self.current_region, fields=LEDGER_FIELDS
+        )
+        ledger = self.price_book.build_ledger(instances, self.current_region)
+        print(self.display_cost_table(ledger))
+
     def do_setregion(self, arg):
         """
         设置当前区域
@@ -185,12 +480,62 @@ class AliyunECSConsole(cmd.Cmd):
 
         self.current_region = arg
         self.api.set_region(arg)
+        self._region_snapshot(arg)
         print_success(f"当前区域已设置为: {arg}")
 
+    def _show_regions(self):
+        """
+        显示可用地域列表，优先使用预取的结果
+        :return: 是否成功获取地域列表
+        """
+        result = self._region_snapshot(self.current_region).get("regions")
+        if not result:
+            print_error("查询地域列表失败")
+            return False
+        table_data = [
+            [region["RegionId"], region["LocalName"]]
+            for region in result["Regions"]["Region"]
+        ]
+        print(
+            tabulate(
+                table_data, headers=["区域ID", "名称"], tablefmt="grid", stralign="left"
+            )
+        )
+        return True
+
     def do_create(self, arg):
         """
         创建实例向导
+        用法: create [--fallback] [--race] [--from-pool <profile>] [--user-data <name>]
+                     [--ttl <时长> | --destroy-at <时间>] [--no-preflight]
+        --fallback   库存不足时按配置中的备选规格/交换机依次重试
+        --race       在多个可用区同时创建，保留最先Running的实例并释放其余实例
+        --from-pool  直接启动预热实例池中的实例
+        --user-data  使用配置中的UserData模板，实例启动时自动执行
+        --ttl        到期自动销毁，如 90m、4h、1d，从执行命令时开始计算
+        --destroy-at 在指定时间自动销毁，如 "2024-01-01 18:00"
+        --no-preflight 跳过创建前的DryRun、余额、配额、库存和网络预检
         """
+        _, options = parse_options(
+            arg, flags=("fallback", "race", "no-preflight"), optional=("from-pool",)
+        )
+        try:
+            deadline = self._parse_deadline(options)
+        except ValueError as e:
+            print_error(str(e))
+            return
+        if options.get("from-pool"):
+            self._create_from_pool(options["from-pool"], deadline)
+            return
+
+        user_data_template = None
+        if options.get("user-data"):
+            templates = self.config.get_user_data_templates()
+            user_data_template = templates.get(options["user-data"])
+            if user_data_template is None:
+                print_error(f"UserData模板不存在: {options['user-data']}")
+                return
+
         print("\n\033[1;36m===== 创建ECS实例向导 =====\033[0m\n")
 
         # 显示当前账户余额
@@ -200,31 +545,69 @@ class AliyunECSConsole(cmd.Cmd):
         use_template = get_user_input("是否从模板创建? (y/n)", "n").lower()
         if use_template == "y":
             api = AliyunAPI.get_instance()
-            self.do_templates(None)
             current_region = get_user_input(
                 "是否更改地域id? (当前id为) > " + self.current_region,
                 self.current_region,
             )
-            launch_template_name = get_user_input("选择模板名称：")
-            launch_template_version = get_user_input("选择模板版本：", 1)
+            # 模板及其版本详情来自区域快照，创建时无需再查询
+            templates = self._region_snapshot(current_region).get("launch_templates")
+            self.display_launch_templates_table(templates)
+            template = find_template(templates, get_user_input("选择模板名称："))
+            if template is None:
+                print_error("模板不存在，创建实例失败")
+                return
+            self.display_template_versions_table(template)
+            version = find_version(
+                template,
+                get_user_input("选择模板版本：", template["default_version_number"]),
+            )
+            if version is None:
+                print_error("模板版本不存在，创建实例失败")
+                return
+            launch_template_name = template["launch_template_name"]
+            launch_template_version = version["version_number"]
             amount = get_user_input("创建数量（默认为1）：", 1)
             password = get_user_input("输入root密码: ")
             region_id = self.current_region
-            result = api.create_instances_from_template(
-                current_region,
-                launch_template_name,
-                launch_template_version,
-                amount,
-                password,
-            )
-            instance_id = result["instance_ids"][0]
-            print("等待系统处理中...")
-            for i in range(10, 0, -1):
-                print(f"\033[1;33m倒计时: {i}秒\033[0m", end="\r")
-                time.sleep(1)
-            result = self.api.get_describe_instance_attribute(instance_id)
-            instance_result = self.display_result_instances_table(result)
-            print(instance_result)
+            user_data = [None]
+            if user_data_template is not None:
+                user_data = self._render_user_data(
+                    user_data_template,
+                    Instance(
+                        **{
+                            **version["launch_template_data"],
+                            "RegionId": current_region,
+                            "Amount": amount,
+                        }
+                    ),
+                )
+                if user_data is None:
+                    return
+
+            started = time.monotonic()
+            # 各实例UserData相同时一次创建，否则逐台创建
+            batches = (
+                [(amount, user_data[0])]
+                if len(set(user_data)) == 1
+                else [(1, data) for data in user_data]
+            )
+            instance_ids = []
+            for batch_amount, data in batches:
+                result = api.create_instances_from_template(
+                    current_region,
+                    launch_template_name,
+                    launch_template_version,
+                    batch_amount,
+                    password,
+                    user_data=data,
+                    tags=destroy_tags(deadline) if deadline else None,
+                )
+                if result:
+                    instance_ids.extend(result["instance_ids"])
+            if not instance_ids:
+                return
+            self._schedule_destroy(instance_ids, current_region, deadline)
+            self._wait_until_ready(current_region, instance_ids, started)
         else:
             change = get_user_input(
                 "是否更改区域? 当前区域为 > " + self.current_region + " (y/n)", "n"
@@ -238,10 +621,11 @@ class AliyunECSConsole(cmd.Cmd):
                 if region_id:
                     self.api.set_region(region_id)
                     self.current_region = region_id
+                    self._region_snapshot(region_id)
             print()
             # 选择镜像
             print_info("===== 选择镜像 =====")
-            image_id = get_user_input(f"请输入镜像ID", self.config.get_image_id())
+            image_id = self._choose_image(self.config.get_image_id())
             print()
 
             # 选择实例规格
@@ -268,20 +652,32 @@ class AliyunECSConsole(cmd.Cmd):
 
             print()
 
-            securityGroups = self.api.get_all_describe_security_group_attribute(
-                self.current_region
-            )
-            print(self.display_security_groups_table(securityGroups))
-            security_group_id = get_user_input("请输入安全组ID")
+            security_group_id = self._choose_security_group(self.current_region)
             if not security_group_id:
                 print_error("安全组ID不能为空，创建实例失败")
                 return
 
+            # 交换机列表按所选竞价策略的库存排序，需要先选择竞价策略
+            print("\n\033[1;36m===== 选择竞价策略 =====\033[0m")
+
+            SpotStrategy = get_user_input("请输入竞价策略: ", "SpotAsPriceGo")
+            if SpotStrategy == "SpotAsPriceGo":
+                # 如果是抢占实例，询问竞价时长
+                print("\n\033[1;36m===== 竞价时长 =====\033[0m")
+                # 询问用户输入竞价时长
+                SpotDuration = get_user_input(
+                    "请输入竞价时长(小时), 0表示不限制: ", "0"
+                )
+            else:
+                SpotDuration = None
+
             print("\n\033[1;36m===== 选择交换机 =====\033[0m")
 
-            vswitch = self.api.get_v_switch(self.current_region)
-            print(self.display_vswitch_table(vswitch))
-            VSwitchId = get_user_input("请输入VSwitchId: ")
+            snapshot = self._region_snapshot(self.current_region)
+            vswitch = snapshot.get("vswitches") or []
+            VSwitchId = self._choose_v_switch(
+                vswitch, instance_type, SpotStrategy
+            )
 
             if not VSwitchId:
                 print_error("虚拟交换机ID不能为空，创建实例失败")
@@ -309,19 +705,6 @@ class AliyunECSConsole(cmd.Cmd):
                 "请输入网络带宽计费方式", self.config.get_internet_charge_type()
             )
 
-            print("\n\033[1;36m===== 选择竞价策略 =====\033[0m")
-
-            SpotStrategy = get_user_input("请输入竞价策略: ", "SpotAsPriceGo")
-            if SpotStrategy == "SpotAsPriceGo":
-                # 如果是抢占实例，询问竞价时长
-                print("\n\033[1;36m===== 竞价时长 =====\033[0m")
-                # 询问用户输入竞价时长
-                SpotDuration = get_user_input(
-                    "请输入竞价时长(小时), 0表示不限制: ", "0"
-                )
-            else:
-                SpotDuration = None
-
             print("\n\033[1;36m===== 输入主机名称 =====\033[0m")
             HostName = get_user_input("请输入实例名称", "vps")
 
@@ -352,6 +735,16 @@ class AliyunECSConsole(cmd.Cmd):
                 Amount=Amount,
                 InstanceChargeType=InstanceChargeType,
             )
+            if deadline:
+                instance.Tags = destroy_tags(deadline)
+
+            user_data = None
+            if user_data_template is not None:
+                user_data = self._render_user_data(user_data_template, instance)
+                if user_data is None:
+                    return
+                # 竞速和备选重试时每次请求只创建同一份配置，使用第一台实例的UserData
+                instance.UserData = user_data[0]
 
             # 确认创建
             print("\n\033[1;36m===== 实例配置信息 =====\033[0m")
@@ -362,28 +755,1026 @@ class AliyunECSConsole(cmd.Cmd):
                 print_error("取消创建实例")
                 return
 
+            if self.config.get_preflight_enabled() and not options.get("no-preflight"):
+                # --fallback/--race 会换可用区或规格重试，库存不足不阻止创建
+                if not self._preflight(
+                    instance,
+                    vswitch,
+                    tolerate_stock=bool(options.get("fallback") or options.get("race")),
+                ):
+                    return
+
             print_warning("正在创建实例...")
 
-            instance_id = self.api.run_instances(instance=instance)
-            print_success(f"实例创建请求已发送，实例ID: {instance_id[0]}")
-            print("等待系统处理中...")
-            for i in range(10, 0, -1):
-                print(f"\033[1;33m倒计时: {i}秒\033[0m", end="\r")
-                time.sleep(1)
-            status = self.api.get_instance_status(self.current_region, instance_id[0])
-            if (
-                status["Data"]["TotalCount"] == 1
-                and status["Data"]["InstanceStatus"][0]["Status"] == "Running"
-            ):
-                print_success("实例创建成功，状态为 Running")
-                result = self.api.get_describe_instance_attribute(instance_id[0])
-                instance_result = self.display_result_instances_table(result)
-                print(instance_result)
+            started = time.monotonic()
+            if options.get("race"):
+                winner = self._race_instances(instance, vswitch)
+                if winner:
+                    self._schedule_destroy([winner], self.current_region, deadline)
+                return
+            if options.get("fallback"):
+                instance_id = self._run_instances_with_fallback(instance, vswitch)
+                if not instance_id:
+                    return
+            elif user_data:
+                instance_id = run_with_user_data(self.api, instance, user_data)
+            else:
+                instance_id = self.api.run_instances(instance=instance)
+            print_success(f"实例创建请求已发送，实例ID: {', '.join(instance_id)}")
+            self._schedule_destroy(instance_id, self.current_region, deadline)
+            self._wait_until_ready(self.current_region, instance_id, started)
+
+    def _preflight(self, instance, vswitches, tolerate_stock=False):
+        """
+        并发执行创建前预检并显示报告
+
+        Returns:
+            bool: 是否可以创建
+        """
+        print_info("正在执行创建前预检...")
+        started = time.monotonic()
+        security_groups = self._region_snapshot(instance.RegionId).get("security_groups")
+        report = Preflight(
+            self.api, self.stock_matrix, self.config.get_preflight_min_balance()
+        ).run(
+            instance,
+            vswitches,
+            security_groups[0] if security_groups else None,
+            tolerate_stock=tolerate_stock,
+        )
+        print(self.display_preflight_table(report))
+        print_info(f"预检耗时 {time.monotonic() - started:.2f} 秒")
+        if not Preflight.passed(report):
+            print_error("预检未通过，取消创建实例 (可使用 --no-preflight 跳过)")
+            return False
+        return True
+
+    @staticmethod
+    def _parse_deadline(options):
+        """
+        根据 --ttl / --destroy-at 计算销毁时间戳，未指定时返回None
+        """
+        if options.get("ttl") and options.get("destroy-at"):
+            raise ValueError("--ttl 和 --destroy-at 不能同时使用")
+        if options.get("ttl"):
+            return time.time() + parse_ttl(options["ttl"])
+        if options.get("destroy-at"):
+            deadline = parse_destroy_at(options["destroy-at"])
+            if deadline <= time.time():
+                raise ValueError("销毁时间必须晚于当前时间")
+            return deadline
+        return None
+
+    def _schedule_destroy(self, instance_ids, region_id, deadline):
+        """
+        将实例加入定时销毁计划
+        """
+        if not deadline:
+            return
+        self.expiry.schedule(instance_ids, region_id, deadline)
+        destroy_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(deadline))
+        print_info(f"实例将于 {destroy_at} 自动销毁")
+        if not self.expiry.is_alive() and not self.expiry.running_elsewhere():
+            print_warning("定时销毁未在控制台中启用，请运行 python expiry.py")
+
+    def _region_snapshot(self, region_id):
+        """
+        获取区域资源快照，不存在或已过期时在后台重新预取
+        """
+        with self._snapshots_lock:
+            snapshot = self.snapshots.get(region_id)
+            if snapshot is None or snapshot.expired:
+
+                def load_security_groups():
+                    groups = self.api.get_all_describe_security_group_attribute(
+                        region_id
+                    )
+                    return groups, SecurityGroupIndex(groups)
+
+                snapshot = RegionSnapshot(
+                    self.prefetch_executor,
+                    region_id,
+                    {
+                        "vswitches": lambda: self.api.get_v_switch(region_id),
+                        "security_groups": load_security_groups,
+                        "launch_templates": lambda: self.template_catalog.load(
+                            region_id
+                        ),
+                        "regions": self.api.get_describe_regions,
+                        "images": lambda: self.image_catalog.load(region_id),
+                    },
+                )
+                self.snapshots[region_id] = snapshot
+            return snapshot
+
+    def _recover_journal(self):
+        """
+        根据操作日志找出上次运行中未完成的操作，提示可能泄漏的实例
+        """
+        try:
+            report = recover(self.api, self.config.get_journal_file())
+        except OSError as e:
+            print_error(f"操作日志对账失败: {e}")
+            return
+        if not report:
+            return
+
+        if report["suspects"]:
+            print_error("上次运行中有创建操作未完成，以下实例可能未被记录，请确认是否需要删除:")
+            table_data = [
+                [
+                    inst["instance_id"],
+                    inst["status"],
+                    inst.get("public_ip") or "无",
+                    inst.get("instance_type"),
+                    inst.get("creation_time"),
+                ]
+                for inst in report["suspects"]
+            ]
+            headers = ["实例ID", "状态", "公网IP", "规格", "创建时间"]
+            print(tabulate(table_data, headers=headers, tablefmt="grid"))
+        if report["undeleted"]:
+            print_error(
+                "上次运行中以下实例的删除操作未完成，实例仍存在: "
+                + ", ".join(report["undeleted"])
+            )
+        if report["owned"]:
+            print_info(f"操作日志中记录的 {len(report['owned'])} 台实例仍存在")
+
+    def _register_completions(self):
+        """
+        注册参数补全的数据源，并预热实例和地域列表
+        """
+
+        def instances(region_id):
+            result = self.api.get_describe_instances(region_id, fields=["instance_id"])
+            return [inst["instance_id"] for inst in result]
+
+        def regions(_):
+            result = self._region_snapshot(self.current_region).get("regions")
+            if not result:
+                return None
+            return [region["RegionId"] for region in result["Regions"]["Region"]]
+
+        def instance_types(_):
+            result = self.api.get_describe_instance_types()
+            if not result:
+                return None
+            return [t["InstanceTypeId"] for t in result["instance_types"]]
+
+        def templates(region_id):
+            data = self._region_snapshot(region_id).get("launch_templates")
+            if not data:
+                return None
+            return [
+                value
+                for template in data["launch_templates"]
+                for value in (
+                    template["launch_template_name"],
+                    template["launch_template_id"],
+                )
+            ]
+
+        self.completions.register("instances", instances, ttl=60)
+        self.completions.register("regions", regions, ttl=86400)
+        self.completions.register("instance_types", instance_types, ttl=86400)
+        self.completions.register("templates", templates)
+        self.completions.refresh("instances", self.current_region)
+        self.completions.refresh("regions")
+
+    def preloop(self):
+        # 实例ID、规格名称中包含"-"和"."，不作为补全的单词分隔符
+        if readline is not None:
+            delims = readline.get_completer_delims()
+            readline.set_completer_delims(delims.replace("-", "").replace(".", ""))
+
+    def complete_delete(self, text, line, begidx, endidx):
+        return self.completions.complete("instances", text, self.current_region)
+
+    complete_status = complete_delete
+    complete_query = complete_delete
+
+    def complete_setregion(self, text, line, begidx, endidx):
+        return self.completions.complete("regions", text)
+
+    def complete_availability(self, text, line, begidx, endidx):
+        if text.startswith("-"):
+            return []
+        return self.completions.complete("instance_types", text)
+
+    complete_spothistory = complete_availability
+
+    def complete_templates(self, text, line, begidx, endidx):
+        if text.startswith("-"):
+            return []
+        return self.completions.complete("templates", text, self.current_region)
+
+    def _security_group_index(self, region_id):
+        """
+        获取区域的安全组规则及端口索引，来自区域资源快照
+        :return: (安全组列表, SecurityGroupIndex)
+        """
+        return self._region_snapshot(region_id).get("security_groups") or ([], None)
+
+    def _choose_image(self, default):
+        """
+        输入镜像ID并使用本地镜像索引校验，输入有误时给出近似镜像
+        """
+        index = self._region_snapshot(self.current_region).get("images")
+        image_id = get_user_input("请输入镜像ID或搜索关键词", default)
+        if index is None:
+            return image_id
+
+        while not index.validate(image_id):
+            matches = index.search(image_id, limit=10)
+            if not matches:
+                print_warning(f"未找到与 {image_id} 相关的镜像")
+                return get_user_input("请输入镜像ID", default)
+            print_warning(f"镜像 {image_id} 不存在，相近的镜像:")
+            print(self.display_images_table(matches))
+            image_id = get_user_input("请输入镜像ID或搜索关键词", matches[0]["ImageId"])
+        return image_id
+
+    def _choose_v_switch(self, vswitch, instance_type, spot_strategy):
+        """
+        显示交换机及其可用区的库存，默认选择有库存的交换机
+        :return: 用户选择的交换机ID
+        """
+        zones = [zone_id for _, zone_id, _ in vswitch]
+        matrix = self.stock_matrix.query(
+            self.current_region, zones, [instance_type], spot_strategy
+        )
+        stock = {zone: matrix[zone].get(instance_type) for zone in matrix}
+        ranked = rank_v_switches(matrix, vswitch, instance_type)
+        print(self.display_vswitch_table(ranked, stock))
+        default = None
+        if ranked and in_stock(matrix, ranked[0][1], instance_type):
+            default = ranked[0][0]
+        return get_user_input("请输入VSwitchId", default)
+
+    def _choose_security_group(self, region_id):
+        """
+        按需要开放的端口推荐安全组，未输入端口时显示全部安全组
+        :return: 用户选择的安全组ID
+        """
+        groups, index = self._security_group_index(region_id)
+        if index is None:
+            return get_user_input("请输入安全组ID")
+        ports = get_user_input(
+            "请输入需要开放的端口 (如 22,80-443/tcp,53/udp，留空显示全部安全组)"
+        )
+        proposals = []
+        if ports:
+            try:
+                proposals = index.propose(parse_port_requirements(ports))
+            except ValueError:
+                print_error(f"端口格式错误: {ports}")
+            if not proposals:
+                print_warning("没有安全组开放了全部所需端口，显示全部安全组")
+
+        if proposals:
+            print_success(f"以下 {len(proposals)} 个安全组满足端口需求 (规则最少的排在最前):")
+            print(
+                self.display_security_groups_table(
+                    [index.groups[group_id] for group_id in proposals]
+                )
+            )
+            return get_user_input("请输入安全组ID", proposals[0])
+
+        print(self.display_security_groups_table(groups))
+        return get_user_input("请输入安全组ID")
+
+    def _render_user_data(self, template, instance):
+        """
+        为每台实例渲染UserData，失败时输出原因并返回None
+        """
+        try:
+            user_data = render_user_data(
+                template, instance, self.config.get_user_data_variables()
+            )
+        except UserDataError as e:
+            print_error(str(e))
+            return None
+        sizes = [len(data) for data in user_data]
+        print_info(f"UserData已渲染，编码后 {max(sizes)} 字节")
+        return user_data
+
+    def _wait_until_ready(self, region_id, instance_ids, started):
+        """
+        等待新实例进入Running并探测端口可连接，分别输出两个阶段的耗时
+
+        :param region_id: 实例所在区域
+        :param instance_ids: 实例ID列表
+        :param started: 发起创建请求的时间(time.monotonic())
+        """
+        ports = self.config.get_readiness_ports()
+        timeout = self.config.get_readiness_timeout()
+
+        print(f"等待 {len(instance_ids)} 台实例进入Running状态...")
+        running = wait_for_status(
+            self.api, region_id, instance_ids, timeout=timeout, started=started
+        )
+        ready_ids = [i for i, elapsed in running.items() if elapsed is not None]
+        instances = self.api.get_describe_instances_by_ids(
+            ready_ids, region_id, fields=["public_ip"]
+        )
+
+        targets = {
+            instance_id: (instances.get(instance_id, {}).get("public_ip"), started)
+            for instance_id in ready_ids
+        }
+        if targets:
+            ports_text = ", ".join(str(p) for p in ports)
+            print(f"正在探测端口 {ports_text} 是否可连接...")
+        remaining = max(0, timeout - (time.monotonic() - started))
+        probed = probe_ports(targets, ports=ports, timeout=remaining)
+
+        def fmt(value):
+            return f"{value:.1f}" if value is not None else "超时"
+
+        table_data = []
+        for instance_id in instance_ids:
+            row = [
+                instance_id,
+                targets.get(instance_id, (None,))[0] or "无",
+                fmt(running.get(instance_id)),
+            ]
+            for port in ports:
+                row.append(fmt(probed.get(instance_id, {}).get(port)))
+            table_data.append(row)
+        headers = ["实例ID", "公网IP", "Running耗时(秒)"] + [
+            f"端口{port}耗时(秒)" for port in ports
+        ]
+        print(tabulate(table_data, headers=headers, tablefmt="grid", stralign="left"))
+
+        not_running = [i for i in instance_ids if running.get(i) is None]
+        if not_running:
+            print_error("部分实例尚未进入Running状态，可能需要更多时间")
+            print_warning(f"建议稍后使用 'status {not_running[0]}' 命令手动检查状态")
+        elif all(v is not None for result in probed.values() for v in result.values()):
+            print_success("实例创建成功，所有端口均可连接")
+        else:
+            print_warning("实例已Running，但部分端口尚不可连接")
+
+    def _run_instances_with_fallback(self, instance, vswitch):
+        """
+        按备选规格/交换机依次尝试创建实例，并输出每次尝试的耗时
+        已知无库存的组合排到最后
+        """
+        candidates = fallback_candidates(
+            instance,
+            self.config.get_fallback_instance_types(),
+            self.config.get_fallback_v_switch_ids(),
+        )
+        zones = {vsw_id: zone_id for vsw_id, zone_id, _ in vswitch}
+        matrix = self.stock_matrix.query(
+            self.current_region,
+            [zones[v] for _, v in candidates if v in zones],
+            list(dict.fromkeys(t for t, _ in candidates)),
+            instance.SpotStrategy,
+        )
+        candidates.sort(
+            key=lambda c: 0 if in_stock(matrix, zones.get(c[1]), c[0]) else 1
+        )
+        print_info(f"共 {len(candidates)} 个备选组合")
+        try:
+            instance_id, attempts = run_with_fallback(self.api, instance, candidates)
+        except TeaException as e:
+            print_error(f"创建实例失败: {e.code} - {e.message}")
+            return None
+        for i, attempt in enumerate(attempts, 1):
+            message = (
+                f"[{i}] {attempt['instance_type']} @ {attempt['v_switch_id']} "
+                f"耗时 {attempt['elapsed']:.2f}秒"
+            )
+            if attempt["error"]:
+                print_warning(f"{message} 失败: {attempt['error']}")
+            else:
+                print_success(f"{message} 创建成功")
+        if not instance_id:
+            print_error("所有备选组合均无库存，创建实例失败")
+        return instance_id
+
+    def _race_instances(self, instance, vswitch):
+        """
+        在所选交换机及配置的备选交换机上竞速创建实例，并输出各可用区的耗时
+        """
+        zones = {vsw_id: zone_id for vsw_id, zone_id, _ in vswitch}
+        v_switch_ids = [instance.VSwitchId] + [
+            v
+            for v in self.config.get_fallback_v_switch_ids()
+            if v != instance.VSwitchId
+        ]
+        matrix = self.stock_matrix.query(
+            self.current_region,
+            [zones[v] for v in v_switch_ids if v in zones],
+            [instance.InstanceType],
+            instance.SpotStrategy,
+        )
+        stocked = [
+            v
+            for v in v_switch_ids
+            if in_stock(matrix, zones.get(v), instance.InstanceType)
+        ]
+        # 只在有库存的可用区竞速，都查不到库存时仍全部尝试
+        if stocked:
+            v_switch_ids = stocked
+        if len(v_switch_ids) < 2:
+            print_warning("没有其他有库存的备选交换机，仅在单个可用区创建")
+        candidates = [(v, zones.get(v, "未知")) for v in v_switch_ids]
+
+        print_info(f"正在 {len(candidates)} 个可用区同时创建实例...")
+        winner, results = race_launch(self.api, instance, candidates)
+
+        def fmt(value):
+            return f"{value:.1f}" if value is not None else "-"
+
+        table_data = []
+        for r in sorted(results, key=lambda r: r["running_elapsed"] or float("inf")):
+            if r["winner"]:
+                result = "保留"
+            elif r["error"]:
+                result = f"失败: {r['error']}"
+            elif r["released"]:
+                result = "已释放"
+            else:
+                result = "释放失败"
+            table_data.append(
+                [
+                    r["zone_id"],
+                    r["v_switch_id"],
+                    r["instance_id"] or "-",
+                    fmt(r["submit_elapsed"]),
+                    fmt(r["running_elapsed"]),
+                    result,
+                ]
+            )
+        headers = ["可用区", "VSwitch ID", "实例ID", "提交耗时(秒)", "Running耗时(秒)", "结果"]
+        print(tabulate(table_data, headers=headers, tablefmt="grid", stralign="left"))
+
+        leaked = [
+            r["instance_id"]
+            for r in results
+            if r["instance_id"] and not r["winner"] and not r["released"]
+        ]
+        if leaked:
+            print_error(f"以下实例释放失败，请手动删除: {', '.join(leaked)}")
+        if not winner:
+            print_error("没有实例在超时时间内进入Running状态")
+            return None
+        print_success(f"实例创建成功，保留实例: {winner}")
+        result = self.api.get_describe_instance_attribute(winner)
+        print(self.display_result_instances_table(result))
+        return winner
+
+    def _create_from_pool(self, profile, deadline=None):
+        """
+        从预热实例池取出实例并启动
+        """
+        if profile is True:
+            profile = next(iter(self.pool.profiles), None)
+        if profile not in self.pool.profiles:
+            print_error(f"实例池配置档不存在: {profile}")
+            return
+
+        start = time.monotonic()
+        entry = self.pool.acquire(profile)
+        if entry is None:
+            print_error(f"实例池 {profile} 中没有可用实例，请使用 'pool fill' 补充")
+            return
+        if entry is False:
+            print_error(f"启动实例池 {profile} 中的实例失败，实例已放回池中")
+            return
+        instance_id = entry["instance_id"]
+        print_success(f"已从实例池 {profile} 取出实例 {instance_id}，正在启动...")
+        if deadline:
+            self.api.tag_instances(
+                [instance_id], destroy_tags(deadline), entry["region_id"]
+            )
+            self._schedule_destroy([instance_id], entry["region_id"], deadline)
+        self._wait_until_ready(entry["region_id"], [instance_id], start)
+        print_info("实例池正在后台补充")
+
+    def do_pool(self, arg):
+        """
+        管理预热实例池
+        用法: pool [status|fill [profile]|reconcile]
+        """
+        args, _ = parse_options(arg)
+        action = args[0] if args else "status"
+        if not self.pool.profiles:
+            print_warning("配置文件中没有实例池配置档 (pool.profiles)")
+            return
+
+        if action == "reconcile":
+            removed = self.pool.reconcile()
+            print_success(f"对账完成，移除 {removed} 台已不存在的实例")
+        elif action == "fill":
+            profiles = args[1:] or list(self.pool.profiles)
+            for profile in profiles:
+                print_warning(f"正在补充实例池 {profile}，等待实例创建并停机...")
+                added = self.pool.refill(profile)
+                print_success(f"实例池 {profile} 新增 {added} 台实例")
+        elif action != "status":
+            print_error(f"未知操作: {action}")
+            print("用法: \033[1;32mpool [status|fill [profile]|reconcile]\033[0m")
+            return
+
+        table_data = []
+        for profile, settings in self.pool.profiles.items():
+            entries = self.pool.entries(profile)
+            ready = sum(1 for e in entries if e["status"] == "Stopped")
+            table_data.append(
+                [
+                    profile,
+                    settings.get("size", 0),
+                    ready,
+                    len(entries) - ready,
+                    ", ".join(e["instance_id"] for e in entries) or "-",
+                ]
+            )
+        headers = ["配置档", "目标数量", "可用", "准备中/异常", "实例ID"]
+        print(tabulate(table_data, headers=headers, tablefmt="grid", stralign="left"))
+
+    def do_deploy(self, arg):
+        """
+        通过SSH并发部署
+        用法: deploy <playbook> <instance_id> [instance_id ...]
+        """
+        args, _ = parse_options(arg)
+        if len(args) < 2:
+            print_error("错误: 请指定playbook和实例ID")
+            print("用法: \033[1;32mdeploy <playbook> <instance_id> [instance_id ...]\033[0m")
+            return
+        playbook_name, instance_ids = args[0], args[1:]
+        playbook = self.config.get_deploy_playbooks().get(playbook_name)
+        if playbook is None:
+            print_error(f"playbook不存在: {playbook_name}")
+            return
+
+        instances = self.api.get_describe_instances_by_ids(
+            instance_ids, self.current_region, fields=["public_ip"]
+        )
+        targets = {}
+        for instance_id in instance_ids:
+            ip = instances.get(instance_id, {}).get("public_ip")
+            if ip:
+                targets[instance_id] = ip
+            else:
+                print_warning(f"实例 {instance_id} 不存在或没有公网IP，已跳过")
+        if not targets:
+            return
+
+        settings = self.config.get_deploy_config()
+        key_file = settings.get("key_file")
+
+        def connect(ip):
+            return SSHSession(
+                ip,
+                user=settings.get("user", "root"),
+                password=None if key_file else self.config.get_password(),
+                key_file=key_file,
+                port=settings.get("port", 22),
+            )
+
+        def progress(instance_id, index, total, step):
+            message = (
+                f"[{instance_id}] ({index}/{total}) {step['name']} "
+                f"{step['elapsed']:.1f}秒"
+            )
+            if step["exit_code"] == 0:
+                print_success(message)
             else:
-                print_error("实例创建尚未完成，可能需要更多时间")
-                print_warning(
-                    "建议稍后使用 'status '" + instance_id[0] + " 命令手动检查状态"
+                print_error(f"{message} 退出码 {step['exit_code']}")
+
+        print_warning(f"正在向 {len(targets)} 台实例部署 {playbook_name}...")
+        results = deploy(
+            targets,
+            playbook,
+            connect,
+            workers=settings.get("workers", 10),
+            progress=progress,
+        )
+        print(self.display_deploy_table(results))
+
+    @staticmethod
+    def display_deploy_table(results):
+        """
+        渲染部署结果表格，每个步骤一列耗时
+        按步骤序号分列，截断后同名的命令不会合并成一列
+        :param results: deploy()返回的结果
+        """
+        step_names = {}
+        for result in results.values():
+            for step in result["steps"]:
+                step_names.setdefault(step["index"], step["name"])
+        indexes = sorted(step_names)
+
+        table_data = []
+        for instance_id, result in results.items():
+            timings = {step["index"]: step for step in result["steps"]}
+            row = [instance_id, result["ip"]]
+            for index in indexes:
+                step = timings.get(index)
+                if step is None:
+                    row.append("-")
+                elif step["exit_code"] != 0:
+                    row.append(f"失败({step['exit_code']})")
+                else:
+                    row.append(f"{step['elapsed']:.1f}")
+            row.append(f"{result['elapsed']:.1f}")
+            row.append(result["error"] or "成功")
+            table_data.append(row)
+
+        headers = (
+            ["实例ID", "公网IP"]
+            + [f"{index}. {step_names[index]}" for index in indexes]
+            + ["总耗时(秒)", "结果"]
+        )
+        return tabulate(table_data, headers=headers, tablefmt="grid", stralign="left")
+
+    def do_run(self, arg):
+        """
+        通过云助手批量执行脚本，无需开放入方向端口
+        用法: run <instance_id...|all|key=value> -- <script>
+        例如: run status=Running -- uptime
+        """
+        target_text, separator, script = arg.partition("--")
+        targets = target_text.split()
+        script = script.strip()
+        if not separator or not targets or not script:
+            print_error("错误: 请指定实例和脚本")
+            print("用法: \033[1;32mrun <instance_id...|all|key=value> -- <script>\033[0m")
+            return
+
+        if all(t.startswith("i-") for t in targets):
+            instance_ids = targets
+        else:
+            instances = self.api.get_describe_instances(self.current_region)
+            instance_ids = []
+            for selector in targets:
+                instance_ids.extend(select_instances(instances, selector))
+            instance_ids = list(dict.fromkeys(instance_ids))
+        if not instance_ids:
+            print_warning("没有匹配的实例")
+            return
+
+        print_warning(f"正在 {len(instance_ids)} 台实例上执行: {script}")
+        invoke_ids = self.api.run_command(
+            instance_ids, script, region_id=self.current_region
+        )
+        if not invoke_ids:
+            print_error("提交云助手命令失败")
+            return
+
+        succeeded = 0
+        for result in stream_invocation(self.api, invoke_ids, self.current_region):
+            header = (
+                f"[{result['instance_id']}] {result['status']} "
+                f"退出码 {result['exit_code']}"
+            )
+            if result["status"] == "Success" and result["exit_code"] == 0:
+                succeeded += 1
+                print_success(header)
+            else:
+                print_error(header)
+                if result.get("error_info"):
+                    print_warning(result["error_info"])
+            if result.get("output"):
+                print(result["output"].rstrip())
+        print_info(f"执行完成: {succeeded}/{len(instance_ids)} 台成功")
+
+    def do_images(self, arg):
+        """
+        搜索当前区域的镜像，使用本地缓存的镜像目录
+        用法: images <关键词> [--refresh]
+        例如: images ubuntu 22.04 x86
+        """
+        args, options = parse_options(arg, flags=("refresh",))
+        if options.get("refresh"):
+            print_warning("正在刷新镜像目录...")
+            index = self.image_catalog.load(self.current_region, refresh=True)
+        else:
+            index = self._region_snapshot(self.current_region).get("images")
+        if index is None:
+            print_error("获取镜像目录失败")
+            return
+        if not args:
+            print_info(f"镜像目录共 {len(index.images)} 个镜像，请输入搜索关键词")
+            return
+        print(self.display_images_table(index.search(" ".join(args))))
+
+    def complete_images(self, text, line, begidx, endidx):
+        index = self.image_catalog.cached(self.current_region)
+        return index.complete(text) if index else []
+
+    @staticmethod
+    def display_images_table(images):
+        """
+        渲染镜像信息表格
+        :param images: 镜像信息列表
+        """
+        if not images:
+            return "未找到匹配的镜像"
+        table_data = [
+            [
+                image["ImageId"],
+                image.get("OSNameEn") or image.get("OSName"),
+                image.get("Architecture"),
+                image.get("ImageOwnerAlias"),
+                image.get("Size"),
+            ]
+            for image in images
+        ]
+        headers = ["镜像ID", "操作系统", "架构", "来源", "大小(GiB)"]
+        return tabulate(table_data, headers=headers, tablefmt="grid", stralign="left")
+
+    def do_availability(self, arg):
+        """
+        查询当前区域各可用区的实例规格库存
+        用法: availability [instance_type ...] [--spot <SpotStrategy>]
+        默认查询配置中的实例规格和备选规格
+        """
+        args, options = parse_options(arg)
+        instance_types = args or list(
+            dict.fromkeys(
+                [self.config.get_instance_type()]
+                + self.config.get_fallback_instance_types()
+            )
+        )
+        spot_strategy = options.get("spot", self.config.get_spot_strategy())
+        vswitch = self._region_snapshot(self.current_region).get("vswitches") or []
+        zones = sorted({zone_id for _, zone_id, _ in vswitch})
+        if not zones:
+            print_warning("当前区域没有交换机，无法确定可用区")
+            return
+
+        print_warning(f"正在查询 {len(zones)} 个可用区的库存...")
+        matrix = self.stock_matrix.query(
+            self.current_region, zones, instance_types, spot_strategy
+        )
+        print(self.display_stock_matrix(matrix, instance_types))
+
+    @staticmethod
+    def display_preflight_table(report):
+        """
+        渲染创建前预检报告
+        :param report: Preflight.run()返回的检查结果列表
+        """
+        labels = {
+            PASSED: "\033[1;32m通过\033[0m",
+            FAILED: "\033[1;31m失败\033[0m",
+            WARNING: "\033[1;33m警告\033[0m",
+        }
+        table_data = [
+            [
+                item["name"],
+                labels.get(item["status"], "跳过"),
+                item["detail"],
+                f"{item['elapsed'] * 1000:.0f}ms",
+            ]
+            for item in report
+        ]
+        return tabulate(
+            table_data, headers=["检查项", "结果", "说明", "耗时"], tablefmt="grid"
+        )
+
+    @staticmethod
+    def display_stock_matrix(matrix, instance_types):
+        """
+        渲染可用区 x 规格的库存矩阵
+        :param matrix: StockMatrix.query()返回的矩阵
+        """
+        labels = {
+            "WithStock": "\033[1;32m有库存\033[0m",
+            "Available": "\033[1;32m有库存\033[0m",
+            "ClosedWithStock": "\033[1;33m库存紧张\033[0m",
+            "WithoutStock": "\033[1;31m无库存\033[0m",
+            "NotOnSale": "不售卖",
+            None: "查询失败",
+        }
+        table_data = []
+        for zone, row in matrix.items():
+            table_data.append(
+                [zone]
+                + [labels.get(row.get(t), row.get(t)) for t in instance_types]
+            )
+        return tabulate(
+            table_data, headers=["可用区"] + instance_types, tablefmt="grid"
+        )
+
+    def do_spothistory(self, arg):
+        """
+        分析竞价实例历史价格，按可用区和规格排序推荐
+        用法: spothistory [instance_type ...] [--zones <zone1,zone2>] [--days <天数>]
+        默认分析配置中的实例规格和备选规格，可用区为当前区域交换机所在的可用区
+        """
+        args, options = parse_options(arg)
+        instance_types = args or list(
+            dict.fromkeys(
+                [self.config.get_instance_type()]
+                + self.config.get_fallback_instance_types()
+            )
+        )
+        if options.get("zones"):
+            zones = [z for z in options["zones"].split(",") if z]
+        else:
+            vswitch = self._region_snapshot(self.current_region).get("vswitches") or []
+            zones = sorted({zone_id for _, zone_id, _ in vswitch})
+        if not zones:
+            print_warning("当前区域没有交换机，请使用 --zones 指定可用区")
+            return
+        try:
+            days = int(options.get("days", 7))
+        except ValueError:
+            print_error("--days 必须是整数")
+            return
+        if not 1 <= days <= HISTORY_MAX_DAYS:
+            print_error(f"--days 范围为 1-{HISTORY_MAX_DAYS}")
+            return
+
+        print_warning(
+            f"正在拉取 {len(zones)} 个可用区、{len(instance_types)} 个规格的竞价历史价格..."
+        )
+        results = self.spot_history.analyze(
+            self.current_region, zones, instance_types, days
+        )
+        print(self.display_spot_history_table(results))
+
+    @staticmethod
+    def display_spot_history_table(results):
+        """
+        渲染竞价历史价格统计表格
+        :param results: SpotHistory.analyze()返回的结果
+        """
+        if not results:
+            return "未找到竞价历史价格"
+
+        table_data = []
+        for i, r in enumerate(results, 1):
+            if not r["samples"]:
+                row = [f"#{i}", r["zone_id"], r["instance_type"], 0]
+                table_data.append(row + ["-"] * 4)
+                continue
+            ratio = f"{r['ratio']:.0%}" if r["ratio"] is not None else "-"
+            table_data.append(
+                [
+                    f"#{i}",
+                    r["zone_id"],
+                    r["instance_type"],
+                    r["samples"],
+                    f"{r['mean']:.4f}",
+                    f"{r['p95']:.4f}",
+                    f"{r['volatility']:.1%}",
+                    ratio,
+                ]
+            )
+        headers = [
+            "排名",
+            "可用区",
+            "实例规格",
+            "样本数",
+            "均价(元/时)",
+            "P95(元/时)",
+            "波动率",
+            "P95/按量价格",
+        ]
+        return tabulate(table_data, headers=headers, tablefmt="grid")
+
+    def do_watch(self, arg):
+        """
+        持续监控当前区域的实例状态，按 Ctrl+C 退出
+        用法: watch [--fast <秒>] [--slow <秒>]
+        有实例处于Pending/Starting/Stopping时按fast间隔轮询，否则按slow间隔
+        """
+        _, options = parse_options(arg)
+        watch_config = self.config.get_watch_config()
+        try:
+            fast = float(options.get("fast", watch_config.get("fast_interval", 2)))
+            slow = float(options.get("slow", watch_config.get("slow_interval", 30)))
+        except ValueError:
+            print_error("--fast/--slow 必须是数字")
+            return
+
+        watcher = InstanceWatcher(
+            self.api,
+            self.current_region,
+            fast_interval=fast,
+            slow_interval=slow,
+            full_refresh=watch_config.get("full_refresh", 120),
+            log_size=watch_config.get("log_size", 10),
+        )
+        renderer = DiffRenderer()
+        try:
+            while True:
+                if not watcher.poll():
+                    # API错误信息已打断画面，从新位置重新绘制
+                    renderer.reset()
+                renderer.draw(self._watch_lines(watcher))
+                time.sleep(watcher.interval)
+        except KeyboardInterrupt:
+            print()
+            print_info(f"已退出监控，共调用API {watcher.api_calls} 次")
+
+    def _watch_lines(self, watcher):
+        """
+        生成监控画面的各行，状态变化记录固定占log_size行，保证行数稳定
+        """
+        colors = {
+            "Running": "\033[1;32m",
+            "Stopped": "\033[1;31m",
+            RELEASED: "\033[1;31m",
+        }
+        widths = (24, 10, 16, 22, 18)
+
+        def status(value, width=0):
+            text = pad(value or "-", width)
+            color = colors.get(value, "\033[1;33m")
+            return f"{color}{text}\033[0m"
+
+        lines = [
+            f"\033[1;36m区域 {watcher.region_id}  实例 {len(watcher.instances)}  "
+            f"轮询间隔 {watcher.interval:g}s  API调用 {watcher.api_calls}  "
+            f"更新于 {time.strftime('%H:%M:%S')}  (Ctrl+C 退出)\033[0m",
+            "".join(
+                pad(header, width)
+                for header, width in zip(
+                    ["实例ID", "状态", "公网IP", "规格", "可用区"], widths
                 )
+            ),
+        ]
+        for inst in watcher.rows():
+            lines.append(
+                pad(inst["instance_id"], widths[0])
+                + status(inst["status"], widths[1])
+                + pad(inst.get("public_ip") or "-", widths[2])
+                + pad(inst.get("instance_type") or "-", widths[3])
+                + pad(inst.get("zone_id") or "-", widths[4])
+            )
+
+        lines.append("\033[1;36m状态变化\033[0m")
+        changes = list(watcher.changes)
+        for changed_at, instance_id, old, new in reversed(changes):
+            lines.append(
+                f"{time.strftime('%H:%M:%S', time.localtime(changed_at))}  "
+                f"{instance_id}  {status(old or '新增')} -> {status(new)}"
+            )
+        lines.extend([""] * (watcher.changes.maxlen - len(changes)))
+        return lines
+
+    def do_ttl(self, arg):
+        """
+        管理实例的定时销毁
+        用法: ttl                                   查看定时销毁计划
+              ttl <instance_id> <时长>              设置存活时长，如 4h
+              ttl <instance_id> --destroy-at <时间> 设置销毁时间
+              ttl cancel <instance_id>              取消定时销毁
+        """
+        args, options = parse_options(arg)
+        if not args:
+            entries = self.expiry.entries()
+            if not entries:
+                print_info("没有定时销毁的实例")
+                return
+            now = time.time()
+            table_data = [
+                [
+                    instance_id,
+                    region_id,
+                    time.strftime("%Y-%m-%d %H:%M", time.localtime(deadline)),
+                    f"{max(deadline - now, 0) / 3600:.1f}",
+                ]
+                for instance_id, region_id, deadline in entries
+            ]
+            headers = ["实例ID", "区域", "销毁时间", "剩余(小时)"]
+            print(tabulate(table_data, headers=headers, tablefmt="grid"))
+            return
+
+        if args[0] == "cancel" and len(args) == 2:
+            if self.expiry.cancel(args[1]):
+                self.api.untag_instances([args[1]], [TAG_KEY])
+                print_success(f"已取消实例 {args[1]} 的定时销毁")
+            else:
+                print_warning(f"实例 {args[1]} 不在定时销毁计划中")
+            return
+
+        if len(args) == 2:
+            options["ttl"] = args[1]
+        try:
+            deadline = self._parse_deadline(options)
+        except ValueError as e:
+            print_error(str(e))
+            return
+        if deadline is None:
+            print_error("请指定存活时长或 --destroy-at")
+            return
+        instance_id = args[0]
+        if not self.api.tag_instances([instance_id], destroy_tags(deadline)):
+            return
+        self._schedule_destroy([instance_id], self.current_region, deadline)
+
+    def complete_ttl(self, text, line, begidx, endidx):
+        return self.completions.complete("instances", text, self.current_region)
 
     def do_delete(self, arg):
         """
@@ -423,6 +1814,8 @@ class AliyunECSConsole(cmd.Cmd):
             return
 
         print_success(f"删除实例 {arg} 的请求已发送")
+        self.expiry.cancel(arg)
+        self.completions.invalidate("instances", self.current_region)
         print_warning("实例删除需要一段时间完成，请耐心等待...")
 
         # 添加10秒倒计时
@@ -556,8 +1949,96 @@ class AliyunECSConsole(cmd.Cmd):
         )
 
     def do_templates(self, arg):
-        data = self.api.get_describe_launch_templates()
-        self.display_launch_templates_table(data)
+        """
+        查看启动模板
+        用法: templates [--refresh]
+              templates --versions [模板名称|ID]
+              templates --diff <模板名称|ID> <版本1> <版本2>
+        """
+        args, options = parse_options(arg, flags=("refresh", "versions"))
+        if options.get("refresh"):
+            print_warning("正在刷新启动模板...")
+            with self._snapshots_lock:
+                self.snapshots.pop(self.current_region, None)
+            data = self.template_catalog.load(self.current_region, refresh=True)
+        else:
+            data = self._region_snapshot(self.current_region).get("launch_templates")
+
+        if options.get("diff"):
+            template = find_template(data, options["diff"])
+            if template is None or len(args) != 2:
+                print_error("用法: templates --diff <模板名称|ID> <版本1> <版本2>")
+                return
+            old, new = (find_version(template, v) for v in args)
+            if old is None or new is None:
+                print_error("模板版本不存在")
+                return
+            print(self.display_template_diff_table(diff_versions(old, new), *args))
+        elif options.get("versions"):
+            if args:
+                template = find_template(data, args[0])
+                if template is None:
+                    print_error(f"模板 {args[0]} 不存在")
+                    return
+                selected = [template]
+            else:
+                selected = data["launch_templates"] if data else []
+            for template in selected:
+                self.display_template_versions_table(template)
+        else:
+            self.display_launch_templates_table(data)
+
+    @staticmethod
+    def display_template_versions_table(template):
+        """
+        以表格形式展示启动模板的版本
+        :param template: 填充了version_details的模板信息
+        """
+        print(
+            f"\n\033[1;36m{template['launch_template_name']} "
+            f"({template['launch_template_id']})\033[0m"
+        )
+        table_data = []
+        for version in template["version_details"]:
+            data = version["launch_template_data"]
+            table_data.append(
+                [
+                    version["version_number"],
+                    "是" if version["default_version"] else "",
+                    data.get("InstanceType"),
+                    data.get("ImageId"),
+                    data.get("VSwitchId"),
+                    data.get("SpotStrategy"),
+                    version.get("version_description"),
+                    version.get("modified_time") or version.get("create_time"),
+                ]
+            )
+        headers = [
+            "版本",
+            "默认",
+            "实例规格",
+            "镜像ID",
+            "交换机ID",
+            "竞价策略",
+            "描述",
+            "修改时间",
+        ]
+        print(tabulate(table_data, headers=headers, tablefmt="grid", missingval="-"))
+
+    @staticmethod
+    def display_template_diff_table(changes, old_version, new_version):
+        """
+        渲染两个模板版本的差异表格
+        :param changes: diff_versions()返回的差异列表
+        """
+        if not changes:
+            return "两个版本的配置相同"
+        return tabulate(
+            changes,
+            headers=["配置项", f"版本 {old_version}", f"版本 {new_version}"],
+            tablefmt="grid",
+            missingval="-",
+        )
 
     @staticmethod
     def display_launch_templates_table(data):
@@ -631,6 +2112,11 @@ class AliyunECSConsole(cmd.Cmd):
 
     def do_instances(self, arg):
         instances = self.api.get_describe_instances(self.current_region)
+        self.completions.update(
+            "instances",
+            self.current_region,
+            [inst["instance_id"] for inst in instances],
+        )
         table = self.display_instances_table(instances)
         print(table)
 
@@ -667,6 +2153,51 @@ class AliyunECSConsole(cmd.Cmd):
             numalign="left",
         )
 
+    @staticmethod
+    def display_cost_table(ledger):
+        """
+        渲染实例费用表格
+        :param ledger: PriceBook.build_ledger()返回的结果
+        :return: 格式化表格字符串
+        """
+        if not ledger or not ledger["rows"]:
+            return "当前区域没有运行中的实例"
+
+        def fmt(value):
+            return f"{value:.4f}" if value is not None else "查询失败"
+
+        table_data = []
+        for row in ledger["rows"]:
+            table_data.append(
+                [
+                    row["instance_id"],
+                    row["instance_type"],
+                    row["zone_id"],
+                    row["spot_strategy"],
+                    fmt(row["hourly"]),
+                    fmt(row["daily"]),
+                ]
+            )
+        table_data.append(
+            [
+                "合计",
+                f"{len(ledger['rows'])} 台",
+                "",
+                f"{ledger['distinct_keys']} 种配置",
+                fmt(ledger["hourly_total"]),
+                fmt(ledger["daily_total"]),
+            ]
+        )
+
+        headers = ["实例ID", "规格", "可用区", "竞价策略", "元/小时", "元/天"]
+        return tabulate(
+            table_data,
+            headers=headers,
+            tablefmt="grid",
+            stralign="left",
+            numalign="right",
+        )
+
     @staticmethod
     def display_security_groups_table(security_groups):
         """
@@ -694,7 +2225,14 @@ class AliyunECSConsole(cmd.Cmd):
                 if protocol == "ALL":
                     protocol = "全部协议"
 
-                rule_data.append([rule["PortRange"], protocol, rule["SourceCidrIp"]])
+                # 授权对象可能是IPv4/IPv6网段、其他安全组或前缀列表
+                source = (
+                    rule["SourceCidrIp"]
+                    or rule.get("Ipv6SourceCidrIp")
+                    or rule.get("SourceGroupId")
+                    or rule.get("SourcePrefixListId")
+                )
+                rule_data.append([rule["PortRange"], protocol, source])
 
             if not rule_data:
                 rule_table = "此安全组暂无规则"
@@ -716,10 +2254,11 @@ class AliyunECSConsole(cmd.Cmd):
         return "\n".join(all_tables)
 
     @staticmethod
-    def display_vswitch_table(extracted_data):
+    def display_vswitch_table(extracted_data, stock=None):
         """
         渲染VSwitch信息表格
         :param extracted_data: extract_vswitch_info()返回的数据
+        :param stock: 可用区到库存状态的字典 (可选)，提供时增加库存列
         :return: 格式化表格字符串
         """
         if not extracted_data:
@@ -728,10 +2267,15 @@ class AliyunECSConsole(cmd.Cmd):
         # 准备表格数据
         table_data = []
         for i, (vsw_id, zone_id, vpc_id) in enumerate(extracted_data, 1):
-            table_data.append([f"#{i}", vsw_id, zone_id, vpc_id])
+            row = [f"#{i}", vsw_id, zone_id, vpc_id]
+            if stock is not None:
+                row.append(stock.get(zone_id) or "未知")
+            table_data.append(row)
 
         # 创建表格
         headers = ["序号", "VSwitch ID", "可用区", "VPC ID"]
+        if stock is not None:
+            headers.append("库存")
         return tabulate(table_data, headers=headers, tablefmt="grid", stralign="left")
 
     @staticmethod
@@ -820,14 +2364,10 @@ class AliyunECSConsole(cmd.Cmd):
             HostName = "vps"
             Password = get_user_input("输入root密码: ")
             InstanceChargeType = get_user_input("请输入实例的付费方式: ", "PostPaid")
-            vswitch = self.api.get_v_switch(self.current_region)
-            print(self.display_vswitch_table(vswitch))
-            VSwitchId = get_user_input("请输入VSwitchId: ")
-            securityGroups = self.api.get_all_describe_security_group_attribute(
-                self.current_region
-            )
-            print(self.display_security_groups_table(securityGroups))
-            SecurityGroupId = get_user_input("请输入SecurityGroupId： ")
+            snapshot = self._region_snapshot(self.current_region)
+            vswitch = snapshot.get("vswitches") or []
+            VSwitchId = self._choose_v_switch(vswitch, InstanceType, SpotStrategy)
+            SecurityGroupId = self._choose_security_group(self.current_region)
             instance = Instance(
                 RegionId=RegionId,
                 InstanceType=InstanceType,
@@ -846,23 +2386,7 @@ class AliyunECSConsole(cmd.Cmd):
                 HostName=HostName,
             )
 
+            started = time.monotonic()
             instance_id = self.api.run_instances(instance=instance)
-            print_success(f"实例创建请求已发送，实例ID: {instance_id[0]}")
-            print("等待系统处理中...")
-            for i in range(10, 0, -1):
-                print(f"\033[1;33m倒计时: {i}秒\033[0m", end="\r")
-                time.sleep(1)
-            status = self.api.get_instance_status(self.current_region, instance_id[0])
-            if (
-                status["Data"]["TotalCount"] == 1
-                and status["Data"]["InstanceStatus"][0]["Status"] == "Running"
-            ):
-                print_success("实例创建成功，状态为 Running")
-                result = self.api.get_describe_instance_attribute(instance_id[0])
-                instance_result = self.display_result_instances_table(result)
-                print(instance_result)
-            else:
-                print_error("实例创建尚未完成，可能需要更多时间")
-                print_warning(
-                    "建议稍后使用 'status '" + instance_id[0] + " 命令手动检查状态"
-                )
+            print_success(f"实例创建请求已发送，实例ID: {', '.join(instance_id)}")
+            self._wait_until_ready(self.current_region, instance_id, started)
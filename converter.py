@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+SDK响应转换模块，按声明的字段把SDK模型对象转换为字典，只转换调用方需要的字段
+
+每个接口声明一个Schema，Field描述输出键、SDK属性名(或取值函数)和服务端字段名：
+
+    INSTANCE.project(["instance_id", "status"]).convert(items)
+
+投影后的Schema同时给出只包含这些字段的服务端Field参数(api_fields)，
+服务端少返回的字段不再经过SDK反序列化，本地也只构造需要的键
+"""
+
+from operator import attrgetter
+
+
+class Field:
+    """
+    一个输出字段
+
+    Args:
+        key: 输出字典中的键
+        path: SDK模型的属性名，或以模型对象为参数的取值函数(用于需要组合多个属性的字段)
+        api_fields: 服务端字段名，用于DescribeInstances等接口的Field参数
+        convert: 非空值的转换函数，如 int
+        default: 值为空时的默认值
+    """
+
+    __slots__ = ("key", "api_fields", "getter")
+
+    def __init__(self, key, path, api_fields=(), convert=None, default=None):
+        self.key = key
+        self.api_fields = (api_fields,) if isinstance(api_fields, str) else api_fields
+        get = path if callable(path) else attrgetter(path)
+
+        if convert is None and default is None:
+            self.getter = get
+            return
+
+        def getter(obj):
+            value = get(obj)
+            if not value:
+                return default
+            return convert(value) if convert else value
+
+        self.getter = getter
+
+
+def _converter(fields):
+    """
+    为一组字段生成转换函数，(键, 取值函数)列表在投影时生成一次
+    """
+    getters = [(field.key, field.getter) for field in fields]
+
+    def convert(items):
+        return [{key: get(item) for key, get in getters} for item in items]
+
+    return convert
+
+
+class Schema:
+    """
+    一个接口的响应字段声明
+    """
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+        self._by_key = {field.key: field for field in self.fields}
+        self._convert = _converter(self.fields)
+        self._projections = {}
+
+    @property
+    def keys(self):
+        return [field.key for field in self.fields]
+
+    @property
+    def api_fields(self):
+        """
+        服务端字段名列表(去重并保持顺序)
+        """
+        return list(
+            dict.fromkeys(name for field in self.fields for name in field.api_fields)
+        )
+
+    def project(self, keys=None):
+        """
+        只保留指定的输出键，keys为空时返回自身；相同的投影复用同一个Schema
+
+        Raises:
+            KeyError: 键不在Schema中
+        """
+        if not keys:
+            return self
+        keys = tuple(keys)
+        schema = self._projections.get(keys)
+        if schema is None:
+            schema = self._projections[keys] = Schema(self._by_key[k] for k in keys)
+        return schema
+
+    def convert_one(self, item):
+        return self._convert((item,))[0]
+
+    def convert(self, items):
+        """
+        转换SDK模型对象列表，items为None时返回空列表
+        """
+        if not items:
+            return []
+        return self._convert(items)
+
+
+def _public_ip(item):
+    """
+    优先使用弹性公网IP，其次为分配的公网IP
+    """
+    eip = item.eip_address
+    if eip and eip.ip_address:
+        return eip.ip_address
+    public = item.public_ip_address
+    if public and public.ip_address:
+        return public.ip_address[0]
+    return None
+
+
+# DescribeInstances
+INSTANCE = Schema(
+    [
+        Field("instance_id", "instance_id", "InstanceId"),
+        Field("public_ip", _public_ip, ("EipAddress", "PublicIpAddress")),
+        Field("os_name", "os_name", "OSName"),
+        Field("status", "status", "Status"),
+        Field("instance_type", "instance_type", "InstanceType"),
+        Field("zone_id", "zone_id", "ZoneId"),
+        Field("instance_charge_type", "instance_charge_type", "InstanceChargeType"),
+        Field("spot_strategy", "spot_strategy", "SpotStrategy"),
+        Field("internet_charge_type", "internet_charge_type", "InternetChargeType"),
+        Field(
+            "internet_max_bandwidth_out",
+            "internet_max_bandwidth_out",
+            "InternetMaxBandwidthOut",
+        ),
+        Field("creation_time", "creation_time", "CreationTime"),
+    ]
+)
+
+# DescribeInstanceTypes
+INSTANCE_TYPE = Schema(
+    [
+        Field("InstanceTypeId", "instance_type_id"),
+        Field("CpuCoreCount", "cpu_core_count"),
+        Field("MemorySize", "memory_size", convert=lambda v: f"{v} GiB"),
+        Field("GPUAmount", "gpu_amount", default=0),
+        Field("GPUSpec", "gpu_spec", default="N/A"),
+        Field("LocalStorageCategory", "local_storage_category", default="cloud"),
+        Field("LocalStorageAmount", "local_storage_amount", default=0),
+        Field(
+            "LocalStorageSize",
+            "local_storage_size",
+            convert=lambda v: f"{v} GiB",
+            default="0 GiB",
+        ),
+        Field("NetworkCardQuantity", "eni_quantity"),
+        Field("EniPrivateIpAddressQuantity", "eni_private_ip_address_quantity"),
+        Field("InstanceTypeFamily", "instance_type_family"),
+    ]
+)
+
+# DescribeSecurityGroups
+SECURITY_GROUP = Schema(
+    [
+        Field("SecurityGroupId", "security_group_id"),
+        Field("SecurityGroupName", "security_group_name"),
+        Field("Description", "description"),
+        Field("VpcId", "vpc_id"),
+        Field("CreationTime", "creation_time"),
+        Field("SecurityGroupType", "security_group_type", default=""),
+    ]
+)
+
+# DescribeRegions
+REGION = Schema(
+    [
+        Field("RegionId", "region_id"),
+        Field("LocalName", "local_name"),
+        Field("RegionEndpoint", "region_endpoint"),
+    ]
+)
+
+# DescribeImages
+IMAGE = Schema(
+    [
+        Field("ImageId", "image_id"),
+        Field("ImageName", "image_name"),
+        Field("OSName", "osname"),
+        Field("OSNameEn", "osname_en"),
+        Field("Platform", "platform"),
+        Field("Architecture", "architecture"),
+        Field("OSType", "ostype"),
+        Field("ImageOwnerAlias", "image_owner_alias"),
+        Field("Size", "size"),
+        Field("CreationTime", "creation_time"),
+    ]
+)
+
+# DescribeSpotPriceHistory
+SPOT_PRICE = Schema(
+    [
+        Field("zone_id", "zone_id"),
+        Field("instance_type", "instance_type"),
+        Field("timestamp", "timestamp"),
+        Field("spot_price", "spot_price"),
+        Field("origin_price", "origin_price"),
+    ]
+)
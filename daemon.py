@@ -0,0 +1,603 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+守护进程模块，在一个进程中常驻AliyunAPI客户端、资源缓存和限流器，通过本地Unix套接字提供服务
+
+多个脚本共用守护进程时，SDK导入和客户端初始化只发生一次，相同的查询共享缓存，
+所有API调用经过同一个限流器
+
+协议: 每行一个JSON对象，一个连接上可以依次发送多个请求
+    请求 {"id": 1, "op": "instances", "params": {"region_id": "cn-hangzhou"}}
+    响应 {"id": 1, "ok": true, "result": [...]} 或 {"id": 1, "ok": false, "error": "..."}
+
+运行: python main.py --serve      (或 python daemon.py)
+调用: python main.py --call instances region_id=cn-hangzhou
+"""
+
+import argparse
+import inspect
+import itertools
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+from availability import StockMatrix
+from cache import DiskCache, TTLCache
+from images import ImageCatalog
+from instance import Instance
+from pricing import LEDGER_FIELDS, PriceBook
+
+# 会改变实例列表的操作，执行后清空实例相关缓存
+MUTATING_OPS = ("create", "delete", "start", "stop")
+
+
+class DaemonError(Exception):
+    """
+    守护进程返回的错误，或无法连接守护进程
+    """
+
+
+def _as_list(value):
+    """
+    参数可以是列表，也可以是逗号分隔的字符串(命令行调用时)
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return list(value)
+
+
+def parse_params(items):
+    """
+    解析命令行的 key=value 参数，值按JSON解析，解析失败时作为字符串
+
+    Raises:
+        ValueError: 参数不是 key=value 格式
+    """
+    params = {}
+    for item in items or []:
+        key, sep, value = item.partition("=")
+        if not sep or not key:
+            raise ValueError(f"参数格式应为 key=value: {item}")
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+
+class ApiService:
+    """
+    守护进程提供的操作
+
+    查询结果按参数缓存，同一个键同时只有一个连接在加载，其余连接等待并共享结果；
+    实例列表、状态和余额使用短缓存，创建、删除、启停实例后立即失效
+    """
+
+    def __init__(self, api, config, limiter=None):
+        """
+        Args:
+            api: AliyunAPI实例
+            config: Config实例
+            limiter: ratelimit.RateLimiter，可选，仅用于统计
+        """
+        self.api = api
+        self.config = config
+        self.limiter = limiter
+        self.inventory = TTLCache(config.get_daemon_inventory_ttl())
+        self.catalog = TTLCache(config.get_daemon_catalog_ttl())
+        self.price_book = PriceBook(api, config, ttl=config.get_price_cache_ttl())
+        self.stock_matrix = StockMatrix(api, ttl=config.get_stock_cache_ttl())
+        self.image_catalog = ImageCatalog(
+            api, DiskCache(config.get_cache_dir()), ttl=config.get_image_cache_ttl()
+        )
+        self.started_at = time.time()
+        self.requests = {}
+        self.hits = 0
+        self.misses = 0
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.operations = {
+            "ping": self.ping,
+            "stats": self.stats,
+            "regions": self.regions,
+            "instances": self.instances,
+            "status": self.status,
+            "attribute": self.attribute,
+            "balance": self.balance,
+            "instance_types": self.instance_types,
+            "security_groups": self.security_groups,
+            "vswitches": self.vswitches,
+            "images": self.images,
+            "stock": self.stock,
+            "price": self.price,
+            "cost": self.cost,
+            "create": self.create,
+            "delete": self.delete,
+            "start": self.start,
+            "stop": self.stop,
+        }
+
+    # ---------- 缓存 ----------
+
+    def _cached(self, cache, key, loader, refresh=False):
+        """
+        读取缓存，未命中时加载并缓存；多个连接同时请求同一个键时只加载一次
+
+        loader返回None(调用失败)时不缓存，等待中的连接各自重试
+        """
+        if not refresh:
+            value = cache.get(key)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        with self._lock:
+            event = self._loading.get(key)
+            leader = event is None
+            if leader:
+                event = self._loading[key] = threading.Event()
+        if not leader:
+            event.wait()
+            value = cache.get(key)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                return value
+
+        try:
+            with self._lock:
+                self.misses += 1
+            value = loader()
+            if value is not None:
+                cache.set(key, value)
+            return value
+        finally:
+            if leader:
+                with self._lock:
+                    self._loading.pop(key, None)
+                event.set()
+
+    def _region(self, region_id):
+        return region_id or self.api.region_id
+
+    # ---------- 操作 ----------
+
+    def ping(self):
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started_at, 1),
+            "region_id": self.api.region_id,
+        }
+
+    def stats(self):
+        with self._lock:
+            result = {
+                "requests": dict(self.requests),
+                "cache": {"hits": self.hits, "misses": self.misses},
+            }
+        if self.limiter is not None:
+            result["rate_limiter"] = self.limiter.stats()
+        return result
+
+    def regions(self, refresh=False):
+        return self._cached(
+            self.catalog, ("regions",), self.api.get_describe_regions, refresh
+        )
+
+    def instances(self, region_id=None, fields=None, refresh=False):
+        """
+        实例列表，fields为需要的字段(见converter.INSTANCE)，为空时返回全部字段
+        """
+        region_id = self._region(region_id)
+        fields = tuple(_as_list(fields) or ())
+        return self._cached(
+            self.inventory,
+            ("instances", region_id, fields),
+            lambda: self.api.get_describe_instances(region_id, fields=fields or None),
+            refresh,
+        )
+
+    def status(self, instance_ids, region_id=None, refresh=False):
+        region_id = self._region(region_id)
+        instance_ids = tuple(sorted(_as_list(instance_ids)))
+        return self._cached(
+            self.inventory,
+            ("status", region_id, instance_ids),
+            lambda: self.api.get_instances_status(region_id, instance_ids),
+            refresh,
+        )
+
+    def attribute(self, instance_id, refresh=False):
+        return self._cached(
+            self.inventory,
+            ("attribute", instance_id),
+            lambda: self.api.get_describe_instance_attribute(instance_id),
+            refresh,
+        )
+
+    def balance(self, refresh=False):
+        return self._cached(
+            self.inventory, ("balance",), self.api.get_account_balance, refresh
+        )
+
+    def instance_types(self, instance_types=None, refresh=False):
+        instance_types = tuple(_as_list(instance_types) or ())
+        return self._cached(
+            self.catalog,
+            ("instance_types", instance_types),
+            lambda: self.api.get_describe_instance_types(list(instance_types) or None),
+            refresh,
+        )
+
+    def security_groups(self, region_id=None, refresh=False):
+        region_id = self._region(region_id)
+        return self._cached(
+            self.catalog,
+            ("security_groups", region_id),
+            lambda: self.api.get_describe_security_groups(region_id),
+            refresh,
+        )
+
+    def vswitches(self, region_id=None, refresh=False):
+        """
+        Returns:
+            list: [[交换机ID, 可用区, VPC ID]]
+        """
+        region_id = self._region(region_id)
+        return self._cached(
+            self.catalog,
+            ("vswitches", region_id),
+            lambda: self.api.get_v_switch(region_id),
+            refresh,
+        )
+
+    def images(self, region_id=None, query=None, limit=20, refresh=False):
+        """
+        镜像列表，指定query时返回模糊搜索结果
+        """
+        region_id = self._region(region_id)
+        index = self._cached(
+            self.catalog,
+            ("images", region_id),
+            lambda: self.image_catalog.load(region_id, refresh=refresh),
+            refresh,
+        )
+        if index is None:
+            return None
+        return index.search(query, limit) if query else index.images
+
+    def stock(self, zones, instance_types=None, region_id=None, spot_strategy=None):
+        """
+        Returns:
+            dict: {可用区: {规格: 库存状态}}
+        """
+        return self.stock_matrix.query(
+            self._region(region_id),
+            _as_list(zones),
+            _as_list(instance_types) or [self.config.get_instance_type()],
+            spot_strategy=spot_strategy or self.config.get_spot_strategy(),
+        )
+
+    def price(
+        self,
+        instance_type=None,
+        region_id=None,
+        spot_strategy=None,
+        internet_max_bandwidth_out=None,
+        internet_charge_type=None,
+    ):
+        """
+        实例小时价格，未指定的参数使用配置文件中的默认值
+        """
+        inst = {
+            "instance_type": instance_type or self.config.get_instance_type(),
+            "spot_strategy": spot_strategy or self.config.get_spot_strategy(),
+            "internet_max_bandwidth_out": internet_max_bandwidth_out
+            or self.config.get_internet_max_bandwidth_out(),
+            "internet_charge_type": internet_charge_type,
+        }
+        key = self.price_book.pricing_key(inst, self._region(region_id))
+        hourly = self.price_book.hourly_price(key)
+        if hourly is None:
+            return None
+        return {"hourly": hourly, "daily": hourly * 24}
+
+    def cost(self, region_id=None, refresh=False):
+        """
+        地域下运行中实例的费用清单
+        """
+        region_id = self._region(region_id)
+        instances = self.instances(region_id, fields=LEDGER_FIELDS, refresh=refresh)
+        return self.price_book.build_ledger(instances, region_id)
+
+    def create(self, **overrides):
+        """
+        创建实例，参数覆盖config.yml中instance段的同名配置，如 instance_type=ecs.c7.large
+
+        Returns:
+            list: 实例ID列表
+        """
+        instance = Instance(**self.config.get_instance_defaults(overrides))
+        return list(self.api.run_instances(instance))
+
+    def delete(self, instance_ids, region_id=None):
+        """
+        批量强制删除实例
+
+        Returns:
+            list: 每批请求的RequestId
+        """
+        return self.api.delete_instances(
+            _as_list(instance_ids), region_id=self._region(region_id)
+        )
+
+    def start(self, instance_id):
+        return self.api.start_instance(instance_id)
+
+    def stop(self, instance_id, stopped_mode="StopCharging"):
+        return self.api.stop_instance(instance_id, stopped_mode=stopped_mode)
+
+    # ---------- 分发 ----------
+
+    def dispatch(self, op, params):
+        """
+        执行一个操作
+
+        Raises:
+            DaemonError: 操作不存在、参数错误或API调用失败
+        """
+        handler = self.operations.get(op)
+        if handler is None:
+            raise DaemonError(
+                f"未知的操作: {op}，可用操作: {', '.join(sorted(self.operations))}"
+            )
+        try:
+            inspect.signature(handler).bind(**params)
+        except TypeError as e:
+            raise DaemonError(f"{op} 参数错误: {e}")
+
+        with self._lock:
+            self.requests[op] = self.requests.get(op, 0) + 1
+        try:
+            result = handler(**params)
+        finally:
+            if op in MUTATING_OPS:
+                self.inventory.invalidate()
+        if result is None:
+            # AliyunAPI出错时打印错误并返回None，详细信息在守护进程的输出中
+            raise DaemonError(f"{op} 调用失败，详见守护进程输出")
+        return result
+
+    def handle(self, line):
+        """
+        处理一行请求
+
+        Returns:
+            dict: 响应
+        """
+        try:
+            request = json.loads(line)
+            op = request["op"]
+            params = request.get("params") or {}
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return {
+                "id": None,
+                "ok": False,
+                "error": '无效的请求，格式应为 {"op": ..., "params": {...}}',
+            }
+        request_id = request.get("id")
+        try:
+            return {"id": request_id, "ok": True, "result": self.dispatch(op, params)}
+        except DaemonError as e:
+            return {"id": request_id, "ok": False, "error": str(e)}
+        except Exception as e:
+            return {"id": request_id, "ok": False, "error": f"{op} 执行出错: {e}"}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    处理一个客户端连接，按行读取请求并依次返回响应
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = self.server.service.handle(line)
+            data = json.dumps(response, ensure_ascii=False, default=str)
+            try:
+                self.wfile.write(data.encode("utf-8") + b"\n")
+            except OSError:
+                return
+
+
+class DaemonServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Unix套接字服务，每个连接一个线程
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path, service):
+        self.path = path
+        self.service = service
+        _claim_socket(path)
+        super().__init__(path, _RequestHandler)
+        # 套接字可以调用账号下的所有操作，只允许当前用户访问
+        os.chmod(path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def _claim_socket(path):
+    """
+    清理上次异常退出遗留的套接字文件
+
+    Raises:
+        DaemonError: 已有守护进程在监听该套接字
+    """
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise DaemonError(f"已有守护进程在监听 {path}")
+
+
+class DaemonClient:
+    """
+    守护进程客户端，连接在多次调用之间复用，可以在多个线程中共用
+    """
+
+    def __init__(self, path, timeout=None):
+        """
+        Args:
+            path: 套接字路径
+            timeout: 等待响应的超时时间(秒)，为空时一直等待
+        """
+        self.path = path
+        self.timeout = timeout
+        self._file = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise DaemonError(
+                f"无法连接守护进程 {self.path}: {e}，请先运行 python main.py --serve"
+            )
+        self._file = sock.makefile("rwb")
+        # makefile返回的文件持有套接字的引用，关闭文件即关闭连接
+        sock.close()
+
+    def call(self, op, **params):
+        """
+        调用守护进程的操作
+
+        Returns:
+            操作结果
+
+        Raises:
+            DaemonError: 连接失败或操作失败
+        """
+        with self._lock:
+            if self._file is None:
+                self._connect()
+            request = {"id": next(self._ids), "op": op, "params": params}
+            try:
+                self._file.write(
+                    json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n"
+                )
+                self._file.flush()
+                line = self._file.readline()
+            except OSError as e:
+                self.close()
+                raise DaemonError(f"与守护进程通信失败: {e}")
+            if not line:
+                self.close()
+                raise DaemonError("守护进程已断开连接")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise DaemonError(response.get("error"))
+        return response.get("result")
+
+    def close(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def serve(config, socket_path=None, cassette=None):
+    """
+    启动守护进程，直到收到Ctrl+C
+
+    Args:
+        config: Config实例
+        socket_path: 套接字路径，为空时使用配置文件中的路径
+        cassette: API流量录制/回放，可选，包在限流器内层
+    """
+    from api import AliyunAPI
+    from journal import Journal
+    from ratelimit import RateLimiter
+
+    access_key_id, access_key_secret = config.get_access_key()
+    api = AliyunAPI(access_key_id, access_key_secret)
+    limiter = RateLimiter(
+        rate=config.get_daemon_rate(),
+        burst=config.get_daemon_burst(),
+        methods=config.get_daemon_method_rates(),
+        inner=cassette,
+    )
+    api.set_cassette(limiter)
+    api.set_region(config.get_default_region())
+
+    path = socket_path or config.get_daemon_socket()
+    server = DaemonServer(path, ApiService(api, config, limiter))
+
+    # 回放时的操作没有真正发生，不写入操作日志
+    journal = None
+    if not limiter.replaying:
+        journal = Journal(
+            config.get_journal_file(),
+            flush_interval=config.get_journal_flush_interval(),
+        )
+        journal.start()
+        api.set_journal(journal)
+
+    print(f"\033[1;32m守护进程已启动 (pid {os.getpid()})，监听 {path}\033[0m", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if journal is not None:
+            journal.close()
+        print(limiter.summary())
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="ECS控制台守护进程")
+    parser.add_argument("--socket", help="套接字路径 (默认使用config.yml中daemon.socket)")
+    args = parser.parse_args()
+    try:
+        serve(Config(), socket_path=args.socket)
+    except DaemonError as e:
+        print(f"\033[1;31m{e}\033[0m")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+部署模块，通过SSH并发向多台实例上传文件并执行部署步骤
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import paramiko
+except ImportError:  # paramiko为可选依赖，仅deploy命令需要
+    paramiko = None
+
+
+class SSHSession:
+    """
+    基于paramiko的SSH会话，提供deploy所需的上传和执行命令接口
+    """
+
+    def __init__(
+        self, host, user="root", password=None, key_file=None, port=22, timeout=10
+    ):
+        if paramiko is None:
+            raise RuntimeError("deploy 需要安装 paramiko: pip install paramiko")
+        self.client = paramiko.SSHClient()
+        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self.client.connect(
+            host,
+            port=port,
+            username=user,
+            password=password,
+            key_filename=key_file,
+            timeout=timeout,
+            look_for_keys=False,
+            allow_agent=False,
+        )
+        self._sftp = None
+
+    def put(self, src, dest):
+        """
+        上传本地文件
+        """
+        if self._sftp is None:
+            self._sftp = self.client.open_sftp()
+        self._sftp.put(src, dest)
+
+    def run(self, command):
+        """
+        执行命令
+
+        标准错误合并到标准输出中读取：分别读取两个流时，命令在标准错误写满
+        通道窗口后会阻塞，而这边还在等待标准输出结束，两边互相等待
+
+        Returns:
+            tuple: (退出码, 标准输出与标准错误，按输出顺序交错)
+        """
+        channel = self.client.get_transport().open_session()
+        channel.set_combine_stderr(True)
+        channel.exec_command(command)
+        chunks = []
+        while True:
+            data = channel.recv(32768)
+            if not data:
+                break
+            chunks.append(data)
+        exit_code = channel.recv_exit_status()
+        channel.close()
+        return exit_code, b"".join(chunks).decode("utf-8", "replace")
+
+    def close(self):
+        if self._sftp is not None:
+            self._sftp.close()
+        self.client.close()
+
+
+def playbook_steps(playbook):
+    """
+    将playbook配置展开为步骤列表
+
+    Args:
+        playbook: {"upload": [{"src": ..., "dest": ...}], "steps": ["命令", ...]}
+
+    Returns:
+        list: [(步骤名称, 类型, 参数), ...]
+    """
+    steps = []
+    for item in playbook.get("upload") or []:
+        steps.append((f"上传 {item['dest']}", "put", (item["src"], item["dest"])))
+    for command in playbook.get("steps") or []:
+        name = command if len(command) <= 40 else command[:37] + "..."
+        steps.append((name, "run", (command,)))
+    return steps
+
+
+def deploy(targets, playbook, connect, workers=10, progress=None):
+    """
+    并发在多台主机上执行playbook，每台主机内的步骤按顺序执行
+
+    Args:
+        targets: {实例ID: ip}
+        playbook: playbook配置
+        connect: 建立会话的函数 connect(ip) -> 具有put/run/close方法的对象，
+            测试时可传入本地SSH服务或进程内的替身
+        workers: 最大并发主机数
+        progress: 进度回调 progress(实例ID, 步骤序号, 步骤总数, 步骤结果)
+
+    Returns:
+        dict: {实例ID: {"ip", "steps": [步骤结果], "error", "elapsed"}}
+        步骤结果包含 index(从1开始的步骤序号)、name、elapsed、exit_code、output
+    """
+    steps = playbook_steps(playbook)
+    results = {}
+    lock = threading.Lock()
+
+    def run_host(instance_id, ip):
+        start = time.monotonic()
+        result = {"ip": ip, "steps": [], "error": None, "elapsed": None}
+        session = None
+        try:
+            session = connect(ip)
+            for index, (name, kind, params) in enumerate(steps, 1):
+                step_start = time.monotonic()
+                if kind == "put":
+                    session.put(*params)
+                    exit_code, output = 0, ""
+                else:
+                    exit_code, output = session.run(*params)
+                step = {
+                    "index": index,
+                    "name": name,
+                    "elapsed": time.monotonic() - step_start,
+                    "exit_code": exit_code,
+                    "output": output,
+                }
+                result["steps"].append(step)
+                if progress:
+                    with lock:
+                        progress(instance_id, index, len(steps), step)
+                if exit_code != 0:
+                    result["error"] = f"步骤 {name} 退出码 {exit_code}"
+                    break
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            if session is not None:
+                session.close()
+        result["elapsed"] = time.monotonic() - start
+        return instance_id, result
+
+    workers = max(1, min(workers, len(targets)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(run_host, instance_id, ip)
+            for instance_id, ip in targets.items()
+        ]
+        for future in futures:
+            instance_id, result = future.result()
+            results[instance_id] = result
+    return results
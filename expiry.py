@@ -0,0 +1,432 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+实例定时销毁模块，按到期时间自动释放实例，可在控制台后台或独立进程中运行
+
+独立运行: python expiry.py [region_id ...]
+"""
+
+import heapq
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows没有fcntl，此时不支持多个进程共用状态文件
+    fcntl = None
+
+# 记录销毁时间的实例标签键，值为UTC时间，如 2024-01-01T08:00:00Z
+TAG_KEY = "ecs-console:destroy-at"
+
+_TTL_PATTERN = re.compile(r"(\d+)([smhd])")
+_TTL_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_TAG_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def parse_ttl(text):
+    """
+    解析存活时长，如 "90m"、"4h"、"1d12h"，纯数字视为小时
+
+    Returns:
+        int: 秒数
+    """
+    text = str(text).strip().lower()
+    if text.isdigit():
+        return int(text) * 3600
+    parts = _TTL_PATTERN.findall(text)
+    if not parts or "".join(n + u for n, u in parts) != text:
+        raise ValueError(f"无法解析存活时长: {text}")
+    return sum(int(n) * _TTL_UNITS[u] for n, u in parts)
+
+
+def parse_destroy_at(text):
+    """
+    解析销毁时间，支持本地时间 "2024-01-01 18:00" 和UTC时间 "2024-01-01T10:00:00Z"
+
+    Returns:
+        float: 时间戳
+    """
+    text = str(text).strip()
+    try:
+        deadline = datetime.strptime(text, _TAG_FORMAT)
+        return deadline.replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M"):
+        try:
+            return datetime.strptime(text, fmt).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"无法解析销毁时间: {text}")
+
+
+def format_tag_value(deadline):
+    return datetime.fromtimestamp(deadline, timezone.utc).strftime(_TAG_FORMAT)
+
+
+def destroy_tags(deadline):
+    """
+    生成记录销毁时间的实例标签
+    """
+    return [{"Key": TAG_KEY, "Value": format_tag_value(deadline)}]
+
+
+@contextmanager
+def _file_lock(path):
+    """
+    跨进程互斥锁，控制台和独立运行的调度器修改状态文件前加锁
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class ExpiryScheduler(threading.Thread):
+    """
+    定时销毁调度线程
+
+    到期时间保存在最小堆中，线程只睡眠到最近的到期时间，
+    不需要轮询实例；到期的实例按区域合并为批量DeleteInstances请求。
+    取消或修改时间时不从堆中删除旧条目，出堆时与本地状态比对后丢弃
+
+    控制台和独立运行的调度器共用状态文件：每次修改都在文件锁内重新读取文件、
+    应用本次修改后写回，调度线程每隔reload_interval秒检查文件是否被其他进程修改；
+    同一时间只有一个进程运行调度线程(见acquire_run_lock)
+    """
+
+    def __init__(
+        self, api, path, batch_window=5, retry_interval=60, reload_interval=10
+    ):
+        """
+        Args:
+            api: AliyunAPI实例
+            path: 本地状态文件路径
+            batch_window: 到期后再等待的秒数，把相近到期的实例合并为一批删除
+            retry_interval: 删除失败后的重试间隔(秒)
+            reload_interval: 检查状态文件是否被其他进程修改的间隔(秒)
+        """
+        super().__init__(name="expiry-scheduler", daemon=True)
+        self.api = api
+        self.path = path
+        self.batch_window = batch_window
+        self.retry_interval = retry_interval
+        self.reload_interval = reload_interval
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._heap = []
+        self._mtime = None
+        self._run_lock = None
+        # 实例ID -> {"region_id": 区域ID, "deadline": 时间戳}
+        self.state = {}
+        self._refresh()
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"\033[1;31m加载定时销毁状态失败: {e}\033[0m")
+            return {}
+
+    def _rebuild_heap(self):
+        self._heap = [(e["deadline"], i) for i, e in self.state.items()]
+        heapq.heapify(self._heap)
+
+    def _refresh(self):
+        """
+        状态文件被其他进程修改时重新加载，调用方需持有锁
+
+        Returns:
+            bool: 是否重新加载
+        """
+        mtime = self._file_mtime()
+        if mtime == self._mtime:
+            return False
+        self.state = self._load()
+        self._mtime = mtime
+        self._rebuild_heap()
+        return True
+
+    def _save(self):
+        """
+        原子写入状态文件，调用方需持有锁
+        """
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = self._file_mtime()
+
+    def _update(self, mutate):
+        """
+        在文件锁内读取最新的状态文件，应用修改后写回，调用方需持有锁
+
+        Args:
+            mutate: 接收状态字典并就地修改的函数，返回值原样返回
+        """
+        with _file_lock(self.path + ".lock"):
+            self._refresh()
+            result = mutate(self.state)
+            self._save()
+        self._rebuild_heap()
+        self._cond.notify()
+        return result
+
+    def acquire_run_lock(self):
+        """
+        获取运行调度线程的锁，防止控制台和独立进程同时删除同一批实例
+
+        Returns:
+            bool: 是否获取成功，已有其他进程在运行调度器时返回False
+        """
+        if fcntl is None:
+            return True
+        f = open(self.path + ".run", "a")
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        # 锁随文件对象保持到进程退出
+        self._run_lock = f
+        return True
+
+    def running_elsewhere(self):
+        """
+        是否有其他进程在运行调度器
+        """
+        if fcntl is None or self._run_lock is not None:
+            return False
+        with open(self.path + ".run", "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return True
+            fcntl.flock(f, fcntl.LOCK_UN)
+        return False
+
+    def schedule(self, instance_ids, region_id, deadline):
+        """
+        设置实例的销毁时间，已有时间时覆盖
+        """
+
+        def mutate(state):
+            for instance_id in instance_ids:
+                state[instance_id] = {"region_id": region_id, "deadline": deadline}
+
+        with self._cond:
+            self._update(mutate)
+
+    def cancel(self, instance_id):
+        """
+        取消实例的定时销毁
+
+        Returns:
+            bool: 实例是否在计划中
+        """
+        with self._cond:
+            return self._update(lambda state: state.pop(instance_id, None) is not None)
+
+    def entries(self):
+        """
+        Returns:
+            list: [(实例ID, 区域ID, 到期时间戳), ...]，按到期时间排序
+        """
+        with self._cond:
+            self._refresh()
+            return sorted(
+                ((i, e["region_id"], e["deadline"]) for i, e in self.state.items()),
+                key=lambda item: item[2],
+            )
+
+    def sync_tags(self, region_ids):
+        """
+        从实例标签恢复计划，用于本地状态丢失或在其他机器上运行守护进程
+
+        Returns:
+            int: 新增或更新的实例数
+        """
+        updated = 0
+        for region_id in region_ids:
+            tagged = {}
+            for instance_id, value in (
+                self.api.get_tagged_instances(TAG_KEY, region_id) or {}
+            ).items():
+                try:
+                    tagged[instance_id] = parse_destroy_at(value)
+                except ValueError:
+                    continue
+            if not tagged:
+                continue
+
+            def mutate(state):
+                changed = 0
+                for instance_id, deadline in tagged.items():
+                    current = state.get(instance_id)
+                    if current is None or current["deadline"] != deadline:
+                        state[instance_id] = {
+                            "region_id": region_id,
+                            "deadline": deadline,
+                        }
+                        changed += 1
+                return changed
+
+            with self._cond:
+                updated += self._update(mutate)
+        return updated
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def run(self):
+        while True:
+            with self._cond:
+                due = self._wait_due()
+                if due is None:
+                    return
+            try:
+                self._destroy(due)
+            except Exception as e:
+                # 后台线程不能因异常退出，未删除的实例稍后重试
+                print(f"\033[1;31m定时销毁实例失败: {e}\033[0m")
+                self._retry(due)
+
+    def _wait_due(self):
+        """
+        睡眠到最近的到期时间，返回已到期的 {区域ID: [实例ID]}；停止时返回None
+        调用方需持有锁
+        """
+        while not self._stopped:
+            self._refresh()
+            # 丢弃已取消或已修改时间的旧条目
+            while self._heap:
+                deadline, instance_id = self._heap[0]
+                entry = self.state.get(instance_id)
+                if entry is not None and entry["deadline"] == deadline:
+                    break
+                heapq.heappop(self._heap)
+            # 最多睡眠reload_interval秒，以便发现其他进程写入的计划
+            if not self._heap:
+                self._cond.wait(self.reload_interval)
+                continue
+            delay = self._heap[0][0] + self.batch_window - time.time()
+            if delay > 0:
+                self._cond.wait(min(delay, self.reload_interval))
+                continue
+
+            now = time.time()
+            due = {}
+            while self._heap and self._heap[0][0] <= now:
+                deadline, instance_id = heapq.heappop(self._heap)
+                entry = self.state.get(instance_id)
+                if entry is not None and entry["deadline"] == deadline:
+                    ids = due.setdefault(entry["region_id"], [])
+                    if instance_id not in ids:
+                        ids.append(instance_id)
+            if due:
+                return due
+        return None
+
+    def _destroy(self, due):
+        """
+        按区域批量删除到期实例，已不存在的实例直接移出计划
+        """
+        for region_id, instance_ids in due.items():
+            statuses = self.api.get_instances_status(region_id, instance_ids)
+            if statuses is None:
+                self._retry({region_id: instance_ids})
+                continue
+            existing = [i for i in instance_ids if i in statuses]
+            finished = instance_ids
+            if existing:
+                if self.api.delete_instances(existing, region_id) is None:
+                    self._retry({region_id: existing})
+                    finished = [i for i in instance_ids if i not in statuses]
+                else:
+                    shown = ", ".join(existing[:5])
+                    more = f" 等 {len(existing)} 台" if len(existing) > 5 else ""
+                    print(f"\033[1;33m已释放到期实例: {shown}{more}\033[0m")
+
+            def mutate(state, finished=finished):
+                for instance_id in finished:
+                    state.pop(instance_id, None)
+
+            with self._cond:
+                self._update(mutate)
+
+    def _retry(self, due):
+        """
+        推迟retry_interval秒后重试
+        """
+        deadline = time.time() + self.retry_interval
+
+        def mutate(state):
+            for instance_ids in due.values():
+                for instance_id in instance_ids:
+                    if instance_id in state:
+                        state[instance_id]["deadline"] = deadline
+
+        with self._cond:
+            self._update(mutate)
+
+
+def main():
+    """
+    独立运行定时销毁守护进程，启动时从配置的区域(或命令行指定的区域)的实例标签恢复计划，
+    之后定期重新同步标签；控制台中设置的计划通过状态文件传递
+    """
+    from api import AliyunAPI
+    from config import Config
+
+    config = Config()
+    access_key_id, access_key_secret = config.get_access_key()
+    api = AliyunAPI(access_key_id, access_key_secret)
+    region_ids = sys.argv[1:] or config.get_expiry_regions()
+    api.set_region(region_ids[0])
+
+    scheduler = ExpiryScheduler(
+        api, config.get_expiry_file(), batch_window=config.get_expiry_batch_window()
+    )
+    if not scheduler.acquire_run_lock():
+        print("\033[1;31m已有控制台或其他进程在运行定时销毁调度器\033[0m")
+        sys.exit(1)
+    updated = scheduler.sync_tags(region_ids)
+    print(f"已从实例标签同步 {updated} 台实例，共 {len(scheduler.entries())} 台实例待销毁")
+    scheduler.start()
+    sync_interval = config.get_expiry_sync_interval()
+    next_sync = time.monotonic() + sync_interval
+    try:
+        while scheduler.is_alive():
+            scheduler.join(1)
+            if time.monotonic() >= next_sync:
+                scheduler.sync_tags(region_ids)
+                next_sync = time.monotonic() + sync_interval
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+镜像目录模块，缓存区域镜像列表并提供本地模糊搜索
+"""
+
+import bisect
+import difflib
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_TOKEN_PATTERN = re.compile(r"[a-z]+|\d+")
+
+# 参与搜索的镜像字段
+_SEARCH_FIELDS = ("ImageId", "OSNameEn", "OSName", "Platform", "Architecture")
+
+
+def tokenize(text):
+    """
+    将文本拆分为小写的字母/数字片段，如 "ubuntu_22_04_x64" -> ubuntu 22 04 x 64
+    """
+    return _TOKEN_PATTERN.findall(str(text or "").lower())
+
+
+class ImageIndex:
+    """
+    镜像搜索索引
+
+    预先为每个镜像的ID、系统名称、平台和架构建立片段倒排索引，
+    查询时按前缀匹配片段，拼写错误时使用近似片段
+    """
+
+    def __init__(self, images):
+        self.images = images
+        self.by_id = {image["ImageId"]: image for image in images}
+        self.sorted_ids = sorted(self.by_id)
+        postings = {}
+        for position, image in enumerate(images):
+            text = " ".join(str(image.get(field) or "") for field in _SEARCH_FIELDS)
+            for token in set(tokenize(text)):
+                postings.setdefault(token, set()).add(position)
+        self.postings = postings
+        self.tokens = sorted(postings)
+
+    def _matching_tokens(self, token):
+        """
+        查找以token为前缀的索引片段，没有时返回近似片段
+        """
+        start = bisect.bisect_left(self.tokens, token)
+        matches = []
+        for candidate in self.tokens[start:]:
+            if not candidate.startswith(token):
+                break
+            matches.append(candidate)
+        if not matches and not token.isdigit():
+            matches = difflib.get_close_matches(token, self.tokens, n=3, cutoff=0.75)
+        return matches
+
+    def search(self, query, limit=20):
+        """
+        按查询词搜索镜像，匹配的查询片段越多越靠前，其次按创建时间倒序
+
+        Returns:
+            list: 镜像信息列表
+        """
+        scores = {}
+        for token in tokenize(query):
+            matched = set()
+            for candidate in self._matching_tokens(token):
+                matched |= self.postings[candidate]
+            for position in matched:
+                scores[position] = scores.get(position, 0) + 1
+
+        ranked = sorted(
+            scores,
+            key=lambda p: (scores[p], self.images[p].get("CreationTime") or ""),
+            reverse=True,
+        )
+        return [self.images[p] for p in ranked[:limit]]
+
+    def validate(self, image_id):
+        return image_id in self.by_id
+
+    def complete(self, prefix, limit=50):
+        """
+        返回以prefix开头的镜像ID
+        """
+        start = bisect.bisect_left(self.sorted_ids, prefix)
+        result = []
+        for image_id in self.sorted_ids[start:]:
+            if not image_id.startswith(prefix) or len(result) >= limit:
+                break
+            result.append(image_id)
+        return result
+
+
+class ImageCatalog:
+    """
+    区域镜像目录，完整分页拉取DescribeImages并缓存到本地磁盘
+    """
+
+    def __init__(self, api, disk_cache, ttl=86400, max_workers=4):
+        """
+        Args:
+            api: AliyunAPI实例
+            disk_cache: DiskCache实例
+            ttl: 缓存有效期(秒)，同时作用于磁盘缓存和内存中的索引
+            max_workers: 并发拉取分页的线程数
+        """
+        self.api = api
+        self.disk_cache = disk_cache
+        self.ttl = ttl
+        self.max_workers = max_workers
+        # {区域ID: (镜像索引, 镜像列表的拉取时间)}
+        self._indexes = {}
+
+    def load(self, region_id, refresh=False):
+        """
+        获取区域镜像索引，优先使用内存和磁盘缓存
+
+        内存中的索引按镜像列表的拉取时间计算有效期，从磁盘缓存加载的索引
+        不会因为加载到内存而延长有效期
+
+        Returns:
+            ImageIndex: 镜像索引，拉取失败时返回None
+        """
+        cached = self._indexes.get(region_id)
+        if not refresh and cached and time.time() - cached[1] <= self.ttl:
+            return cached[0]
+
+        key = f"images-{region_id}"
+        images = None if refresh else self.disk_cache.get(key, ttl=self.ttl)
+        fetched_at = self.disk_cache.mtime(key) if images is not None else None
+        if images is None:
+            images = self._fetch(region_id)
+            if images is None:
+                return None
+            self.disk_cache.set(key, images)
+        if fetched_at is None:
+            fetched_at = time.time()
+
+        index = ImageIndex(images)
+        self._indexes[region_id] = (index, fetched_at)
+        return index
+
+    def cached(self, region_id):
+        """
+        仅返回内存中已加载的索引(可能已过期)，不读取磁盘或调用API，供参数补全使用
+        """
+        cached = self._indexes.get(region_id)
+        return cached[0] if cached else None
+
+    def _fetch(self, region_id, page_size=100):
+        """
+        拉取全部镜像：先取第一页得到总数，其余分页并发拉取
+        """
+        first, total_count = self.api.get_describe_images(region_id, 1, page_size)
+        if first is None:
+            return None
+        pages = (total_count + page_size - 1) // page_size
+        if pages <= 1:
+            return first
+
+        def fetch_page(page):
+            return self.api.get_describe_images(region_id, page, page_size)[0]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            rest = executor.map(fetch_page, range(2, pages + 1))
+            images = list(first)
+            for page in rest:
+                if page is None:
+                    return None
+                images.extend(page)
+        return images
@@ -49,6 +49,12 @@ class Instance:
     # 主机名
     HostName = None
 
+    # 实例自定义数据(Base64编码)
+    UserData = None
+
+    # 实例标签，如 [{"Key": "k", "Value": "v"}]
+    Tags = None
+
     def __init__(self, **kwargs):
         # 定义类属性
         self.ImageId = None
@@ -68,6 +74,8 @@ class Instance:
         self.Amount = None
         self.HostName = None
         self.InstanceChargeType = None
+        self.UserData = None
+        self.Tags = None
 
         # 动态匹配传入参数与类属性
         class_attrs = vars(self).keys()
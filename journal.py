@@ -0,0 +1,405 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+操作日志模块，追加记录创建/删除等变更操作的意图和结果，启动时据此对账
+"""
+
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows没有fcntl，此时多个进程共用日志文件时对账可能丢失记录
+    fcntl = None
+
+# 产生实例的操作
+CREATE_OPS = ("run_instances", "create_instances_from_template")
+
+# 释放实例的操作
+DELETE_OPS = ("delete_instance", "delete_instances")
+
+# 对账时查询的实例字段
+RECOVER_FIELDS = ("instance_id", "status", "instance_type", "creation_time")
+
+
+@contextmanager
+def _file_lock(path, shared=False):
+    """
+    跨进程文件锁：追加记录时加共享锁，对账压缩日志时加排他锁
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class Operation:
+    """
+    一次变更操作，由调用方在拿到响应后调用done()记录结果
+    """
+
+    def __init__(self, journal, op_id):
+        self.journal = journal
+        self.op_id = op_id
+        self.finished = False
+
+    def done(self, **fields):
+        self.journal.append(self.op_id, "result", fields)
+        self.finished = True
+
+
+class NullJournal:
+    """
+    未启用操作日志时使用，不做任何记录
+    """
+
+    @contextmanager
+    def operation(self, op, **fields):
+        yield Operation(self, None)
+
+    def append(self, op_id, phase, fields):
+        pass
+
+
+class Journal(NullJournal):
+    """
+    仅追加的操作日志
+
+    每条记录为一行JSON，记录(op_id, phase)：intent在调用API前写入，
+    result/error在调用后写入；写入由后台线程批量完成，
+    每批只调用一次fsync，调用方只需把记录放入内存缓冲区
+
+    控制台和后台服务可以共用同一个日志文件：每批记录在共享锁内写入，
+    写入前检查日志是否已被其他进程的recover()替换，是则重新打开
+    """
+
+    def __init__(self, path, flush_interval=0.2):
+        """
+        Args:
+            path: 日志文件路径
+            flush_interval: 后台线程批量写入的最长间隔(秒)
+        """
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._prefix = f"{int(time.time())}-{os.getpid()}"
+        self._queued = 0
+        self._written = 0
+        self._closed = False
+        self._file = None
+        self._thread = None
+
+    def start(self):
+        """
+        打开日志文件并启动后台写入线程
+        """
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._thread = threading.Thread(
+            target=self._run, name="journal-writer", daemon=True
+        )
+        self._thread.start()
+
+    @contextmanager
+    def operation(self, op, **fields):
+        """
+        记录一次变更操作，用法:
+
+            with journal.operation("delete_instance", instance_ids=[...]) as entry:
+                response = ...
+                entry.done(request_id=response.body.request_id)
+
+        代码块抛出异常时记录error，正常结束但未调用done()时记录failed
+        """
+        op_id = f"{self._prefix}-{next(self._ids)}"
+        self.append(op_id, "intent", dict(fields, op=op))
+        entry = Operation(self, op_id)
+        try:
+            yield entry
+        except BaseException as e:
+            self.append(op_id, "error", {"error": f"{type(e).__name__}: {e}"})
+            raise
+        if not entry.finished:
+            self.append(op_id, "failed", {})
+
+    def append(self, op_id, phase, fields):
+        record = dict(fields, id=op_id, phase=phase, ts=time.time())
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._cond:
+            self._buffer.append(line)
+            self._queued += 1
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._buffer and not self._closed:
+                    self._cond.wait()
+                if not self._buffer and self._closed:
+                    return
+                # 再等一小段时间，把这段时间内的记录合并为一批
+                self._cond.wait_for(lambda: self._closed, self.flush_interval)
+                batch, self._buffer = self._buffer, []
+            try:
+                with _file_lock(self.lock_path, shared=True):
+                    self._reopen_if_replaced()
+                    self._file.write("".join(batch))
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+            except OSError as e:
+                print(f"\033[1;31m写入操作日志失败: {e}\033[0m")
+            with self._cond:
+                self._written += len(batch)
+                self._cond.notify_all()
+
+    def _reopen_if_replaced(self):
+        """
+        日志文件被压缩替换后，已打开的文件指向旧文件，需要重新打开
+        """
+        try:
+            replaced = os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            replaced = True
+        if replaced:
+            self._file.close()
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def flush(self, timeout=None):
+        """
+        等待已提交的记录全部落盘
+        """
+        with self._cond:
+            target = self._queued
+            self._cond.notify()
+            return self._cond.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self, timeout=5):
+        """
+        写完缓冲区中的记录后关闭日志
+        """
+        if self._thread is None:
+            return
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        self._file.close()
+        self._thread = None
+
+
+def _parse_records(data):
+    """
+    解析日志内容，跳过崩溃时写了一半的行
+    """
+    records = []
+    for line in data.decode("utf-8", errors="replace").splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def read_journal(path):
+    """
+    读取日志记录，跳过崩溃时写了一半的行
+    """
+    try:
+        with open(path, "rb") as f:
+            return _parse_records(f.read())
+    except OSError:
+        return []
+
+
+def replay(records):
+    """
+    按操作汇总日志
+
+    Returns:
+        tuple: (owned, unfinished)
+            owned: 日志创建且未被删除的实例 {实例ID: 区域ID}
+            unfinished: 只有intent没有结果的操作列表
+    """
+    operations = {}
+    for record in records:
+        if "id" not in record or "phase" not in record:
+            continue
+        operation = operations.setdefault(record["id"], {})
+        operation[record["phase"]] = record
+
+    owned = {}
+    unfinished = []
+    for operation in operations.values():
+        intent = operation.get("intent")
+        result = operation.get("result")
+        if intent is None:
+            continue
+        if result is None:
+            if "error" not in operation and "failed" not in operation:
+                unfinished.append(intent)
+            continue
+        if intent["op"] in CREATE_OPS:
+            for instance_id in result.get("instance_ids") or []:
+                owned[instance_id] = intent.get("region_id")
+        elif intent["op"] in DELETE_OPS:
+            for instance_id in intent.get("instance_ids") or []:
+                owned.pop(instance_id, None)
+        elif intent["op"] == "recovered":
+            owned.update(result.get("owned") or {})
+    return owned, unfinished
+
+
+def _creation_epoch(text):
+    """
+    解析实例的CreationTime(UTC)，如 2024-01-01T08:00Z
+    """
+    for fmt in ("%Y-%m-%dT%H:%MZ", "%Y-%m-%dT%H:%M:%SZ"):
+        try:
+            created = datetime.strptime(text, fmt).replace(tzinfo=timezone.utc)
+            return created.timestamp()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def recover(api, path):
+    """
+    启动时对账并压缩日志
+
+    1. 日志中创建且未删除的实例按区域批量查询状态，已释放的不再跟踪
+    2. 未完成的创建操作：列出该区域在操作之后创建、且不在日志中的同规格实例，可能是泄漏的实例
+    3. 未完成的删除操作：查询实例是否仍存在
+    最后把仍存在的实例写成一条recovered记录，替换原日志；
+    查询失败的区域中未完成的操作原样保留，下次启动再对账
+
+    对账期间其他进程(如后台服务)追加的记录在排他锁内复制到新日志末尾；
+    日志已被其他进程压缩替换时不再压缩，只返回本次对账结果
+
+    Returns:
+        dict: owned(仍存在的实例 {实例ID: 状态})、suspects(可能泄漏的实例信息列表)、
+              undeleted(删除未完成且仍存在的实例ID列表)；日志为空时返回None
+    """
+    try:
+        with _file_lock(f"{path}.lock", shared=True), open(path, "rb") as f:
+            data = f.read()
+            inode = os.fstat(f.fileno()).st_ino
+    except FileNotFoundError:
+        return None
+    records = _parse_records(data)
+    if not records:
+        return None
+    owned, unfinished = replay(records)
+
+    by_region = {}
+    for instance_id, region_id in owned.items():
+        by_region.setdefault(region_id, []).append(instance_id)
+    for intent in unfinished:
+        if intent["op"] in DELETE_OPS:
+            for instance_id in intent.get("instance_ids") or []:
+                by_region.setdefault(intent.get("region_id"), []).append(instance_id)
+
+    statuses = {}
+    failed_regions = set()
+    for region_id, instance_ids in by_region.items():
+        result = api.get_instances_status(region_id, instance_ids)
+        if result is None:
+            failed_regions.add(region_id)
+            continue
+        statuses.update(result)
+
+    suspects = []
+    listed = {}
+    for intent in unfinished:
+        if intent["op"] not in CREATE_OPS:
+            continue
+        region_id = intent.get("region_id")
+        if region_id not in listed:
+            listed[region_id] = api.get_describe_instances(
+                region_id, fields=RECOVER_FIELDS, strict=True
+            )
+        if listed[region_id] is None:
+            continue
+        for inst in listed[region_id]:
+            created = _creation_epoch(inst.get("creation_time"))
+            if (
+                inst["instance_id"] not in owned
+                and created is not None
+                and created >= intent["ts"] - 60
+                and intent.get("instance_type") in (None, inst.get("instance_type"))
+            ):
+                suspects.append(inst)
+                owned[inst["instance_id"]] = region_id
+                statuses[inst["instance_id"]] = inst["status"]
+
+    # 查询失败的区域保留原记录，下次启动再对账
+    kept = {
+        instance_id: region_id
+        for instance_id, region_id in owned.items()
+        if instance_id in statuses or region_id in failed_regions
+    }
+    undeleted = {
+        instance_id: intent.get("region_id")
+        for intent in unfinished
+        if intent["op"] in DELETE_OPS
+        for instance_id in intent.get("instance_ids") or []
+        if instance_id in statuses
+    }
+    kept.update(undeleted)
+    # 区域查询失败，无法判断结果的操作保留intent，下次启动时仍视为未完成
+    pending = [
+        intent
+        for intent in unfinished
+        if (intent["op"] in CREATE_OPS and listed.get(intent.get("region_id")) is None)
+        or (intent["op"] in DELETE_OPS and intent.get("region_id") in failed_regions)
+    ]
+
+    compacted = {
+        "id": f"recovered-{int(time.time())}",
+        "ts": time.time(),
+    }
+    lines = [
+        json.dumps(dict(compacted, phase=phase, **fields)) + "\n"
+        for phase, fields in (
+            ("intent", {"op": "recovered"}),
+            ("result", {"owned": kept}),
+        )
+    ]
+    lines.extend(json.dumps(intent, ensure_ascii=False) + "\n" for intent in pending)
+
+    tmp_path = f"{path}.tmp"
+    with _file_lock(f"{path}.lock"):
+        try:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_ino == inode:
+                    f.seek(len(data))
+                    appended = f.read()
+                else:
+                    appended = None
+        except FileNotFoundError:
+            appended = None
+        if appended is not None:
+            with open(tmp_path, "wb") as f:
+                f.write("".join(lines).encode("utf-8"))
+                f.write(appended)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+
+    return {
+        "owned": {i: statuses.get(i) for i in kept},
+        "suspects": suspects,
+        "undeleted": list(undeleted),
+    }
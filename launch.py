@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+实例启动模块，封装库存不足时的备选重试、多可用区竞速创建和状态等待
+"""
+
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from Tea.exceptions import TeaException
+
+# 表示当前规格/可用区没有库存或不可售的错误码
+STOCK_ERROR_CODES = (
+    "OperationDenied.NoStock",
+    "Zone.NotOnSale",
+    "InvalidInstanceType.ZoneNotSupported",
+    "InvalidInstanceType.NotSupported",
+    "InvalidResourceType.NotSupported",
+    "OperationDenied.ZoneNotAllowed",
+    "InvalidZoneId.NotSupportShareEncryptedImage",
+)
+
+# 可以强制删除的实例状态，刚创建的实例处于Pending/Starting时删除会失败
+DELETABLE_STATUSES = ("Running", "Stopped")
+
+
+def is_stock_error(error):
+    """
+    判断创建失败是否由库存不足或可用区不可售引起
+    """
+    code = getattr(error, "code", "") or ""
+    return code in STOCK_ERROR_CODES or "NoStock" in code
+
+
+def fallback_candidates(instance, instance_types=None, v_switch_ids=None):
+    """
+    生成备选的(实例规格, 交换机)组合，向导中选择的组合排在最前
+
+    Args:
+        instance: Instance对象
+        instance_types: 备选实例规格列表
+        v_switch_ids: 备选交换机ID列表(不同交换机对应不同可用区)
+
+    Returns:
+        list: [(instance_type, v_switch_id), ...]
+    """
+    types = [instance.InstanceType] + [
+        t for t in (instance_types or []) if t != instance.InstanceType
+    ]
+    switches = [instance.VSwitchId] + [
+        v for v in (v_switch_ids or []) if v != instance.VSwitchId
+    ]
+    # 优先在同一规格下切换可用区，规格不变时实例性能和价格更可预期
+    return [(t, v) for t in types for v in switches]
+
+
+def run_with_fallback(api, instance, candidates):
+    """
+    依次尝试备选组合创建实例，遇到库存类错误立即尝试下一个
+
+    Args:
+        api: AliyunAPI实例
+        instance: Instance对象，作为所有尝试的基础配置
+        candidates: fallback_candidates()返回的组合列表
+
+    Returns:
+        tuple: (实例ID列表或None, 尝试记录列表)
+        尝试记录包含 instance_type、v_switch_id、elapsed(秒)、error
+
+    Raises:
+        非库存类错误(参数错误、余额不足等)直接抛出，换组合也无法解决
+    """
+    attempts = []
+    for instance_type, v_switch_id in candidates:
+        candidate = copy.copy(instance)
+        candidate.InstanceType = instance_type
+        candidate.VSwitchId = v_switch_id
+
+        start = time.monotonic()
+        try:
+            instance_ids = api.run_instances(instance=candidate)
+        except TeaException as e:
+            attempts.append(
+                {
+                    "instance_type": instance_type,
+                    "v_switch_id": v_switch_id,
+                    "elapsed": time.monotonic() - start,
+                    "error": f"{e.code} - {e.message}",
+                }
+            )
+            if is_stock_error(e):
+                continue
+            raise
+
+        attempts.append(
+            {
+                "instance_type": instance_type,
+                "v_switch_id": v_switch_id,
+                "elapsed": time.monotonic() - start,
+                "error": None,
+            }
+        )
+        return instance_ids, attempts
+
+    return None, attempts
+
+
+def wait_for_status(
+    api,
+    region_id,
+    instance_ids,
+    target="Running",
+    timeout=300,
+    interval=2,
+    started=None,
+):
+    """
+    批量轮询实例状态，直到全部到达目标状态或超时
+
+    Args:
+        api: AliyunAPI实例
+        region_id: 实例所在区域
+        instance_ids: 实例ID列表
+        target: 目标状态
+        timeout: 超时时间(秒)
+        interval: 轮询间隔(秒)
+        started: 计算耗时的基准时间(time.monotonic())，默认为调用时刻
+
+    Returns:
+        dict: 实例ID -> 到达目标状态的耗时(秒)，超时未到达的为None
+    """
+    start = started if started is not None else time.monotonic()
+    deadline = time.monotonic() + timeout
+    elapsed = {instance_id: None for instance_id in instance_ids}
+    pending = set(instance_ids)
+    while pending and time.monotonic() < deadline:
+        statuses = api.get_instances_status(region_id, pending) or {}
+        for instance_id, status in statuses.items():
+            if status == target and instance_id in pending:
+                elapsed[instance_id] = time.monotonic() - start
+                pending.discard(instance_id)
+        if pending:
+            time.sleep(interval)
+    return elapsed
+
+
+def race_launch(api, instance, v_switches, timeout=300, interval=2):
+    """
+    在多个交换机(可用区)同时创建相同配置的实例，保留最先Running的一台，
+    其余实例等到可删除状态后逐台释放
+
+    Args:
+        api: AliyunAPI实例
+        instance: Instance对象，Amount会被强制设为1
+        v_switches: [(v_switch_id, zone_id), ...]
+        timeout: 等待Running的超时时间(秒)，释放其余实例时另有相同的等待时间
+        interval: 状态轮询间隔(秒)
+
+    Returns:
+        tuple: (胜出的实例ID或None, 每个候选的记录列表)
+        记录包含 v_switch_id、zone_id、instance_id、submit_elapsed、
+        running_elapsed、error、winner、released
+    """
+    start = time.monotonic()
+    results = []
+
+    def submit(v_switch_id, zone_id):
+        candidate = copy.copy(instance)
+        candidate.VSwitchId = v_switch_id
+        candidate.Amount = 1
+        record = {
+            "v_switch_id": v_switch_id,
+            "zone_id": zone_id,
+            "instance_id": None,
+            "submit_elapsed": None,
+            "running_elapsed": None,
+            "error": None,
+            "winner": False,
+            "released": False,
+        }
+        try:
+            instance_ids = api.run_instances(instance=candidate)
+            record["instance_id"] = instance_ids[0] if instance_ids else None
+        except TeaException as e:
+            record["error"] = f"{e.code} - {e.message}"
+        except Exception as e:
+            record["error"] = str(e)
+        record["submit_elapsed"] = time.monotonic() - start
+        return record
+
+    with ThreadPoolExecutor(max_workers=len(v_switches)) as executor:
+        futures = [executor.submit(submit, vsw, zone) for vsw, zone in v_switches]
+        for future in as_completed(futures):
+            results.append(future.result())
+
+    by_id = {r["instance_id"]: r for r in results if r["instance_id"]}
+    pending = set(by_id)
+    winner = None
+    region_id = instance.RegionId
+    while pending and winner is None and time.monotonic() - start < timeout:
+        statuses = api.get_instances_status(region_id, pending) or {}
+        now = time.monotonic() - start
+        for instance_id, status in statuses.items():
+            if status == "Running" and instance_id in pending:
+                by_id[instance_id]["running_elapsed"] = now
+                pending.discard(instance_id)
+                # 同一轮中多台同时Running时，保留提交最快的一台
+                if winner is None or (
+                    by_id[instance_id]["submit_elapsed"]
+                    < by_id[winner]["submit_elapsed"]
+                ):
+                    winner = instance_id
+        if winner is None and pending:
+            time.sleep(interval)
+
+    losers = [instance_id for instance_id in by_id if instance_id != winner]
+    released = release_instances(
+        api, region_id, losers, timeout=timeout, interval=interval
+    )
+    for instance_id in released:
+        by_id[instance_id]["released"] = True
+    if winner:
+        by_id[winner]["winner"] = True
+    return winner, results
+
+
+def release_instances(
+    api, region_id, instance_ids, timeout=300, interval=2, retries=3
+):
+    """
+    释放刚创建的实例
+
+    Pending/Starting状态的实例无法删除，而批量删除中任一实例失败会导致整批失败，
+    因此等每台实例进入Running/Stopped后再逐台删除，失败的删除在下一轮重试
+
+    Args:
+        api: AliyunAPI实例
+        region_id: 实例所在区域
+        instance_ids: 实例ID列表
+        timeout: 等待实例进入可删除状态的超时时间(秒)
+        interval: 状态轮询间隔(秒)
+        retries: 每台实例的最大删除次数
+
+    Returns:
+        set: 已释放的实例ID，不在其中的实例需要手动删除
+    """
+    released = set()
+    seen = set()
+    attempts = {instance_id: 0 for instance_id in instance_ids}
+    pending = set(instance_ids)
+    deadline = time.monotonic() + timeout
+    while pending and time.monotonic() < deadline:
+        statuses = api.get_instances_status(region_id, pending)
+        if statuses is not None:
+            for instance_id in list(pending):
+                status = statuses.get(instance_id)
+                if status is None:
+                    # 查询到过的实例从结果中消失，说明已被释放
+                    if instance_id in seen:
+                        released.add(instance_id)
+                        pending.discard(instance_id)
+                    continue
+                seen.add(instance_id)
+                if status not in DELETABLE_STATUSES:
+                    continue
+                attempts[instance_id] += 1
+                if api.delete_instance(instance_id) is not None:
+                    released.add(instance_id)
+                    pending.discard(instance_id)
+                elif attempts[instance_id] >= retries:
+                    pending.discard(instance_id)
+        if pending:
+            time.sleep(interval)
+    return released
+
+
+def run_with_user_data(api, instance, user_data):
+    """
+    携带UserData创建实例
+
+    所有实例的UserData相同时只发起一次RunInstances；
+    不同时(模板引用了index、hostname等变量)按实例并发发起Amount=1的请求
+
+    Args:
+        api: AliyunAPI实例
+        instance: Instance对象
+        user_data: userdata.render_user_data()返回的列表，与实例序号对应
+
+    Returns:
+        list: 创建成功的实例ID列表，顺序与实例序号一致；部分请求失败时打印失败的序号和原因，
+              全部失败时抛出第一个请求的异常
+    """
+    if len(set(user_data)) <= 1:
+        candidate = copy.copy(instance)
+        candidate.UserData = user_data[0] if user_data else None
+        return api.run_instances(instance=candidate)
+
+    def submit(index, data):
+        candidate = copy.copy(instance)
+        candidate.Amount = 1
+        candidate.UserData = data
+        if instance.HostName:
+            candidate.HostName = f"{instance.HostName}-{index}"
+        return api.run_instances(instance=candidate)
+
+    with ThreadPoolExecutor(max_workers=min(len(user_data), 10)) as executor:
+        futures = [
+            executor.submit(submit, index, data)
+            for index, data in enumerate(user_data, 1)
+        ]
+        instance_ids = []
+        errors = []
+        for index, future in enumerate(futures, 1):
+            try:
+                instance_ids.extend(future.result())
+            except TeaException as e:
+                errors.append(e)
+                print(f"\033[1;31m第 {index} 台实例创建失败: {e.code} - {e.message}\033[0m")
+            except Exception as e:
+                errors.append(e)
+                print(f"\033[1;31m第 {index} 台实例创建失败: {e}\033[0m")
+    if errors and not instance_ids:
+        raise errors[0]
+    return instance_ids
@@ -4,20 +4,117 @@
 """
 阿里云ECS管理工具
 类似MSF的交互式对话脚本，用于申请和管理阿里云ECS实例
+
+    python main.py                              正常运行
+    python main.py --record session.jsonl.gz    录制本次会话的API请求和响应
+    python main.py --replay session.jsonl.gz [--latency-scale 0]
+                                                回放录制的会话，不访问网络
+    python main.py --serve                      启动守护进程，常驻API客户端、缓存和限流器
+    python main.py --call instances region_id=cn-hangzhou
+                                                通过守护进程调用，输出JSON结果
 """
 
+import argparse
+import atexit
+import json
+import sys
 import traceback
-from console import AliyunECSConsole
-from utils import print_warning, print_error, print_success
+from utils import print_warning, print_error, print_success, print_info
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="阿里云ECS管理工具")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="FILE", help="录制API流量到文件(敏感字段已脱敏)")
+    group.add_argument("--replay", metavar="FILE", help="回放录制的API流量，不访问网络")
+    parser.add_argument(
+        "--latency-scale",
+        type=float,
+        default=1.0,
+        help="回放时录制耗时的缩放比例，1为保留原始耗时，0为不等待 (默认 1)",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--serve", action="store_true", help="以守护进程方式运行，通过Unix套接字提供服务"
+    )
+    mode.add_argument(
+        "--call", metavar="OP", help="调用守护进程的操作，如 instances、status、price"
+    )
+    parser.add_argument(
+        "--socket", help="守护进程套接字路径 (默认使用config.yml中daemon.socket)"
+    )
+    parser.add_argument(
+        "params", nargs="*", metavar="KEY=VALUE", help="--call 的参数，值可以是JSON"
+    )
+    return parser.parse_args()
+
+
+def open_cassette(args):
+    """
+    根据命令行参数创建录制器或回放器，退出时输出统计
+    """
+    from cassette import Player, Recorder
+
+    if args.record:
+        cassette = Recorder(args.record)
+        atexit.register(cassette.close)
+    elif args.replay:
+        cassette = Player(args.replay, latency_scale=args.latency_scale)
+    else:
+        return None
+    atexit.register(lambda: print_info(cassette.summary()))
+    return cassette
+
+
+def call_daemon(args):
+    """
+    瘦客户端: 把一次调用发给守护进程并输出JSON结果，不导入SDK
+    """
+    from config import Config
+    from daemon import DaemonClient, DaemonError, parse_params
+
+    try:
+        params = parse_params(args.params)
+        path = args.socket or Config().get_daemon_socket()
+        with DaemonClient(path) as client:
+            result = client.call(args.call, **params)
+    except (DaemonError, ValueError) as e:
+        print_error(str(e))
+        return 1
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+def run_daemon(args):
+    """
+    启动守护进程
+    """
+    from config import Config
+    from daemon import DaemonError, serve
+
+    try:
+        serve(Config(), socket_path=args.socket, cassette=open_cassette(args))
+    except DaemonError as e:
+        print_error(str(e))
+        return 1
+    return 0
 
 
 def main():
     """
     主函数
     """
+    args = parse_args()
+    if args.call:
+        sys.exit(call_daemon(args))
+    if args.serve:
+        sys.exit(run_daemon(args))
+
+    from console import AliyunECSConsole
+
     try:
         print_warning("正在初始化阿里云ECS管理工具...")
-        console = AliyunECSConsole()
+        console = AliyunECSConsole(cassette=open_cassette(args))
         console.cmdloop()
     except KeyboardInterrupt:
         print("\n")
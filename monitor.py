@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+余额监控模块，后台定时刷新账户余额并估算当前消耗速度
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pricing import LEDGER_FIELDS
+
+
+class BalanceMonitor(threading.Thread):
+    """
+    后台余额监控线程
+
+    按固定间隔刷新账户余额和所有区域运行中实例的小时价格，
+    控制台通过snapshot()读取缓存结果，不会触发任何API调用
+    """
+
+    def __init__(self, api, price_book, region_getter, interval=300, max_workers=8):
+        """
+        Args:
+            api: AliyunAPI实例
+            price_book: PriceBook实例
+            region_getter: 返回当前区域ID的函数，地域列表查询失败时只统计当前区域
+            interval: 刷新间隔(秒)
+            max_workers: 并发查询各区域实例的线程数
+        """
+        super().__init__(name="balance-monitor", daemon=True)
+        self.api = api
+        self.price_book = price_book
+        self.region_getter = region_getter
+        self.interval = interval
+        self.max_workers = max_workers
+        self._region_ids = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._snapshot = None
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                # 后台线程不能让异常中断控制台，保留上一次的结果
+                print(f"\033[1;31m余额监控刷新失败: {e}\033[0m")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def regions(self):
+        """
+        需要统计的区域，地域列表只查询一次；查询失败时返回当前区域，下次刷新时重试
+        """
+        if self._region_ids is None:
+            result = self.api.get_describe_regions()
+            if result:
+                self._region_ids = [
+                    region["RegionId"] for region in result["Regions"]["Region"]
+                ]
+        return self._region_ids or [self.region_getter()]
+
+    def refresh(self):
+        """
+        刷新余额与消耗速度，消耗为所有区域运行中实例的小时价格之和
+        """
+        balance = self.api.get_account_balance()
+        region_ids = self.regions()
+
+        def load(region_id):
+            return self.api.get_describe_instances(
+                region_id, fields=LEDGER_FIELDS, strict=True
+            )
+
+        workers = min(self.max_workers, len(region_ids))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            listed = dict(zip(region_ids, executor.map(load, region_ids)))
+
+        burn_rate = 0.0
+        unpriced = 0
+        running = {}
+        failed_regions = []
+        for region_id, instances in listed.items():
+            if instances is None:
+                failed_regions.append(region_id)
+                continue
+            ledger = self.price_book.build_ledger(instances, region_id)
+            if ledger["rows"]:
+                running[region_id] = len(ledger["rows"])
+            burn_rate += ledger["hourly_total"]
+            unpriced += sum(1 for row in ledger["rows"] if row["hourly"] is None)
+
+        available = None
+        if balance:
+            try:
+                available = float(
+                    str(balance["Data"]["AvailableAmount"]).replace(",", "")
+                )
+            except (KeyError, TypeError, ValueError):
+                available = None
+
+        now = time.time()
+        with self._lock:
+            balance_updated_at = now if available is not None else None
+            # 余额查询失败时沿用上一次的余额及其查询时间
+            if available is None and self._snapshot:
+                available = self._snapshot["balance"]
+                balance_updated_at = self._snapshot["balance_updated_at"]
+            self._snapshot = {
+                "regions": running,
+                "failed_regions": failed_regions,
+                "balance": available,
+                "balance_updated_at": balance_updated_at,
+                "balance_stale": balance_updated_at is not None
+                and balance_updated_at < now,
+                "burn_rate": burn_rate,
+                "running": sum(running.values()),
+                "unpriced": unpriced,
+                "updated_at": now,
+            }
+
+    def snapshot(self):
+        """
+        返回最近一次刷新的结果，尚未刷新时返回None
+        """
+        with self._lock:
+            if self._snapshot is None:
+                return None
+            data = dict(self._snapshot)
+        if data["balance"] is not None and data["burn_rate"] > 0:
+            data["runway_hours"] = data["balance"] / data["burn_rate"]
+        else:
+            data["runway_hours"] = None
+        return data
+
+    def trigger(self):
+        """
+        立即触发一次后台刷新
+        """
+        self._wakeup.set()
+
+    def stop(self):
+        """
+        停止监控线程
+        """
+        self._stopped.set()
+        self._wakeup.set()
@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预热实例池模块，预先创建并停机(节省停机模式)的实例，需要时直接启动
+"""
+
+import json
+import os
+import threading
+import time
+
+from instance import Instance
+from launch import wait_for_status
+
+
+class StandbyPool:
+    """
+    预热实例池
+
+    每个配置档(profile)保持size台Stopped状态的实例，
+    取用时只需StartInstance，取用后在后台补齐
+    池状态保存在本地JSON文件中，并可与DescribeInstanceStatus对账
+    """
+
+    def __init__(self, api, config, path=None):
+        """
+        Args:
+            api: AliyunAPI实例
+            config: Config实例
+            path: 池状态文件路径，为空时使用配置中的路径
+        """
+        self.api = api
+        self.config = config
+        self.path = path or config.get_pool_file()
+        self.profiles = config.get_pool_profiles()
+        self._lock = threading.RLock()
+        self._refilling = set()
+        self.state = self._load()
+
+    def _load(self):
+        """
+        加载池状态文件
+        """
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"\033[1;31m加载实例池状态失败: {e}\033[0m")
+            return {}
+
+    def _save(self):
+        """
+        原子写入池状态文件
+        """
+        tmp_path = self.path + ".tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def _profile_instance(self, profile):
+        """
+        根据配置档生成Instance对象
+        """
+        overrides = {k: v for k, v in self.profiles[profile].items() if k != "size"}
+        instance = Instance(**self.config.get_instance_defaults(overrides))
+        # 节省停机模式仅支持按量付费
+        instance.InstanceChargeType = "PostPaid"
+        return instance
+
+    def entries(self, profile):
+        with self._lock:
+            return list(self.state.get(profile, []))
+
+    def reconcile(self):
+        """
+        与实例实际状态对账，移除已被释放的实例并更新状态
+
+        补充过程被中断(如进程退出)时，池中会留下仍在运行的实例：
+        Running的实例以节省停机模式停机，Pending/Starting的实例等下次对账时再停机
+
+        Returns:
+            int: 被移除的实例数量
+        """
+        removed = 0
+        with self._lock:
+            by_region = {}
+            for profile, entries in self.state.items():
+                # 正在补充的配置档由补充线程负责停机
+                if profile in self._refilling:
+                    continue
+                for entry in entries:
+                    by_region.setdefault(entry["region_id"], []).append(entry)
+
+        for region_id, entries in by_region.items():
+            statuses = self.api.get_instances_status(
+                region_id, [e["instance_id"] for e in entries]
+            )
+            if statuses is None:
+                # 查询失败时不修改本地状态，避免误删
+                continue
+            with self._lock:
+                for entry in entries:
+                    entry["status"] = statuses.get(entry["instance_id"])
+                for profile, profile_entries in self.state.items():
+                    kept = [e for e in profile_entries if e["status"] is not None]
+                    removed += len(profile_entries) - len(kept)
+                    self.state[profile] = kept
+
+            for entry in entries:
+                if entry["status"] == "Running":
+                    if self.api.stop_instance(entry["instance_id"]) is not None:
+                        entry["status"] = "Stopping"
+
+        self._save()
+        return removed
+
+    def acquire(self, profile):
+        """
+        从池中取出一台实例并启动，随后在后台补齐池
+
+        Returns:
+            dict: 池记录(instance_id、region_id等)，池中没有可用实例时返回None，
+                  启动失败时把实例放回池中并返回False
+        """
+        with self._lock:
+            entries = self.state.get(profile, [])
+            entry = next((e for e in entries if e["status"] == "Stopped"), None)
+            if entry is None:
+                return None
+            entries.remove(entry)
+            self._save()
+
+        if self.api.start_instance(entry["instance_id"]) is None:
+            with self._lock:
+                self.state.setdefault(profile, []).append(entry)
+            self._save()
+            return False
+        self.refill_async(profile)
+        return entry
+
+    def refill_async(self, profile):
+        """
+        在后台线程中补齐配置档的实例数量
+        """
+        thread = threading.Thread(
+            target=self.refill, args=(profile,), name=f"pool-refill-{profile}"
+        )
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def refill(self, profile):
+        """
+        创建缺少的实例，等待其Running后以节省停机模式停机并加入池
+
+        Returns:
+            int: 新加入池的实例数量
+        """
+        with self._lock:
+            if profile in self._refilling:
+                return 0
+            deficit = self.profiles[profile].get("size", 0) - len(
+                self.state.get(profile, [])
+            )
+            if deficit <= 0:
+                return 0
+            self._refilling.add(profile)
+
+        try:
+            instance = self._profile_instance(profile)
+            instance.Amount = deficit
+            try:
+                instance_ids = self.api.run_instances(instance=instance)
+            except Exception as e:
+                print(f"\033[1;31m实例池 {profile} 补充实例失败: {e}\033[0m")
+                return 0
+
+            # 先登记为Pending，避免进程中断后丢失已创建的实例
+            with self._lock:
+                self.state.setdefault(profile, []).extend(
+                    {
+                        "instance_id": instance_id,
+                        "region_id": instance.RegionId,
+                        "created_at": time.time(),
+                        "status": "Pending",
+                    }
+                    for instance_id in instance_ids
+                )
+            self._save()
+
+            running = wait_for_status(self.api, instance.RegionId, instance_ids)
+            for instance_id, elapsed in running.items():
+                if elapsed is not None:
+                    self.api.stop_instance(instance_id)
+            stopped = wait_for_status(
+                self.api, instance.RegionId, instance_ids, target="Stopped"
+            )
+
+            with self._lock:
+                for entry in self.state.get(profile, []):
+                    if entry["instance_id"] in stopped:
+                        entry["status"] = (
+                            "Stopped"
+                            if stopped[entry["instance_id"]] is not None
+                            else "Unknown"
+                        )
+            self._save()
+            return sum(1 for elapsed in stopped.values() if elapsed is not None)
+        finally:
+            with self._lock:
+                self._refilling.discard(profile)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+预取模块，在后台并发加载区域资源，供向导直接使用
+"""
+
+import threading
+import time
+
+
+class RegionSnapshot:
+    """
+    区域资源快照
+
+    创建时立即把所有加载任务提交到线程池，
+    读取时若任务仍在进行则等待其完成，已完成则直接返回结果；
+    单个资源加载失败时只重新提交该资源，不影响已加载成功的资源
+    """
+
+    def __init__(self, executor, region_id, loaders, ttl=600, retry_interval=30):
+        """
+        Args:
+            executor: concurrent.futures线程池
+            region_id: 区域ID
+            loaders: {资源名称: 无参加载函数}
+            ttl: 快照有效期(秒)
+            retry_interval: 加载失败的资源至少间隔多久(秒)再重新加载，
+                避免持续失败的资源在每次读取时都重新请求
+        """
+        self.region_id = region_id
+        self.created_at = time.monotonic()
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.executor = executor
+        self.loaders = loaders
+        self._failed_at = {}
+        self._lock = threading.Lock()
+        self.futures = {
+            name: executor.submit(loader) for name, loader in loaders.items()
+        }
+
+    @staticmethod
+    def _failed(future):
+        """
+        加载任务已结束且失败：抛出异常，或返回None(API方法出错时打印错误并返回None)
+        """
+        if not future.done():
+            return False
+        return future.exception() is not None or future.result() is None
+
+    @property
+    def expired(self):
+        """
+        快照已超过有效期，需要整体重新加载
+        """
+        return time.monotonic() - self.created_at > self.ttl
+
+    def ready(self, name):
+        """
+        资源是否已加载完成(不等待)
+        """
+        return self.futures[name].done()
+
+    def _future(self, name):
+        """
+        返回资源的加载任务，上次加载失败且已超过retry_interval时重新提交
+        """
+        with self._lock:
+            future = self.futures[name]
+            failed_at = self._failed_at.get(name)
+            if (
+                failed_at is not None
+                and time.monotonic() - failed_at >= self.retry_interval
+            ):
+                del self._failed_at[name]
+                future = self.executor.submit(self.loaders[name])
+                self.futures[name] = future
+            return future
+
+    def get(self, name, timeout=None):
+        """
+        获取资源，仍在加载时等待完成；加载失败(抛出异常或返回None)时返回None，
+        超过retry_interval后再次获取时只重新加载该资源
+        """
+        future = self._future(name)
+        try:
+            result = future.result(timeout=timeout)
+        except Exception as e:
+            result = None
+            print(f"\033[1;31m加载 {self.region_id} 的 {name} 失败: {e}\033[0m")
+        if result is None and future.done():
+            with self._lock:
+                if self.futures[name] is future:
+                    self._failed_at.setdefault(name, time.monotonic())
+        return result
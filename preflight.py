@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+创建前预检模块，并发执行DryRun、余额、配额、库存和网络检查，汇总为一份报告
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from availability import in_stock
+
+# 检查结果
+PASSED = "passed"
+FAILED = "failed"
+SKIPPED = "skipped"
+WARNING = "warning"
+
+# 阿里云要求按量付费账户余额不低于100元
+MIN_POSTPAID_BALANCE = 100
+
+
+def _vcpu_quota_names(instance):
+    """
+    根据付费方式返回(vCPU配额上限, 已使用vCPU)的配额名称，包年包月不检查
+    """
+    if instance.SpotStrategy in ("SpotAsPriceGo", "SpotWithPriceLimit"):
+        return "max-spot-instance-vcpu-count", "used-spot-instance-vcpu-count"
+    if (instance.InstanceChargeType or "PostPaid") == "PostPaid":
+        return "max-postpaid-instance-vcpu-count", "used-postpaid-instance-vcpu-count"
+    return None
+
+
+class Preflight:
+    """
+    创建实例前的预检
+
+    各项检查相互独立，全部提交到线程池并发执行，
+    总耗时约等于最慢的一次API调用；任何一项失败时不应创建实例，
+    余额、配额、库存查询本身出错时只给出警告，以DryRun的结果为准
+    """
+
+    def __init__(self, api, stock_matrix, min_balance=MIN_POSTPAID_BALANCE):
+        """
+        Args:
+            api: AliyunAPI实例
+            stock_matrix: StockMatrix实例
+            min_balance: 按量付费要求的最低余额
+        """
+        self.api = api
+        self.stock_matrix = stock_matrix
+        self.min_balance = min_balance
+
+    def run(self, instance, vswitches, security_groups, tolerate_stock=False):
+        """
+        执行全部检查
+
+        Args:
+            instance: 待创建的Instance对象
+            vswitches: 区域交换机列表 [[vsw_id, zone_id, vpc_id], ...]
+            security_groups: 区域安全组列表(含SecurityGroupId和VpcId)，查询失败时为None
+            tolerate_stock: 库存不足只作为警告，用于 --fallback/--race 会换可用区或规格重试的场景
+
+        Returns:
+            list: [{"name", "status", "detail", "elapsed"}, ...]，按检查顺序排列
+        """
+        zones = {vsw_id: (zone_id, vpc_id) for vsw_id, zone_id, vpc_id in vswitches}
+        zone_id = zones.get(instance.VSwitchId, (None, None))[0]
+
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            # 配额检查需要规格的vCPU数，与其他检查同时查询
+            cpu_future = executor.submit(self._cpu_count, instance.InstanceType)
+            checks = [
+                ("DryRun", lambda: self._check_dry_run(instance, tolerate_stock)),
+                ("余额", lambda: self._check_balance(instance)),
+                ("配额", lambda: self._check_quota(instance, cpu_future)),
+                ("库存", lambda: self._check_stock(instance, zone_id, tolerate_stock)),
+                (
+                    "网络",
+                    lambda: self._check_network(instance, zones, security_groups),
+                ),
+            ]
+            futures = [
+                (name, executor.submit(self._timed, check)) for name, check in checks
+            ]
+            report = []
+            for name, future in futures:
+                status, detail, elapsed = future.result()
+                report.append(
+                    {"name": name, "status": status, "detail": detail, "elapsed": elapsed}
+                )
+        return report
+
+    @staticmethod
+    def passed(report):
+        return all(item["status"] != FAILED for item in report)
+
+    @staticmethod
+    def _timed(check):
+        started = time.monotonic()
+        try:
+            status, detail = check()
+        except Exception as e:
+            status, detail = FAILED, f"检查出错: {e}"
+        return status, detail, time.monotonic() - started
+
+    def _cpu_count(self, instance_type):
+        result = self.api.get_describe_instance_types([instance_type])
+        for item in (result or {}).get("instance_types", []):
+            if item["InstanceTypeId"] == instance_type:
+                return item["CpuCoreCount"]
+        return None
+
+    def _check_dry_run(self, instance, tolerate_stock):
+        ok, code, message = self.api.dry_run_instances(instance)
+        if ok:
+            return PASSED, "参数、权限校验通过"
+        detail = f"{code}: {message}" if code else message
+        if tolerate_stock and code and "NoStock" in code:
+            return WARNING, detail
+        return FAILED, detail
+
+    def _check_balance(self, instance):
+        if (instance.InstanceChargeType or "PostPaid") != "PostPaid":
+            return SKIPPED, "包年包月实例创建时直接扣款"
+        balance = self.api.get_account_balance()
+        if not balance:
+            return WARNING, "查询余额失败"
+        available = float(str(balance["Data"]["AvailableAmount"]).replace(",", ""))
+        if available < self.min_balance:
+            return FAILED, f"可用余额 {available:.2f} 低于按量付费要求的 {self.min_balance}"
+        return PASSED, f"可用余额 {available:.2f}"
+
+    def _check_quota(self, instance, cpu_future):
+        names = _vcpu_quota_names(instance)
+        if names is None:
+            return SKIPPED, "包年包月实例不检查vCPU配额"
+        attributes = self.api.get_account_attributes(names, instance.RegionId)
+        if attributes is None:
+            return WARNING, "查询配额失败"
+        cpu = cpu_future.result()
+        if cpu is None or names[0] not in attributes:
+            return SKIPPED, "未获取到规格vCPU数或配额"
+        limit = int(attributes[names[0]])
+        used = int(attributes.get(names[1]) or 0)
+        needed = cpu * int(instance.Amount or 1)
+        detail = f"需要 {needed} vCPU，已用 {used}/{limit}"
+        if used + needed > limit:
+            return FAILED, detail
+        return PASSED, detail
+
+    def _check_stock(self, instance, zone_id, tolerate_stock):
+        if zone_id is None:
+            return SKIPPED, "交换机不在当前区域的交换机列表中"
+        matrix = self.stock_matrix.query(
+            instance.RegionId, [zone_id], [instance.InstanceType], instance.SpotStrategy
+        )
+        status = matrix.get(zone_id, {}).get(instance.InstanceType)
+        if in_stock(matrix, zone_id, instance.InstanceType):
+            return PASSED, f"{zone_id} 有库存"
+        if status is None:
+            return WARNING, "查询库存失败"
+        return WARNING if tolerate_stock else FAILED, f"{zone_id} 库存状态: {status}"
+
+    @staticmethod
+    def _check_network(instance, zones, security_groups):
+        if instance.VSwitchId not in zones:
+            return FAILED, f"交换机 {instance.VSwitchId} 不存在"
+        vpc_id = zones[instance.VSwitchId][1]
+        if security_groups is None:
+            return WARNING, "查询安全组失败，未校验安全组与交换机是否同属一个VPC"
+        group = next(
+            (
+                sg
+                for sg in security_groups
+                if sg["SecurityGroupId"] == instance.SecurityGroupId
+            ),
+            None,
+        )
+        if group is None:
+            return FAILED, f"安全组 {instance.SecurityGroupId} 不存在"
+        if group.get("VpcId") != vpc_id:
+            return FAILED, f"安全组属于 {group.get('VpcId')}，交换机属于 {vpc_id}"
+        return PASSED, f"交换机与安全组同属 {vpc_id}"
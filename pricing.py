@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+价格模块，按计价键缓存实例的小时价格
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import TTLCache
+
+# 生成费用清单需要的实例字段，查询实例列表时只请求这些字段
+LEDGER_FIELDS = (
+    "instance_id",
+    "status",
+    "instance_type",
+    "zone_id",
+    "spot_strategy",
+    "internet_charge_type",
+    "internet_max_bandwidth_out",
+)
+
+
+class PriceBook:
+    """
+    实例小时价格簿
+
+    相同配置(地域、规格、磁盘、带宽、竞价策略)的实例价格相同，
+    因此按计价键缓存价格，避免为每台实例单独调用DescribePrice
+    """
+
+    def __init__(self, api, config, ttl=3600):
+        """
+        Args:
+            api: AliyunAPI实例
+            config: Config实例，用于补全实例列表中缺失的磁盘等信息
+            ttl: 价格缓存时间(秒)
+        """
+        self.api = api
+        self.config = config
+        self.cache = TTLCache(ttl)
+
+    def pricing_key(self, inst, region_id):
+        """
+        根据get_describe_instances返回的实例信息生成计价键
+        DescribeInstances不返回系统盘信息，磁盘使用配置文件中的默认值
+        """
+        spot_strategy = inst.get("spot_strategy") or "NoSpot"
+        return (
+            region_id,
+            inst.get("instance_type"),
+            self.config.get_system_disk_category(),
+            int(self.config.get_system_disk_size()),
+            int(inst.get("internet_max_bandwidth_out") or 0),
+            inst.get("internet_charge_type") or self.config.get_internet_charge_type(),
+            spot_strategy,
+        )
+
+    def hourly_price(self, key):
+        """
+        查询计价键对应的小时价格，优先使用缓存
+        """
+        return self.cache.get_or_load(key, lambda: self._load_price(key))
+
+    def cached_price(self, key):
+        """
+        仅从缓存读取价格，不发起API调用
+        """
+        return self.cache.get(key)
+
+    def hourly_prices(self, keys, max_workers=8):
+        """
+        并发查询多个计价键的小时价格，相同的计价键只查询一次
+
+        Args:
+            keys: 计价键列表
+            max_workers: 最大并发数
+
+        Returns:
+            dict: 计价键 -> 小时价格(查询失败为None)
+        """
+        prices = {}
+        missing = []
+        for key in set(keys):
+            price = self.cache.get(key)
+            if price is None:
+                missing.append(key)
+            else:
+                prices[key] = price
+
+        if missing:
+            workers = min(max_workers, len(missing))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # 工作线程沿用调用方的contextvars上下文，每个任务一份副本
+                futures = [
+                    executor.submit(
+                        contextvars.copy_context().run, self.hourly_price, key
+                    )
+                    for key in missing
+                ]
+                for key, future in zip(missing, futures):
+                    prices[key] = future.result()
+        return prices
+
+    def build_ledger(self, instances, region_id, max_workers=8):
+        """
+        生成运行中实例的费用清单
+
+        Args:
+            instances: get_describe_instances返回的实例列表
+            region_id: 实例所在区域
+            max_workers: 查询价格的最大并发数
+
+        Returns:
+            dict: rows为每台实例的小时/日费用，另含合计与去重后的计价键数量
+        """
+        running = [inst for inst in instances if inst.get("status") == "Running"]
+        keys = [self.pricing_key(inst, region_id) for inst in running]
+        prices = self.hourly_prices(keys, max_workers=max_workers)
+
+        rows = []
+        hourly_total = 0.0
+        for inst, key in zip(running, keys):
+            hourly = prices.get(key)
+            if hourly is not None:
+                hourly_total += hourly
+            rows.append(
+                {
+                    "instance_id": inst["instance_id"],
+                    "instance_type": inst.get("instance_type"),
+                    "zone_id": inst.get("zone_id"),
+                    "spot_strategy": key[-1],
+                    "hourly": hourly,
+                    "daily": hourly * 24 if hourly is not None else None,
+                }
+            )
+
+        return {
+            "rows": rows,
+            "hourly_total": hourly_total,
+            "daily_total": hourly_total * 24,
+            "distinct_keys": len(prices),
+        }
+
+    def _load_price(self, key):
+        (
+            region_id,
+            instance_type,
+            disk_category,
+            disk_size,
+            bandwidth,
+            internet_charge_type,
+            spot_strategy,
+        ) = key
+        return self.api.get_price_value(
+            RegionId=region_id,
+            InstanceType=instance_type,
+            SystemDiskCategory=disk_category,
+            SystemDiskSize=disk_size,
+            InternetMaxBandwidthOut=bandwidth,
+            InternetChargeType=internet_charge_type,
+            SpotStrategy=spot_strategy,
+            SpotDuration=None if spot_strategy == "NoSpot" else 0,
+        )
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+网络就绪探测模块，使用非阻塞socket并发探测实例端口是否可连接
+"""
+
+import errno
+import selectors
+import socket
+import time
+
+
+def probe_ports(
+    targets,
+    ports=(22,),
+    timeout=120,
+    connect_timeout=2,
+    backoff=0.5,
+    max_backoff=5,
+):
+    """
+    在单个事件循环中并发探测多个主机的TCP端口，直到全部可连接或超时
+
+    Args:
+        targets: 目标字典 {名称(如实例ID): (ip, 基准时间)}，
+            基准时间为time.monotonic()的值，耗时从该时间开始计算
+        ports: 需要探测的端口列表
+        timeout: 总超时时间(秒)
+        connect_timeout: 单次连接超时时间(秒)
+        backoff: 连接失败后的初始重试间隔(秒)，每次失败翻倍
+        max_backoff: 最大重试间隔(秒)
+
+    Returns:
+        dict: {名称: {端口: 端口可连接时距基准时间的耗时(秒)，超时为None}}
+    """
+    selector = selectors.DefaultSelector()
+    deadline = time.monotonic() + timeout
+    results = {name: {port: None for port in ports} for name in targets}
+    # 每个(名称, 端口)的下次尝试时间和当前重试间隔
+    schedule = {
+        (name, port): [time.monotonic(), backoff]
+        for name, (ip, _) in targets.items()
+        if ip
+        for port in ports
+    }
+    connecting = {}
+
+    def retry_later(key):
+        state = schedule[key]
+        state[0] = time.monotonic() + state[1]
+        state[1] = min(state[1] * 2, max_backoff)
+
+    try:
+        while schedule and time.monotonic() < deadline:
+            now = time.monotonic()
+
+            # 发起到期的连接
+            for key, (next_attempt, _) in schedule.items():
+                if key in connecting or next_attempt > now:
+                    continue
+                name, port = key
+                ip = targets[name][0]
+                sock = socket.socket(socket.AF_INET6 if ":" in ip else socket.AF_INET)
+                sock.setblocking(False)
+                code = sock.connect_ex((ip, port))
+                if code not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+                    sock.close()
+                    retry_later(key)
+                    continue
+                connecting[key] = (sock, now)
+                selector.register(sock, selectors.EVENT_WRITE, key)
+
+            # 计算下一次需要醒来的时间
+            wake_at = deadline
+            for key, (next_attempt, _) in schedule.items():
+                if key in connecting:
+                    wake_at = min(wake_at, connecting[key][1] + connect_timeout)
+                else:
+                    wake_at = min(wake_at, next_attempt)
+            wait = max(0.0, wake_at - time.monotonic())
+
+            events = selector.select(timeout=wait) if connecting else []
+            if not connecting:
+                time.sleep(wait)
+
+            for selector_key, _ in events:
+                key = selector_key.data
+                sock, _ = connecting.pop(key)
+                selector.unregister(sock)
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                sock.close()
+                if error == 0:
+                    name, port = key
+                    results[name][port] = time.monotonic() - targets[name][1]
+                    del schedule[key]
+                else:
+                    retry_later(key)
+
+            # 处理连接超时
+            now = time.monotonic()
+            for key, (sock, started) in list(connecting.items()):
+                if now - started >= connect_timeout:
+                    del connecting[key]
+                    selector.unregister(sock)
+                    sock.close()
+                    retry_later(key)
+    finally:
+        for sock, _ in connecting.values():
+            selector.unregister(sock)
+            sock.close()
+        selector.close()
+
+    return results
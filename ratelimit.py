@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+API限流模块，按账号总速率和单个API的速率限流，被服务端限流时暂停并重试
+
+限流器实现了与cassette.Recorder/Player相同的wrap()接口，通过 AliyunAPI.set_cassette()
+替换SDK客户端；同时启用录制/回放时，录制器作为inner被包在限流器内层
+"""
+
+import threading
+import time
+
+from Tea.exceptions import TeaException
+
+
+def is_throttled(error):
+    """
+    是否为服务端限流错误，如 Throttling、Throttling.User、Throttling.Api
+    """
+    return isinstance(error, TeaException) and str(error.code or "").startswith(
+        "Throttling"
+    )
+
+
+class TokenBucket:
+    """
+    令牌桶，取令牌时预约，令牌不足时返回需要等待的时间
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 令牌桶容量，默认等于rate
+        """
+        self.rate = rate
+        self.capacity = max(1.0, burst or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        预约一个令牌
+
+        Returns:
+            float: 需要等待的秒数，为0时可立即调用
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            # 令牌可以预支为负数，后到的调用等待更久，保证先到先得
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.paused_until - now)
+
+    def pause(self, seconds):
+        """
+        暂停发放令牌，被服务端限流时调用
+        """
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class RateLimitedClient:
+    """
+    SDK客户端代理，每次调用前从限流器取令牌
+    """
+
+    def __init__(self, client, service, limiter):
+        self._client = client
+        self._service = service
+        self._limiter = limiter
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        return lambda *args, **kwargs: self._limiter.call(name, attr, args, kwargs)
+
+
+class RateLimiter:
+    """
+    账号级API限流器
+
+    所有线程共用一个总令牌桶，methods中配置的API另有单独的令牌桶；
+    服务端返回Throttling错误时暂停对应令牌桶并按指数退避重试
+    """
+
+    def __init__(self, rate=20, burst=None, methods=None, max_retries=3, inner=None):
+        """
+        Args:
+            rate: 账号总速率(次/秒)
+            burst: 总令牌桶容量，默认等于rate
+            methods: 单个API的速率，如 {"run_instances": 5}，键为SDK方法名(不含_with_options)
+            max_retries: 被服务端限流后的最大重试次数
+            inner: 内层的录制器/回放器，可选
+        """
+        self.bucket = TokenBucket(rate, burst)
+        self.method_buckets = {
+            name: TokenBucket(value) for name, value in (methods or {}).items()
+        }
+        self.max_retries = max_retries
+        self.inner = inner
+        self.calls = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def replaying(self):
+        return self.inner is not None and self.inner.replaying
+
+    def wrap(self, service, client):
+        if self.inner is not None:
+            client = self.inner.wrap(service, client)
+        return RateLimitedClient(client, service, self)
+
+    def _buckets(self, method):
+        name = method
+        if name.endswith("_with_options"):
+            name = name[: -len("_with_options")]
+        bucket = self.method_buckets.get(name)
+        return (self.bucket,) if bucket is None else (self.bucket, bucket)
+
+    def call(self, method, func, args, kwargs):
+        buckets = self._buckets(method)
+        for attempt in range(self.max_retries + 1):
+            wait = max(bucket.reserve() for bucket in buckets)
+            if wait > 0:
+                time.sleep(wait)
+            with self._lock:
+                self.calls += 1
+                self.waited += wait
+            try:
+                return func(*args, **kwargs)
+            except TeaException as e:
+                if not is_throttled(e) or attempt == self.max_retries:
+                    raise
+                with self._lock:
+                    self.throttled += 1
+                # 服务端已限流，暂停发放令牌，其他线程也会一起等待
+                for bucket in buckets:
+                    bucket.pause(0.5 * 2**attempt)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "waited": round(self.waited, 3),
+            }
+
+    def summary(self):
+        return (
+            f"限流器共放行 {self.calls} 次调用，服务端限流 {self.throttled} 次，"
+            f"排队等待 {self.waited:.2f} 秒"
+        )
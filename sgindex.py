@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+安全组端口索引模块，将安全组规则编译为(协议, 端口) -> 安全组的区间树索引
+"""
+
+import ipaddress
+
+PORT_MIN = 1
+PORT_MAX = 65535
+
+
+class IntervalTree:
+    """
+    静态中心区间树，支持查询包含某个点的全部区间
+    """
+
+    def __init__(self, intervals):
+        """
+        Args:
+            intervals: [(start, end, value), ...]，区间为闭区间
+        """
+        self.center = None
+        self.left = None
+        self.right = None
+        if not intervals:
+            return
+
+        points = sorted(p for start, end, _ in intervals for p in (start, end))
+        self.center = points[len(points) // 2]
+        left, right, here = [], [], []
+        for interval in intervals:
+            if interval[1] < self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        # 跨越中心点的区间分别按起点升序、终点降序保存，查询时可提前结束扫描
+        self.by_start = sorted(here, key=lambda i: i[0])
+        self.by_end = sorted(here, key=lambda i: i[1], reverse=True)
+        self.left = IntervalTree(left) if left else None
+        self.right = IntervalTree(right) if right else None
+
+    def query(self, point):
+        """
+        返回包含point的所有区间的value
+        """
+        node = self
+        values = []
+        while node is not None and node.center is not None:
+            if point < node.center:
+                for start, _, value in node.by_start:
+                    if start > point:
+                        break
+                    values.append(value)
+                node = node.left
+            elif point > node.center:
+                for _, end, value in node.by_end:
+                    if end < point:
+                        break
+                    values.append(value)
+                node = node.right
+            else:
+                values.extend(value for _, _, value in node.by_start)
+                break
+        return values
+
+
+def parse_port_range(port_range):
+    """
+    解析端口范围，如 "22/22"、"1/65535"、"all/all"、"-1/-1"
+
+    Returns:
+        tuple: (起始端口, 结束端口)
+    """
+    start, _, end = str(port_range).partition("/")
+    if start in ("all", "-1") or end in ("all", "-1"):
+        return PORT_MIN, PORT_MAX
+    return int(start), int(end or start)
+
+
+def parse_port_requirements(text):
+    """
+    解析端口需求，如 "22,80-443/tcp,53/udp"，未指定协议时为TCP
+
+    Returns:
+        list: [(协议, 起始端口, 结束端口), ...]
+    """
+    requirements = []
+    for item in text.replace(" ", "").split(","):
+        if not item:
+            continue
+        ports, _, protocol = item.partition("/")
+        start, _, end = ports.partition("-")
+        requirements.append(
+            ((protocol or "tcp").upper(), int(start), int(end or start))
+        )
+    return requirements
+
+
+class SecurityGroupIndex:
+    """
+    安全组端口索引
+
+    只索引入方向的允许规则，每个协议一棵区间树，
+    区间的value为(安全组ID, 源网段)。只授权给其他安全组或前缀列表的规则
+    不对任意来源开放，不参与索引
+    """
+
+    def __init__(self, security_groups):
+        """
+        Args:
+            security_groups: get_all_describe_security_group_attribute返回的结果
+        """
+        self.groups = {sg["SecurityGroupId"]: sg for sg in security_groups}
+        # 每个安全组按协议保存的区间，用于校验端口范围是否被完整覆盖
+        self.group_intervals = {}
+        intervals = {}
+        for sg in security_groups:
+            for rule in sg["attribute"]:
+                if rule.get("Direction", "ingress") != "ingress":
+                    continue
+                if rule.get("Policy", "Accept").lower() != "accept":
+                    continue
+                cidr = rule.get("SourceCidrIp") or rule.get("Ipv6SourceCidrIp")
+                if not cidr:
+                    continue
+                try:
+                    start, end = parse_port_range(rule["PortRange"])
+                    network = ipaddress.ip_network(cidr, strict=False)
+                except ValueError:
+                    continue
+                protocol = (rule["IpProtocol"] or "ALL").upper()
+                intervals.setdefault(protocol, []).append(
+                    (start, end, (sg["SecurityGroupId"], network))
+                )
+                self.group_intervals.setdefault(
+                    (sg["SecurityGroupId"], protocol), []
+                ).append((start, end, network))
+        self.trees = {
+            protocol: IntervalTree(items) for protocol, items in intervals.items()
+        }
+
+    def groups_for(self, protocol, port, source="0.0.0.0/0"):
+        """
+        查询允许source访问(protocol, port)的安全组
+
+        Returns:
+            set: 安全组ID集合
+        """
+        source = ipaddress.ip_network(source, strict=False)
+        matched = set()
+        for name in (protocol.upper(), "ALL"):
+            tree = self.trees.get(name)
+            if tree is None:
+                continue
+            for group_id, network in tree.query(port):
+                if source.version == network.version and source.subnet_of(network):
+                    matched.add(group_id)
+        return matched
+
+    def propose(self, requirements, source="0.0.0.0/0"):
+        """
+        推荐满足全部端口需求的安全组，规则越少(开放越精确)越靠前
+
+        Args:
+            requirements: parse_port_requirements返回的列表
+            source: 访问来源网段
+
+        Returns:
+            list: 安全组ID列表
+        """
+        candidates = set(self.groups)
+        for protocol, start, end in requirements:
+            # 先用区间树找出覆盖起始端口的安全组，再校验整个端口范围
+            candidates &= {
+                group_id
+                for group_id in self.groups_for(protocol, start, source)
+                if self._covers(group_id, protocol, start, end, source)
+            }
+        return sorted(candidates, key=lambda g: len(self.groups[g]["attribute"]))
+
+    def _covers(self, group_id, protocol, start, end, source):
+        """
+        判断安全组的规则是否完整覆盖[start, end]端口范围
+        """
+        source = ipaddress.ip_network(source, strict=False)
+        intervals = sorted(
+            (s, e)
+            for name in (protocol.upper(), "ALL")
+            for s, e, network in self.group_intervals.get((group_id, name), [])
+            if source.version == network.version and source.subnet_of(network)
+        )
+        covered = start - 1
+        for s, e in intervals:
+            if s > covered + 1:
+                break
+            covered = max(covered, e)
+            if covered >= end:
+                return True
+        return covered >= end
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+竞价历史价格模块，拉取DescribeSpotPriceHistory并计算各可用区/规格的价格统计
+"""
+
+import math
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+try:
+    import numpy
+except ImportError:  # numpy为可选依赖，未安装时使用纯Python计算
+    numpy = None
+
+# 阿里云只保留最近30天的竞价历史价格
+HISTORY_MAX_DAYS = 30
+
+_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def format_time(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime(_TIME_FORMAT)
+
+
+def parse_time(text):
+    return int(
+        datetime.strptime(text, _TIME_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+    )
+
+
+class PriceSeries:
+    """
+    单个(可用区, 规格)的价格序列，使用array紧凑保存，按时间升序
+    """
+
+    def __init__(self, timestamps=(), prices=(), origins=()):
+        self.timestamps = array("q", timestamps)
+        self.prices = array("d", prices)
+        self.origins = array("d", origins)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def last_timestamp(self):
+        return self.timestamps[-1] if self.timestamps else None
+
+    def extend(self, records):
+        """
+        追加API返回的价格记录，忽略不晚于已有最后时间的记录
+        """
+        last = self.last_timestamp
+        for record in sorted(records, key=lambda r: r["timestamp"]):
+            ts = parse_time(record["timestamp"])
+            if last is not None and ts <= last:
+                continue
+            self.timestamps.append(ts)
+            self.prices.append(float(record["spot_price"]))
+            self.origins.append(float(record["origin_price"] or 0))
+            last = ts
+
+    def trim(self, since):
+        """
+        丢弃since之前的记录，保留since时刻仍在生效的最后一条记录
+
+        价格只在变化时产生记录，since之前的最后一条记录就是since时刻的价格
+        """
+        drop = 0
+        while drop + 1 < len(self.timestamps) and self.timestamps[drop + 1] <= since:
+            drop += 1
+        if drop:
+            del self.timestamps[:drop]
+            del self.prices[:drop]
+            del self.origins[:drop]
+
+    def window(self, since):
+        """
+        返回since之后的子序列，since时刻生效的价格作为第一条记录，时间截取为since
+        """
+        result = PriceSeries(self.timestamps, self.prices, self.origins)
+        result.trim(since)
+        if len(result) and result.timestamps[0] < since:
+            result.timestamps[0] = int(since)
+        return result
+
+    def durations(self, until):
+        """
+        每个价格的持续时长(秒)，最后一个价格持续到until
+        """
+        ends = list(self.timestamps[1:]) + [max(until, self.last_timestamp)]
+        return [end - start for start, end in zip(self.timestamps, ends)]
+
+    def to_dict(self):
+        return {
+            "timestamps": self.timestamps.tolist(),
+            "prices": self.prices.tolist(),
+            "origins": self.origins.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["timestamps"], data["prices"], data["origins"])
+
+
+def _weighted_percentile(prices, weights, q):
+    """
+    按权重计算分位数：价格升序累计权重，返回累计权重首次达到q%的价格
+    """
+    pairs = sorted(zip(prices, weights))
+    target = sum(weights) * q / 100
+    cumulative = 0.0
+    for price, weight in pairs:
+        cumulative += weight
+        if cumulative >= target:
+            return price
+    return pairs[-1][0]
+
+
+def series_stats(series, until=None):
+    """
+    计算价格统计
+
+    价格只在变化时产生记录，统计按每个价格的持续时长加权，
+    短时间内的多次波动不会被放大；序列总时长为0时按记录等权计算
+
+    Args:
+        series: PriceSeries，通常为window()的结果
+        until: 最后一个价格的截止时间，默认为当前时间
+
+    Returns:
+        dict: mean(均价)、p95、volatility(变异系数)、
+              ratio(p95相对按量价格的比例，越接近1说明资源越紧张，被回收的风险越高)、
+              score(排序分数，p95 * (1 + volatility)，越低越好)；
+              序列为空时返回None
+    """
+    if not len(series):
+        return None
+    weights = series.durations(time.time() if until is None else until)
+    if not sum(weights):
+        weights = [1] * len(series)
+    if numpy is not None:
+        # array支持缓冲区协议，frombuffer不复制数据
+        prices = numpy.frombuffer(series.prices, dtype=numpy.float64)
+        origins = numpy.frombuffer(series.origins, dtype=numpy.float64)
+        weights = numpy.asarray(weights, dtype=numpy.float64)
+        mean = float(numpy.average(prices, weights=weights))
+        order = numpy.argsort(prices, kind="stable")
+        cumulative = numpy.cumsum(weights[order])
+        index = int(numpy.searchsorted(cumulative, cumulative[-1] * 0.95))
+        p95 = float(prices[order][min(index, len(order) - 1)])
+        std = math.sqrt(float(numpy.average((prices - mean) ** 2, weights=weights)))
+        origin = float(origins.max())
+    else:
+        prices = series.prices
+        total = sum(weights)
+        mean = sum(p * w for p, w in zip(prices, weights)) / total
+        p95 = _weighted_percentile(prices, weights, 95)
+        std = math.sqrt(
+            sum(w * (p - mean) ** 2 for p, w in zip(prices, weights)) / total
+        )
+        origin = max(series.origins)
+
+    volatility = std / mean if mean else 0.0
+    return {
+        "samples": len(series),
+        "mean": mean,
+        "p95": p95,
+        "volatility": volatility,
+        "ratio": p95 / origin if origin else None,
+        "score": p95 * (1 + volatility),
+    }
+
+
+class SpotHistory:
+    """
+    竞价历史价格，序列缓存到本地磁盘，再次查询时只拉取上次之后的新记录
+    """
+
+    def __init__(self, api, disk_cache, max_workers=8):
+        """
+        Args:
+            api: AliyunAPI实例
+            disk_cache: DiskCache实例
+            max_workers: 最大并发查询数
+        """
+        self.api = api
+        self.disk_cache = disk_cache
+        self.max_workers = max_workers
+
+    @staticmethod
+    def _cache_key(region_id, zone_id, instance_type):
+        return f"spot-{region_id}-{zone_id}-{instance_type}"
+
+    def _fetch(self, region_id, zone_id, instance_type, start_time):
+        """
+        按next_offset拉取start_time之后的全部记录，失败时返回None
+        """
+        records = []
+        offset = 0
+        while True:
+            page, offset = self.api.get_spot_price_history(
+                zone_id,
+                instance_type,
+                format_time(start_time),
+                offset=offset,
+                region_id=region_id,
+            )
+            if page is None:
+                return None
+            records.extend(page)
+            if not page or not offset:
+                return records
+
+    def load(self, region_id, zone_id, instance_type, now=None):
+        """
+        增量更新并返回价格序列，拉取失败时返回已缓存的序列
+        """
+        now = time.time() if now is None else now
+        key = self._cache_key(region_id, zone_id, instance_type)
+        cached = self.disk_cache.get(key)
+        series = PriceSeries.from_dict(cached) if cached else PriceSeries()
+
+        oldest = int(now) - HISTORY_MAX_DAYS * 86400
+        series.trim(oldest)
+        start = series.last_timestamp + 1 if len(series) else oldest
+        records = self._fetch(region_id, zone_id, instance_type, start)
+        if records is None:
+            return series
+        if records:
+            series.extend(records)
+            self.disk_cache.set(key, series.to_dict())
+        return series
+
+    def analyze(self, region_id, zones, instance_types, days=7):
+        """
+        并发拉取各(可用区, 规格)的历史价格并计算最近days天的统计
+
+        Returns:
+            list: 统计结果，按score升序排列，没有数据的组合排在最后
+        """
+        cells = [(zone, t) for zone in dict.fromkeys(zones) for t in instance_types]
+        if not cells:
+            return []
+        now = time.time()
+        since = now - days * 86400
+
+        def load(cell):
+            zone, instance_type = cell
+            series = self.load(region_id, zone, instance_type, now)
+            stats = series_stats(series.window(since), until=now) or {"samples": 0}
+            stats.update(zone_id=zone, instance_type=instance_type)
+            return stats
+
+        workers = min(self.max_workers, len(cells))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(load, cells))
+        return sorted(
+            results,
+            key=lambda r: (r["samples"] == 0, r.get("score") or 0),
+        )
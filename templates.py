@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+启动模板目录模块，并发拉取各模板的版本详情并缓存到本地
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+def flatten(data, prefix=""):
+    """
+    将嵌套的模板配置展开为 {"SystemDisk.Size": 40, "Tags.Tag[0].Key": ...} 形式
+    """
+    items = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            items.update(flatten(value, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(data, list):
+        for i, value in enumerate(data):
+            items.update(flatten(value, f"{prefix}[{i}]"))
+    elif data is not None and data != "":
+        items[prefix] = data
+    return items
+
+
+def diff_versions(old, new):
+    """
+    比较两个版本的模板配置
+
+    Args:
+        old: 旧版本信息(get_describe_launch_template_versions返回的元素)
+        new: 新版本信息
+
+    Returns:
+        list: [(配置项, 旧值, 新值), ...]，按配置项排序，值不存在时为None
+    """
+    old_items = flatten(old["launch_template_data"])
+    new_items = flatten(new["launch_template_data"])
+    return [
+        (key, old_items.get(key), new_items.get(key))
+        for key in sorted(old_items.keys() | new_items.keys())
+        if old_items.get(key) != new_items.get(key)
+    ]
+
+
+def find_template(templates, name_or_id):
+    """
+    按名称或ID查找模板，未找到返回None
+    """
+    for template in templates.get("launch_templates", []) if templates else []:
+        if name_or_id in (
+            template["launch_template_name"],
+            template["launch_template_id"],
+        ):
+            return template
+    return None
+
+
+def find_version(template, version_number):
+    """
+    查找模板的指定版本，未找到返回None
+    """
+    for version in template["version_details"]:
+        if str(version["version_number"]) == str(version_number):
+            return version
+    return None
+
+
+class TemplateCatalog:
+    """
+    启动模板目录
+
+    模板列表每次实时查询，各模板的版本详情缓存到本地磁盘，
+    模板的modified_time或最新版本号变化时才重新拉取
+    """
+
+    def __init__(self, api, disk_cache, max_workers=8):
+        """
+        Args:
+            api: AliyunAPI实例
+            disk_cache: DiskCache实例
+            max_workers: 并发拉取模板版本的线程数
+        """
+        self.api = api
+        self.disk_cache = disk_cache
+        self.max_workers = max_workers
+
+    def load(self, region_id, refresh=False):
+        """
+        查询模板列表并填充每个模板的version_details
+
+        Returns:
+            dict: 与get_describe_launch_templates格式一致，查询失败返回None
+        """
+        result = self._fetch_templates(region_id)
+        if result is None or not result["launch_templates"]:
+            return result
+
+        def load_versions(template):
+            template["version_details"] = self._versions(region_id, template, refresh)
+
+        workers = min(self.max_workers, len(result["launch_templates"]))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(load_versions, result["launch_templates"]))
+        return result
+
+    def _fetch_templates(self, region_id, page_size=50):
+        """
+        拉取全部分页的模板列表
+        """
+        result = self.api.get_describe_launch_templates(region_id, 1, page_size)
+        if result is None:
+            return None
+        pages = ((result["total_count"] or 0) + page_size - 1) // page_size
+        for page in range(2, pages + 1):
+            more = self.api.get_describe_launch_templates(region_id, page, page_size)
+            if more is None:
+                return None
+            result["launch_templates"].extend(more["launch_templates"])
+        return result
+
+    def _versions(self, region_id, template, refresh=False):
+        """
+        获取模板的全部版本，优先使用未失效的本地缓存
+        """
+        key = f"template-{region_id}-{template['launch_template_id']}"
+        stamp = [template["modified_time"], template["latest_version_number"]]
+        cached = None if refresh else self.disk_cache.get(key)
+        if cached and cached.get("stamp") == stamp:
+            return cached["versions"]
+
+        versions = []
+        page = 1
+        while True:
+            items, total = self.api.get_describe_launch_template_versions(
+                template["launch_template_id"], region_id, page
+            )
+            if items is None:
+                # 拉取失败时退回旧缓存
+                return cached["versions"] if cached else []
+            versions.extend(items)
+            if not items or len(versions) >= total:
+                break
+            page += 1
+
+        versions.sort(key=lambda v: v["version_number"])
+        self.disk_cache.set(key, {"stamp": stamp, "versions": versions})
+        return versions
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+实例自定义数据(UserData)模块，渲染cloud-init模板并编码
+"""
+
+import base64
+import os
+import re
+
+try:
+    import jinja2
+except ImportError:  # jinja2为可选依赖，未安装时仅支持简单变量替换
+    jinja2 = None
+
+# 阿里云要求UserData编码前不超过32KB
+USER_DATA_MAX_BYTES = 32 * 1024
+
+_VARIABLE_PATTERN = re.compile(r"{{\s*([A-Za-z_][A-Za-z0-9_]*)\s*}}")
+
+
+class UserDataError(ValueError):
+    """
+    UserData模板渲染或校验失败
+    """
+
+
+def load_template(template):
+    """
+    读取模板内容，template为已存在的文件路径时读取文件，否则视为模板文本
+    """
+    if "\n" not in template and os.path.isfile(template):
+        with open(template, "r", encoding="utf-8") as f:
+            return f.read()
+    return template
+
+
+def render_template(template, variables):
+    """
+    渲染模板
+
+    安装了jinja2时使用jinja2渲染(支持条件、循环等语法)，
+    否则只替换 {{ name }} 形式的变量
+
+    Raises:
+        UserDataError: 模板引用了未定义的变量
+    """
+    if jinja2 is not None:
+        env = jinja2.Environment(
+            undefined=jinja2.StrictUndefined, keep_trailing_newline=True
+        )
+        try:
+            return env.from_string(template).render(**variables)
+        except jinja2.TemplateError as e:
+            raise UserDataError(f"渲染UserData模板失败: {e}") from e
+
+    def replace(match):
+        name = match.group(1)
+        if name not in variables:
+            raise UserDataError(f"渲染UserData模板失败: 未定义的变量 {name}")
+        return str(variables[name])
+
+    return _VARIABLE_PATTERN.sub(replace, template)
+
+
+def encode_user_data(text):
+    """
+    校验大小并进行Base64编码
+
+    Raises:
+        UserDataError: 超过阿里云的大小限制
+    """
+    raw = text.encode("utf-8")
+    if len(raw) > USER_DATA_MAX_BYTES:
+        raise UserDataError(
+            f"UserData大小为 {len(raw)} 字节，超过 {USER_DATA_MAX_BYTES} 字节的限制"
+        )
+    return base64.b64encode(raw).decode("ascii")
+
+
+def instance_variables(instance, index, extra=None):
+    """
+    生成单台实例的模板变量
+
+    Args:
+        instance: Instance对象
+        index: 实例序号，从1开始
+        extra: 配置文件中的自定义变量
+    """
+    amount = int(instance.Amount or 1)
+    host_name = instance.HostName or "vps"
+    variables = dict(extra or {})
+    variables.update(
+        {
+            "index": index,
+            "amount": amount,
+            "hostname": host_name if amount == 1 else f"{host_name}-{index}",
+            "region": instance.RegionId,
+            "instance_type": instance.InstanceType,
+            "instance_name": instance.InstanceName,
+        }
+    )
+    return variables
+
+
+def render_user_data(template, instance, extra=None):
+    """
+    为每台实例渲染并编码UserData
+
+    Returns:
+        list: 与实例序号一一对应的Base64编码UserData
+    """
+    template = load_template(template)
+    amount = int(instance.Amount or 1)
+    return [
+        encode_user_data(
+            render_template(template, instance_variables(instance, index, extra))
+        )
+        for index in range(1, amount + 1)
+    ]
@@ -5,6 +5,7 @@
 工具函数模块
 """
 
+import shlex
 from prettytable import PrettyTable
 
 
@@ -98,4 +99,55 @@ def get_user_input(prompt, default=None):
         user_input = input(f"\033[1;33m{prompt}\033[0m [默认: {default}]: ").strip()
         return user_input if user_input else default
     else:
-        return input(f"\033[1;33m{prompt}\033[0m: ").strip()
\ No newline at end of file
+        return input(f"\033[1;33m{prompt}\033[0m: ").strip()
+
+
+class UsageError(ValueError):
+    """
+    命令参数错误，由控制台打印错误信息，不中断命令循环
+    """
+
+
+def parse_options(arg, flags=(), optional=()):
+    """
+    解析命令参数
+
+    Args:
+        arg: 命令参数字符串，如 "--ttl 4h i-xxx"
+        flags: 不带值的开关选项名称，如 ("fallback",)
+        optional: 值可以省略的选项名称，省略时值为True，如 ("from-pool",)
+
+    Returns:
+        tuple: (位置参数列表, 选项字典)
+
+    Raises:
+        UsageError: 引号不匹配，或选项缺少值
+    """
+    args = []
+    options = {}
+    try:
+        tokens = shlex.split(arg or "")
+    except ValueError as e:
+        raise UsageError(f"参数格式错误: {e}") from e
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.startswith("--") and len(token) > 2:
+            name = token[2:]
+            if "=" in name:
+                name, value = name.split("=", 1)
+                options[name] = value
+            elif name in flags:
+                options[name] = True
+            elif i + 1 >= len(tokens) or tokens[i + 1].startswith("--"):
+                # 下一个是其他选项时不把它当作值
+                if name not in optional:
+                    raise UsageError(f"选项 --{name} 缺少参数值")
+                options[name] = True
+            else:
+                options[name] = tokens[i + 1]
+                i += 1
+        else:
+            args.append(token)
+        i += 1
+    return args, options
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+实例监控模块，按自适应间隔轮询实例状态，只重绘发生变化的行
+"""
+
+import sys
+import time
+import unicodedata
+from collections import deque
+
+# 处于这些状态时加快轮询
+TRANSITIONAL_STATUSES = ("Pending", "Starting", "Stopping")
+
+# 实例从列表中消失时记录的状态
+RELEASED = "Released"
+
+# 监控画面显示的实例字段
+WATCH_FIELDS = ("instance_id", "status", "instance_type", "zone_id", "public_ip")
+
+
+class InstanceWatcher:
+    """
+    实例状态轮询
+
+    定期拉取完整实例列表以发现新增/释放的实例和公网IP变化，
+    其余轮询只批量查询状态；有实例处于中间状态时使用较短的间隔
+    """
+
+    def __init__(
+        self,
+        api,
+        region_id,
+        fast_interval=2,
+        slow_interval=30,
+        full_refresh=120,
+        log_size=10,
+    ):
+        """
+        Args:
+            api: AliyunAPI实例
+            region_id: 区域ID
+            fast_interval: 有实例处于中间状态时的轮询间隔(秒)
+            slow_interval: 实例状态稳定时的轮询间隔(秒)
+            full_refresh: 拉取完整实例列表的间隔(秒)
+            log_size: 保留的状态变化记录数
+        """
+        self.api = api
+        self.region_id = region_id
+        self.fast_interval = fast_interval
+        self.slow_interval = slow_interval
+        self.full_refresh = full_refresh
+        self.instances = {}
+        self.changes = deque(maxlen=log_size)
+        self.api_calls = 0
+        self._last_full = None
+        self._last_poll = None
+
+    @property
+    def interval(self):
+        if any(
+            inst["status"] in TRANSITIONAL_STATUSES for inst in self.instances.values()
+        ):
+            return self.fast_interval
+        return self.slow_interval
+
+    def poll(self):
+        """
+        轮询一次，记录状态变化
+
+        Returns:
+            bool: 是否成功获取到数据
+        """
+        now = time.monotonic()
+        current = None
+        if self._last_full is None or now - self._last_full >= self.full_refresh:
+            self.api_calls += 1
+            instances = self.api.get_describe_instances(
+                self.region_id, fields=WATCH_FIELDS
+            )
+            # 查询失败时返回空列表，已有实例时改用状态查询确认，避免误记为释放
+            if instances or not self.instances:
+                self._last_full = now
+                current = {inst["instance_id"]: inst for inst in instances}
+        if current is None:
+            self.api_calls += 1
+            statuses = self.api.get_instances_status(self.region_id, self.instances)
+            if statuses is None:
+                return False
+            current = {
+                instance_id: dict(self.instances[instance_id], status=status)
+                for instance_id, status in statuses.items()
+            }
+
+        for instance_id, inst in current.items():
+            old = self.instances.get(instance_id)
+            if old is None:
+                # 首次拉取时不记录，只记录之后新出现的实例
+                if self._last_poll is not None:
+                    self._record(instance_id, None, inst["status"])
+            elif old["status"] != inst["status"]:
+                self._record(instance_id, old["status"], inst["status"])
+        for instance_id, old in self.instances.items():
+            if instance_id not in current:
+                self._record(instance_id, old["status"], RELEASED)
+
+        self.instances = current
+        self._last_poll = now
+        return True
+
+    def _record(self, instance_id, old, new):
+        self.changes.append((time.time(), instance_id, old, new))
+
+    def rows(self):
+        return sorted(self.instances.values(), key=lambda inst: inst["instance_id"])
+
+
+def display_width(text):
+    """
+    终端显示宽度，中文等全角字符占两列
+    """
+    return sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+
+
+def pad(text, width):
+    text = str(text)
+    return text + " " * max(width - display_width(text), 0)
+
+
+class DiffRenderer:
+    """
+    终端差异重绘
+
+    记录上一次输出的各行，再次绘制时用ANSI光标控制只改写变化的行；
+    行数变化时清除旧内容整体重绘
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lines = []
+
+    def draw(self, lines):
+        """
+        绘制lines，光标最终停在最后一行之后
+
+        Returns:
+            int: 本次改写的行数
+        """
+        out = []
+        if len(lines) != len(self.lines):
+            if self.lines:
+                # 上移到旧内容的第一行并清除到屏幕末尾
+                out.append(f"\033[{len(self.lines)}F\033[J")
+            out.extend(f"{line}\n" for line in lines)
+            written = len(lines)
+        else:
+            written = 0
+            total = len(lines)
+            for i, (old, new) in enumerate(zip(self.lines, lines)):
+                if old == new:
+                    continue
+                up = total - i
+                # 上移到第i行改写后回到底部
+                out.append(f"\033[{up}F\033[2K{new}\033[{up}E")
+                written += 1
+        self.stream.write("".join(out))
+        self.stream.flush()
+        self.lines = list(lines)
+        return written
+
+    def reset(self):
+        """
+        其他输出打断了画面时调用，下次绘制从当前光标位置重新开始
+        """
+        self.lines = []